@@ -1,16 +1,28 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 import asyncio
+import atexit
 import logging
 import os
+import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import numpy as np
 from functools import wraps
 
 # Импорты из проекта
-from config import POPULAR_CRYPTOS, CACHE_TTL, DEBUG, SECRET_KEY
-from services import bybit_service
+from config import (POPULAR_CRYPTOS, DEBUG, SECRET_KEY, API_LOOP_MODE, API_ASYNC_TIMEOUT, BATCH_MAX_SYMBOLS,
+                    INDICATOR_WINDOW, MARKET_STREAM_ENABLED, PUSH_KEEPALIVE, PUSH_MAX_CLIENTS,
+                    PRICE_HISTORY_DAYS, PREDICTION_DAYS, PREFETCH_ENABLED, DB_ENABLED)
+from services import (bybit_service, background_loop, broadcaster, push_poller, market_stream, indicators,
+                      write_behind, price_maintenance)
+from services.broadcaster import encode_event
+from services.candle_store import INTERVAL_MS
+from services.prediction_warmer import PredictionWarmer
+from services.prefetcher import Prefetcher
+from models import windows
+from models.registry import model_registry
+from services.cache import create_cache
 
 # Настройка логирования
 logging.basicConfig(
@@ -24,23 +36,36 @@ app = Flask(__name__, static_folder='../static', static_url_path='')
 app.secret_key = SECRET_KEY
 CORS(app)
 
-# Кэш данных в памяти
-cache = {}
+# Кэш данных: в памяти процесса или общий для воркеров (CACHE_BACKEND)
+cache = create_cache()
+
+# Ключи, которые сейчас обновляются в фоне (stale-while-revalidate)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
 
 # ======================== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ========================
 
 def run_async(func):
-    """Декоратор для запуска асинхронных функций в Flask"""
+    """Декоратор для запуска асинхронных функций в Flask
+
+    В режиме shared корутина выполняется в общем фоновом event loop,
+    в режиме per_request - в новом цикле, который закрывается после запроса.
+    """
 
     @wraps(func)
     def wrapper(*args, **kwargs):
+        if API_LOOP_MODE == 'shared':
+            return background_loop.run(func(*args, **kwargs), timeout=API_ASYNC_TIMEOUT)
+
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
             result = loop.run_until_complete(func(*args, **kwargs))
             return result
         finally:
+            # Сессия привязана к циклу - закрываем пул до закрытия цикла
+            loop.run_until_complete(bybit_service.close())
             loop.close()
 
     return wrapper
@@ -48,20 +73,186 @@ def run_async(func):
 
 def get_cache(key: str):
     """Получить значение из кэша если оно не истекло"""
-    if key in cache:
-        value, timestamp = cache[key]
-        if time.time() - timestamp < CACHE_TTL:
-            return value
-    return None
+    return cache.get(key)
 
 
 def set_cache(key: str, value):
     """Установить значение в кэш"""
-    cache[key] = (value, time.time())
+    cache.set(key, value)
+
+
+def get_cache_or_refresh(key: str, factory):
+    """Получить значение из кэша; устаревшее отдается сразу, а обновление уходит в фон
+
+    factory - функция без аргументов, возвращающая корутину со свежим значением
+    (None - не сохранять).
+    """
+    entry = cache.get_entry(key)
+    if entry is None:
+        return None
+
+    value, is_stale = entry
+    if is_stale:
+        refresh_in_background(key, factory)
+    return value
+
+
+def refresh_in_background(key: str, factory):
+    """Обновить ключ кэша в общем event loop (не более одного обновления на ключ)"""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    # При общем кэше ключ может уже обновлять другой воркер
+    lock_key = f"refresh:{key}"
+    if not cache.add(lock_key, os.getpid(), ttl=API_ASYNC_TIMEOUT):
+        with _refreshing_lock:
+            _refreshing.discard(key)
+        return
+
+    async def _refresh():
+        try:
+            value = await factory()
+            if value is not None:
+                set_cache(key, value)
+        except Exception as e:
+            logger.error(f"Cache refresh error for {key}: {e}")
+        finally:
+            cache.delete(lock_key)
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    background_loop.submit(_refresh())
+
+
+def normalize_symbol(symbol: str) -> str:
+    """BTC / btcusdt -> BTCUSDT"""
+    symbol = symbol.strip().upper()
+    if not symbol.endswith('USDT'):
+        symbol = f"{symbol}USDT"
+    return symbol
+
+
+def parse_limit(default: int = 200, maximum: int = 1000) -> int:
+    """?limit= в пределах 1..maximum; ValueError - не целое число"""
+    raw = request.args.get('limit', str(default))
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError(f"Invalid limit '{raw}'")
+    return min(max(limit, 1), maximum)
+
+
+def get_requested_symbols() -> list:
+    """Символы из ?symbols=BTC,ETH или JSON тела {"symbols": [...]} без повторов"""
+    body = request.get_json(silent=True) or {}
+    raw = body.get('symbols') if isinstance(body, dict) else None
+    if not raw:
+        raw = request.args.get('symbols', '').split(',')
+
+    symbols = []
+    for item in raw:
+        if isinstance(item, str) and item.strip():
+            symbol = normalize_symbol(item)
+            if symbol not in symbols:
+                symbols.append(symbol)
+    return symbols[:BATCH_MAX_SYMBOLS]
+
+
+async def get_all_tickers_cached():
+    """Тикеры всех спотовых пар (один запрос к Bybit на весь список)"""
+    cache_key = "ticker:all"
+    tickers = get_cache(cache_key)
+    if tickers is None:
+        tickers = await bybit_service.get_all_tickers()
+        if tickers:
+            set_cache(cache_key, tickers)
+    return tickers
+
+
+_background_tasks_pid = None
+_background_tasks_lock = threading.Lock()
+
+
+def start_background_tasks():
+    """Запустить фоновые задачи в общем цикле (один раз на процесс, в т.ч. после fork)"""
+    global _background_tasks_pid
+    if API_LOOP_MODE != 'shared' or _background_tasks_pid == os.getpid():
+        return
+    with _background_tasks_lock:
+        if _background_tasks_pid == os.getpid():
+            return
+        _background_tasks_pid = os.getpid()
+
+    bybit_service.catalog.start_background_refresh(bybit_service, background_loop)
+    if MARKET_STREAM_ENABLED:
+        market_stream.start(background_loop)
+        push_poller.covered = market_stream.covers
+    # События /api/stream без WebSocket потока (или для символов вне его подписки) дает общий опрос тикеров
+    push_poller.start(background_loop)
+    prediction_warmer.start(background_loop)
+    if PREFETCH_ENABLED:
+        prefetcher.start(background_loop)
+    if DB_ENABLED:
+        # Подключение к БД может ждать connect_timeout - не задерживаем первый запрос
+        threading.Thread(target=attach_database, name='db-attach', daemon=True).start()
+
+
+def attached_database():
+    """Подключенная БД (models.database.db; None - DB_ENABLED выключен или подключение не удалось)"""
+    return bybit_service.catalog.storage
+
+
+def database_stats():
+    """Метрики пула соединений БД (None - БД не подключена)"""
+    storage = attached_database()
+    return storage.pool_stats() if storage is not None else None
+
+
+def attach_database():
+    """Подключить PostgreSQL: таблица свечей для CandleStore, синхронизация каталога инструментов
+    фоновая пакетная запись тикеров и свечей (write-behind), агрегаты и срок хранения price_history"""
+    try:
+        # Импорт модуля подключается к БД (глобальный экземпляр db)
+        from models.database import db
+    except ImportError as e:
+        logger.warning(f"Database disabled: {e}")
+        return
+
+    if db is not None and db.is_connected:
+        bybit_service.catalog.storage = db
+        write_behind.start(db)
+        bybit_service.writer = write_behind
+        # Необязательные таблицы могли не создаться (create_tables) - без них работаем как раньше
+        if db.has_candles:
+            bybit_service.candles.storage = db
+            bybit_service.candles.writer = write_behind
+        if db.has_rollups:
+            price_maintenance.storage = db
+            price_maintenance.start(background_loop)
+        if bybit_service.catalog.is_loaded:
+            background_loop.submit(bybit_service.catalog.sync_storage())
+        logger.info("Database attached")
+
+
+def shutdown_background_loop():
+    """Дописать очередь в БД, закрыть пул соединений и остановить общий цикл при выходе процесса"""
+    write_behind.stop()
+    background_loop.stop()
+
+
+background_loop.add_shutdown_hook(bybit_service.close)
+atexit.register(shutdown_background_loop)
 
 
 # ======================== МАРШРУТЫ ========================
 
+@app.before_request
+def ensure_background_tasks():
+    start_background_tasks()
+
+
 @app.route('/')
 def index():
     """Главная страница"""
@@ -79,7 +270,32 @@ def health_check():
         'status': 'ok',
         'timestamp': datetime.now().isoformat(),
         'api': 'Bybit API v5',
-        'features': ['search', 'ticker', 'klines', 'indicators', 'predictions']
+        'features': ['search', 'ticker', 'klines', 'indicators', 'predictions', 'batch']
+    }), 200
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Счетчики сервиса: запросы к Bybit, single-flight и кэш"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'bybit': bybit_service.get_stats(),
+            'cache': cache.stats(),
+            'catalog': bybit_service.catalog.stats(),
+            'candles': bybit_service.candles.stats(),
+            'indicator_states': bybit_service.indicator_states.stats(),
+            'tickers': bybit_service.tickers.stats(),
+            'market_stream': market_stream.stats(),
+            'push': broadcaster.stats(),
+            'models': model_registry.stats(),
+            'prediction_warmer': prediction_warmer.stats(),
+            'prefetch': prefetcher.stats(),
+            'database': database_stats(),
+            'write_behind': write_behind.stats(),
+            'price_maintenance': price_maintenance.stats()
+        },
+        'timestamp': datetime.now().isoformat()
     }), 200
 
 
@@ -92,23 +308,9 @@ async def search_cryptocurrencies():
     if not query or len(query) < 1:
         return jsonify({'success': True, 'data': [], 'source': 'empty'})
 
-    # Проверяем кэш
-    cache_key = f"search:{query}"
-    cached_result = get_cache(cache_key)
-    if cached_result:
-        return jsonify(cached_result)
-
     try:
-        # Ищем через Bybit API
-        api_results = await bybit_service.search_cryptocurrencies(query)
-
-        result = {
-            'success': True,
-            'data': api_results,
-            'source': 'bybit_api',
-            'count': len(api_results)
-        }
-        set_cache(cache_key, result)
+        # Поиск по локальному каталогу - без кэша, ответ за микросекунды
+        result = await build_search_payload(query)
         return jsonify(result)
 
     except Exception as e:
@@ -120,6 +322,17 @@ async def search_cryptocurrencies():
         }), 500
 
 
+async def build_search_payload(query: str) -> dict:
+    """Ответ поиска по каталогу инструментов Bybit"""
+    api_results = await bybit_service.search_cryptocurrencies(query)
+    return {
+        'success': True,
+        'data': api_results,
+        'source': 'catalog',
+        'count': len(api_results)
+    }
+
+
 @app.route('/api/cryptos/all', methods=['GET'])
 def get_all_cryptocurrencies():
     """Получение всех популярных криптовалют"""
@@ -158,52 +371,234 @@ async def get_crypto_data(symbol: str):
 
     # Проверяем кэш
     cache_key = f"crypto:{symbol}"
-    cached_result = get_cache(cache_key)
+    cached_result = get_cache_or_refresh(cache_key, lambda: build_crypto_payload(symbol))
+    prefetcher.track(symbol, cached=bool(cached_result))
     if cached_result:
         return jsonify(cached_result)
 
     try:
-        # Получаем текущую цену
-        ticker = await bybit_service.get_current_price(symbol)
-        if not ticker:
+        result = await build_crypto_payload(symbol)
+        if not result:
             return jsonify({
                 'success': False,
                 'error': f'Failed to get data for {symbol}'
             }), 404
 
-        # Получаем историю цен
-        history = await bybit_service.get_price_history(symbol, days=90)
-        if not history:
-            history = {'prices': [ticker['last_price']], 'timestamps': [int(time.time() * 1000)]}
+        set_cache(cache_key, result)
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+async def build_crypto_payload(symbol: str):
+    """Полные данные по криптовалюте (None если нет тикера)"""
+    # Получаем текущую цену
+    ticker = await bybit_service.get_current_price(symbol)
+    if not ticker:
+        return None
+
+    return {
+        'success': True,
+        'data': await build_symbol_data(symbol, ticker),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+async def prefetch_symbol(symbol: str):
+    """Обновить кэш /api/crypto и прогноз символа до истечения TTL"""
+    result = await build_crypto_payload(symbol)
+    if result is not None:
+        set_cache(f"crypto:{symbol}", result)
+    await predict_symbols([symbol])
+
+
+def claim_prefetch(symbol: str, ttl: float) -> bool:
+    """При общем кэше символ обновляет только один воркер за интервал"""
+    return cache.add(f"prefetch:{symbol}", os.getpid(), ttl=ttl)
+
+
+async def build_symbol_data(symbol: str, ticker: dict, include_history: bool = True) -> dict:
+    """Тикер, история за 90 дней и индикаторы по символу"""
+    data = {
+        'symbol': symbol,
+        'current': {
+            'price': ticker['last_price'],
+            'change_24h': ticker['change_24h'],
+            'high_24h': ticker['high_24h'],
+            'low_24h': ticker['low_24h'],
+            'volume_24h': ticker['volume_24h'],
+            'turnover_24h': ticker['turnover_24h']
+        }
+    }
+    if not include_history:
+        return data
+
+    # Получаем историю цен (колонки из хранилища свечей, без копирования)
+    candles = await bybit_service.get_kline_data(symbol, "D", INDICATOR_WINDOW)
+    if candles is not None:
+        prices = candles.close
+        timestamps = candles.ts.tolist()
+    else:
+        prices = np.array([ticker['last_price']])
+        timestamps = [int(time.time() * 1000)]
+
+    # Рассчитываем индикаторы
+    data['history'] = {
+        'prices': prices.tolist(),
+        'timestamps': timestamps
+    }
+    if candles is not None:
+        # Состояние индикаторов досчитывается только по новым свечам
+        data['indicators'] = bybit_service.indicator_states.sync(symbol, "D", candles)
+    else:
+        data['indicators'] = await bybit_service.calculate_technical_indicators(prices)
+    return data
 
-        prices = history['prices']
 
-        # Рассчитываем индикаторы
-        indicators = await bybit_service.calculate_technical_indicators(prices)
+@app.route('/api/crypto/batch', methods=['GET', 'POST'])
+@run_async
+async def get_crypto_batch():
+    """Данные по нескольким криптовалютам: один запрос тикеров и параллельные истории"""
+    symbols = get_requested_symbols()
+    if not symbols:
+        return jsonify({
+            'success': False,
+            'error': 'No symbols given'
+        }), 400
 
-        result = {
+    include_history = request.args.get('history', '1') != '0'
+
+    try:
+        tickers = await get_all_tickers_cached()
+        if tickers is None:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to get tickers'
+            }), 404
+
+        found = [symbol for symbol in symbols if symbol in tickers]
+        items = await asyncio.gather(*(
+            build_symbol_data(symbol, tickers[symbol], include_history) for symbol in found
+        ))
+
+        return jsonify({
             'success': True,
-            'data': {
-                'symbol': symbol,
-                'current': {
-                    'price': ticker['last_price'],
-                    'change_24h': ticker['change_24h'],
-                    'high_24h': ticker['high_24h'],
-                    'low_24h': ticker['low_24h'],
-                    'volume_24h': ticker['volume_24h'],
-                    'turnover_24h': ticker['turnover_24h']
-                },
-                'history': {
-                    'prices': prices,
-                    'timestamps': history['timestamps']
-                },
-                'indicators': indicators
-            },
+            'data': {item['symbol']: item for item in items},
+            'missing': [symbol for symbol in symbols if symbol not in tickers],
+            'count': len(items),
             'timestamp': datetime.now().isoformat()
-        }
+        })
 
-        set_cache(cache_key, result)
-        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def sync_stream_subscribers():
+    """Подписки WebSocket потока - по символам текущих клиентов /api/stream"""
+    if MARKET_STREAM_ENABLED:
+        background_loop.submit(market_stream.sync_subscribers(broadcaster.symbols()))
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_prices():
+    """Server-Sent Events: изменения тикеров и закрытые свечи по ?symbols=BTC,ETH
+
+    Первое событие ticker по символу содержит все поля, дальше - только изменившиеся.
+    """
+    symbols = get_requested_symbols()
+    if not symbols:
+        return jsonify({
+            'success': False,
+            'error': 'No symbols given'
+        }), 400
+
+    if API_LOOP_MODE != 'shared':
+        return jsonify({
+            'success': False,
+            'error': 'Streaming requires API_LOOP_MODE=shared'
+        }), 503
+
+    if broadcaster.clients >= PUSH_MAX_CLIENTS:
+        return jsonify({
+            'success': False,
+            'error': 'Too many stream clients'
+        }), 503
+
+    # Подписка до снимка: изменения после него уже попадут в очередь
+    subscription = broadcaster.subscribe(symbols)
+    sync_stream_subscribers()
+
+    try:
+        tickers = None
+        snapshot = {}
+        for symbol in symbols:
+            ticker = broadcaster.last_ticker(symbol)
+            if ticker is None:
+                if tickers is None:
+                    tickers = background_loop.run(get_all_tickers_cached(), timeout=API_ASYNC_TIMEOUT) or {}
+                if symbol in tickers:
+                    ticker = broadcaster.seed_ticker(symbol, tickers[symbol])
+            if ticker is not None:
+                snapshot[symbol] = ticker
+    except Exception:
+        broadcaster.unsubscribe(subscription)
+        sync_stream_subscribers()
+        raise
+
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            for symbol, ticker in snapshot.items():
+                yield encode_event('ticker', {**ticker, 'symbol': symbol})
+            while True:
+                message = subscription.get(timeout=PUSH_KEEPALIVE)
+                yield message if message is not None else ': keepalive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscription)
+            sync_stream_subscribers()
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/tickers', methods=['GET', 'POST'])
+@run_async
+async def get_tickers():
+    """Текущие цены по списку символов (без списка - все спотовые пары)"""
+    symbols = get_requested_symbols()
+
+    try:
+        tickers = await get_all_tickers_cached()
+        if tickers is None:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to get tickers'
+            }), 404
+
+        if symbols:
+            data = {symbol: tickers[symbol] for symbol in symbols if symbol in tickers}
+            missing = [symbol for symbol in symbols if symbol not in tickers]
+        else:
+            data, missing = tickers, []
+
+        return jsonify({
+            'success': True,
+            'data': data,
+            'missing': missing,
+            'count': len(data),
+            'timestamp': datetime.now().isoformat()
+        })
 
     except Exception as e:
         logger.error(f"Error: {e}")
@@ -213,6 +608,109 @@ async def get_crypto_data(symbol: str):
         }), 500
 
 
+def heuristic_forecast(prices: np.ndarray, days: int = 7) -> tuple:
+    """Прогноз без обученной модели"""
+    return lstm_prediction(prices, days=days), {'source': 'heuristic', 'version': None,
+                                                'trained_at': None, 'metrics': {}, 'shared': False, 'runtime': None}
+
+
+def build_prediction(symbol: str, prices: np.ndarray, predictions, model_info: dict) -> dict:
+    """Прогноз с уровнями, сигналом и уверенностью (поле data ответа /api/predict)"""
+    current_price = prices[-1]
+    expected_price = predictions[-1]
+    rsi = calculate_rsi(prices)
+
+    # Расчет уровней поддержки и сопротивления
+    support, resistance = calculate_support_resistance(prices)
+
+    # Рассчитываем сигнал
+    trend = (expected_price - current_price) / current_price * 100
+    signal, signal_text, emoji = get_trading_signal(trend, prices, rsi)
+
+    # Рассчитываем уверенность
+    confidence = calculate_confidence(current_price, expected_price, support, resistance, trend, prices, rsi)
+
+    return {
+        'symbol': symbol,
+        'current_price': float(current_price),
+        'expected_price': float(expected_price),
+        'predictions': [float(p) for p in predictions],
+        'predicted_change': float(trend),
+        'support': float(support),
+        'resistance': float(resistance),
+        'signal': signal,
+        'signal_text': signal_text,
+        'signal_emoji': emoji,
+        'confidence': float(confidence),
+        'days': len(predictions),
+        'rmse': calculate_rmse(prices),
+        'model': model_info
+    }
+
+
+def closed_candles(candles, interval: str = "D"):
+    """Только закрытые свечи: последняя свеча Bybit еще формируется"""
+    if len(candles) and candles.ts[-1] + INTERVAL_MS[interval] > time.time() * 1000:
+        return candles[:len(candles) - 1]
+    return candles
+
+
+async def predict_symbols(symbols: list) -> tuple:
+    """Прогнозы по символам через кэш: ({symbol: data}, попаданий в кэш)
+
+    Прогноз строится по закрытым дневным свечам, ключ кэша - символ, время
+    открытия последней закрытой свечи и версия модели. Пересчет нужен только
+    после закрытия свечи или переобучения; промахи считаются одним batch.
+    """
+    candles = await asyncio.gather(*(
+        bybit_service.get_kline_data(symbol, "D", PRICE_HISTORY_DAYS + 1) for symbol in symbols
+    ))
+
+    results, pending, hits = {}, {}, 0
+    for symbol, series in zip(symbols, candles):
+        closed = closed_candles(series).tail(PRICE_HISTORY_DAYS) if series is not None else None
+        if closed is None or len(closed) < 2:
+            continue
+        version = model_registry.version_for(symbol) or 'heuristic'
+        key = f"predict:{symbol}:{int(closed.ts[-1])}:{version}"
+        data = get_cache(key)
+        if data is not None:
+            results[symbol] = data
+            hits += 1
+        else:
+            pending[symbol] = (key, version, closed.close)
+
+    if pending:
+        forecasts = await model_registry.predict_many(
+            {symbol: prices for symbol, (_, _, prices) in pending.items()}, days=PREDICTION_DAYS
+        )
+        for symbol, (key, version, prices) in pending.items():
+            forecast = forecasts.get(symbol)
+            predictions, model_info = forecast or heuristic_forecast(prices, PREDICTION_DAYS)
+            results[symbol] = build_prediction(symbol, prices, predictions, model_info)
+            # Модель есть, но не отработала: эвристику под ее версией не кэшируем
+            if forecast is not None or version == 'heuristic':
+                set_cache(key, results[symbol])
+
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}, hits
+
+
+# Прогрев кэша прогнозов популярных символов после закрытия дневной свечи
+prediction_warmer = PredictionWarmer(predict_symbols)
+
+# Обновление кэша POPULAR_CRYPTOS и часто запрашиваемых символов до истечения TTL
+prefetcher = Prefetcher(prefetch_symbol, claim=claim_prefetch)
+
+
+def snapshot_symbols():
+    """Символы, снимки тикеров которых пишутся в price_history: закрепленные и горячие
+    (prefetcher), с подписчиками SSE и из WebSocket потока"""
+    return set(prefetcher.targets()) | set(broadcaster.symbols()) | set(market_stream.base_symbols)
+
+
+bybit_service.tracked_symbols = snapshot_symbols
+
+
 @app.route('/api/predict/<symbol>', methods=['POST'])
 @run_async
 async def predict_price(symbol: str):
@@ -222,52 +720,50 @@ async def predict_price(symbol: str):
         symbol = f"{symbol}USDT"
 
     try:
-        # Получаем историю цен
-        history = await bybit_service.get_price_history(symbol, days=90)
-        if not history or not history['prices']:
+        data, hits = await predict_symbols([symbol])
+        if symbol not in data:
             return jsonify({
                 'success': False,
                 'error': 'Insufficient data for prediction'
             }), 400
 
-        prices = np.array(history['prices'], dtype=float)
-        current_price = prices[-1]
+        return jsonify({
+            'success': True,
+            'data': data[symbol],
+            'cached': hits > 0,
+            'timestamp': datetime.now().isoformat()
+        })
 
-        # LSTM прогноз
-        predictions = lstm_prediction(prices, days=7)
-        expected_price = predictions[-1]
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
-        # Расчет уровней поддержки и сопротивления
-        support, resistance = calculate_support_resistance(prices)
 
-        # Рассчитываем сигнал
-        trend = (expected_price - current_price) / current_price * 100
-        signal, signal_text, emoji = get_trading_signal(trend, prices)
+@app.route('/api/predict/batch', methods=['GET', 'POST'])
+@run_async
+async def predict_batch():
+    """Прогноз для нескольких символов: окна всех символов одной модели - один batch"""
+    symbols = get_requested_symbols()
+    if not symbols:
+        return jsonify({
+            'success': False,
+            'error': 'No symbols given'
+        }), 400
 
-        # Рассчитываем уверенность
-        confidence = calculate_confidence(current_price, expected_price, support, resistance, trend, prices)
+    try:
+        data, hits = await predict_symbols(symbols)
 
-        result = {
+        return jsonify({
             'success': True,
-            'data': {
-                'symbol': symbol,
-                'current_price': float(current_price),
-                'expected_price': float(expected_price),
-                'predictions': [float(p) for p in predictions],
-                'predicted_change': float(trend),
-                'support': float(support),
-                'resistance': float(resistance),
-                'signal': signal,
-                'signal_text': signal_text,
-                'signal_emoji': emoji,
-                'confidence': float(confidence),
-                'days': 7,
-                'rmse': calculate_rmse(prices)
-            },
+            'data': data,
+            'missing': [symbol for symbol in symbols if symbol not in data],
+            'count': len(data),
+            'cached': hits,
             'timestamp': datetime.now().isoformat()
-        }
-
-        return jsonify(result)
+        })
 
     except Exception as e:
         logger.error(f"Error: {e}")
@@ -277,6 +773,17 @@ async def predict_price(symbol: str):
         }), 500
 
 
+@app.route('/api/models', methods=['GET'])
+def get_models():
+    """Обученные модели: версии, время обучения и метрики"""
+    models = model_registry.list_models()
+    return jsonify({
+        'success': True,
+        'data': models,
+        'count': len(models)
+    })
+
+
 @app.route('/api/klines/<symbol>', methods=['GET'])
 @run_async
 async def get_klines(symbol: str):
@@ -286,33 +793,144 @@ async def get_klines(symbol: str):
         symbol = f"{symbol}USDT"
 
     interval = request.args.get('interval', '60')
-    limit = min(int(request.args.get('limit', '200')), 1000)
+    # columns - колонки массивами (компактнее), иначе список свечей от новых к старым
+    data_format = request.args.get('format', 'records')
+    try:
+        limit = parse_limit()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
 
     try:
-        klines = await bybit_service.get_kline_data(symbol, interval, limit)
-        if not klines:
+        candles = await bybit_service.get_kline_data(symbol, interval, limit)
+        if candles is None:
             return jsonify({
                 'success': False,
                 'error': 'Failed to get klines'
             }), 404
 
-        formatted_klines = []
-        for kline in klines:
-            formatted_klines.append({
-                'timestamp': int(kline[0]),
-                'open': float(kline[1]),
-                'high': float(kline[2]),
-                'low': float(kline[3]),
-                'close': float(kline[4]),
-                'volume': float(kline[5])
-            })
+        if data_format == 'columns':
+            data = candles.to_columns()
+        else:
+            data = candles.to_records(newest_first=True)
 
         return jsonify({
             'success': True,
-            'data': formatted_klines,
+            'data': data,
             'symbol': symbol,
             'interval': interval,
-            'count': len(formatted_klines)
+            'format': data_format,
+            'count': len(candles)
+        })
+
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/indicators/<symbol>', methods=['GET'])
+@run_async
+async def get_indicators(symbol: str):
+    """Полные серии индикаторов для графика (?names=rsi,sma:20,ema:50,bb,macd,atr,volatility)"""
+    symbol = normalize_symbol(symbol)
+    interval = request.args.get('interval', '60')
+    names = [name for name in request.args.get('names', '').split(',') if name.strip()]
+
+    try:
+        limit = parse_limit()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        for name in names:
+            indicators.parse_spec(name)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'available': list(indicators.AVAILABLE_INDICATORS)
+        }), 400
+
+    try:
+        candles = await bybit_service.get_kline_data(symbol, interval, limit)
+        if candles is None:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to get klines'
+            }), 404
+
+        series = indicators.compute(candles, names)
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'timestamps': candles.ts.tolist(),
+                'close': candles.close.tolist(),
+                'indicators': {name: indicators.series_to_json(values) for name, values in series.items()}
+            },
+            'symbol': symbol,
+            'interval': interval,
+            'count': len(candles)
+        })
+
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def history_point(point: dict) -> dict:
+    """Точка get_price_history_range для JSON: время в мс (UTC), числа вместо Decimal"""
+    return {
+        'timestamp': int(point['timestamp'].replace(tzinfo=timezone.utc).timestamp() * 1000),
+        **{key: float(point[key]) if point[key] is not None else None
+           for key in ('open', 'high', 'low', 'close', 'volume_24h')}
+    }
+
+
+@app.route('/api/history/<symbol>', methods=['GET'])
+@run_async
+async def get_history(symbol: str):
+    """История снимков цены из БД за ?days= (разрешение raw/1m/1h/1d по длине периода)"""
+    symbol = normalize_symbol(symbol)
+    raw = request.args.get('days', '1')
+    try:
+        days = float(raw)
+        if not 0 < days <= 3650:
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': f"Invalid days '{raw}'"
+        }), 400
+
+    storage = attached_database()
+    if storage is None:
+        return jsonify({
+            'success': False,
+            'error': 'Database is not attached'
+        }), 503
+
+    try:
+        end = datetime.now(timezone.utc).replace(tzinfo=None)
+        history = await storage.run(storage.get_price_history_range, symbol, end - timedelta(days=days), end)
+        points = [history_point(point) for point in history['points']]
+        return jsonify({
+            'success': True,
+            'data': points,
+            'symbol': symbol,
+            'resolution': history['resolution'],
+            'count': len(points)
         })
 
     except Exception as e:
@@ -346,12 +964,8 @@ def denormalize_data(data: np.ndarray, min_val: float, max_val: float) -> np.nda
 
 
 def create_sequences(data: np.ndarray, seq_length: int = 60) -> tuple:
-    """Создание последовательностей для LSTM"""
-    X, y = [], []
-    for i in range(len(data) - seq_length):
-        X.append(data[i:i + seq_length])
-        y.append(data[i + seq_length])
-    return np.array(X), np.array(y)
+    """Создание последовательностей для LSTM (окна-представления без копирования)"""
+    return windows.sequences(data, seq_length)
 
 
 def lstm_prediction(prices: np.ndarray, days: int = 7, seq_length: int = 60) -> np.ndarray:
@@ -446,10 +1060,11 @@ def calculate_support_resistance(prices: np.ndarray) -> tuple:
 
 def calculate_confidence(current_price: float, expected_price: float,
                          support: float, resistance: float,
-                         trend: float, prices: np.ndarray) -> float:
-    """Расчет уверенности в прогнозе"""
+                         trend: float, prices: np.ndarray, rsi: float = None) -> float:
+    """Расчет уверенности в прогнозе (rsi - уже посчитанный RSI, иначе считается здесь)"""
     try:
-        rsi = calculate_rsi(prices)
+        if rsi is None:
+            rsi = calculate_rsi(prices)
 
         # Базовая уверенность на основе тренда
         confidence = min(100, abs(trend) * 2)
@@ -479,9 +1094,10 @@ def calculate_confidence(current_price: float, expected_price: float,
         return 50.0
 
 
-def get_trading_signal(trend: float, prices: np.ndarray) -> tuple:
-    """Получить торговый сигнал"""
-    rsi = calculate_rsi(prices)
+def get_trading_signal(trend: float, prices: np.ndarray, rsi: float = None) -> tuple:
+    """Получить торговый сигнал (rsi - уже посчитанный RSI, иначе считается здесь)"""
+    if rsi is None:
+        rsi = calculate_rsi(prices)
 
     if trend > 10 and rsi < 70:
         return 'STRONG_BUY', '🟢 Сильно покупать', '🟢'
@@ -498,24 +1114,8 @@ def get_trading_signal(trend: float, prices: np.ndarray) -> tuple:
 
 
 def calculate_rsi(prices: np.ndarray, period: int = 14) -> float:
-    """Расчет RSI"""
-    try:
-        if len(prices) < period:
-            return 50.0
-
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-
-        avg_gain = np.mean(gains[-period:])
-        avg_loss = np.mean(losses[-period:])
-
-        rs = avg_gain / avg_loss if avg_loss > 0 else 0
-        rsi = 100 - (100 / (1 + rs)) if rs >= 0 else 50
-
-        return float(rsi)
-    except:
-        return 50.0
+    """RSI Уайлдера на последней точке"""
+    return indicators.last_value(indicators.rsi(prices, period), 50.0)
 
 
 def calculate_rmse(prices: np.ndarray) -> float:
@@ -6,6 +6,7 @@ load_dotenv()
 # ======================== BYBIT API ========================
 BYBIT_API_BASE = 'https://api-testnet.bybit.com'
 BYBIT_PUBLIC_ENDPOINT = '/v5/market'
+BYBIT_REST_URL = os.getenv('BYBIT_REST_URL', 'https://api.bybit.com')
 
 # ======================== DATABASE ========================
 DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -17,6 +18,20 @@ DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
 # Database URL
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Пул соединений: DB_POOL_MIN открыты постоянно, под нагрузкой - до DB_POOL_MAX
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = 5  # секунд ожидания свободного соединения, затем ошибка
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '5000'))  # statement_timeout сессии
+DB_HEALTHCHECK_IDLE = 30  # секунд простоя соединения, после которых перед выдачей выполняется SELECT 1
+DB_INSERT_PAGE_SIZE = 1000  # строк на один INSERT в execute_values (свечи, каталог инструментов)
+# С DB_ENABLED=true API подключает БД в фоне: таблица свечей, синхронизация каталога
+# инструментов, запись снимков цен и их агрегаты. По умолчанию API работает без БД
+DB_ENABLED = os.getenv('DB_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Таблица свечей candles (по месяцам): второй уровень CandleStore перед запросами к Bybit
+CANDLE_COPY_MIN_ROWS = 500  # с этого числа строк запись идет через COPY, меньше - execute_values
+
 # ======================== TELEGRAM BOT ========================
 BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 WEB_APP_URL = os.getenv('WEB_APP_URL', 'http://localhost:5000')
@@ -26,14 +41,41 @@ FLASK_ENV = os.getenv('FLASK_ENV', 'development')
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 DEBUG = FLASK_ENV == 'development'
 
+# Режим выполнения async обработчиков:
+#   shared      - один долгоживущий event loop в фоновом потоке (пулы и кэши переживают запрос)
+#   per_request - новый event loop на каждый запрос (старое поведение)
+API_LOOP_MODE = os.getenv('API_LOOP_MODE', 'shared')
+API_ASYNC_TIMEOUT = 60  # секунд на выполнение одного async обработчика
+
 # ======================== LSTM SETTINGS ========================
 SEQUENCE_LENGTH = 60
 PREDICTION_DAYS = 7
 EPOCHS = 50
 BATCH_SIZE = 32
+MODEL_DIR = os.getenv('MODEL_DIR', 'data/models')  # обученные модели: {symbol}_lstm.h5, _scaler.json, _meta.json
+MODEL_CACHE_MAX_MODELS = int(os.getenv('MODEL_CACHE_MAX_MODELS', '20'))  # загруженных моделей в памяти процесса
+MODEL_CACHE_MAX_BYTES = int(os.getenv('MODEL_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+SHARED_MODEL_SYMBOL = os.getenv('SHARED_MODEL_SYMBOL', 'ALL')  # общая модель для символов без своей
+PREDICT_WARM_DELAY = 30  # секунд после закрытия дневной свечи до прогрева кэша прогнозов
 
 # ======================== CACHE SETTINGS ========================
 CACHE_TTL = 60  # 5 minutes
+CANDLE_SYNC_INTERVAL = 5  # секунд между запросами дельты свечей для одной серии
+CANDLE_STORE_MAX_SERIES = 500  # серий (symbol, interval) в памяти
+INDICATOR_WINDOW = 90  # окно цен для индикаторов /api/crypto (дневные свечи)
+# TTL (секунд) по пространствам имен ключей кэша (префикс до ':')
+CACHE_TTLS = {
+    'all_cryptos': 3600,
+    'crypto': CACHE_TTL,
+    'ticker': 10,
+    'predict': 2 * 24 * 3600,  # ключ меняется с закрытием дневной свечи и версией модели
+}
+CACHE_STALE_TTL = 120  # сколько секунд после истечения отдаем устаревшее значение, пока идет обновление
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '5000'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# memory - кэш в памяти процесса, socket - общий для воркеров сервер (python -m services.cache_server)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_SOCKET_PATH = os.getenv('CACHE_SOCKET_PATH', '/tmp/pulsetrade-cache.sock')
 PRICE_HISTORY_DAYS = 90
 
 # ======================== POPULAR CRYPTOS (BYBIT SYMBOLS) ========================
@@ -46,9 +88,70 @@ POPULAR_CRYPTOS = [
     {'symbol': 'ADAUSDT', 'name': 'Cardano', 'display_name': 'ADA', 'emoji': '✴'},
 ]
 
+# ======================== MARKET STREAM ========================
+# Публичный WebSocket Bybit: тикеры и свечи выбранных символов пишутся в локальные хранилища
+BYBIT_WS_URL = os.getenv('BYBIT_WS_URL', 'wss://stream.bybit.com/v5/public/spot')
+MARKET_STREAM_ENABLED = os.getenv('MARKET_STREAM_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+MARKET_STREAM_SYMBOLS = [s.strip().upper() for s in os.getenv(
+    'MARKET_STREAM_SYMBOLS', ','.join(c['symbol'] for c in POPULAR_CRYPTOS)).split(',') if s.strip()]
+MARKET_STREAM_INTERVALS = [i.strip() for i in os.getenv('MARKET_STREAM_INTERVALS', 'D,60').split(',') if i.strip()]
+MARKET_STREAM_PING_INTERVAL = 20  # секунд между ping (Bybit закрывает соединение без них)
+MARKET_STREAM_MAX_BACKOFF = 30  # максимальная пауза между переподключениями, секунд
+# Всего топиков в потоке: символы клиентов /api/stream сверх этого обслуживает опрос тикеров
+MARKET_STREAM_MAX_TOPICS = int(os.getenv('MARKET_STREAM_MAX_TOPICS', '300'))
+TICKER_STREAM_MAX_AGE = 10  # секунд, после которых тикер из потока считается устаревшим
+
+# ======================== PUSH (SSE) ========================
+PUSH_POLL_INTERVAL = 2  # секунд между опросами тикеров для /api/stream, если WebSocket поток выключен
+PUSH_KEEPALIVE = 15  # секунд между комментариями keepalive в SSE
+PUSH_QUEUE_SIZE = 100  # событий в очереди клиента (при переполнении старые отбрасываются)
+# SSE клиентов на процесс: каждый клиент занимает поток сервера (Flask threaded или gthread)
+# на все время подключения. Поднимать вместе с числом потоков воркера (--threads у gunicorn)
+PUSH_MAX_CLIENTS = int(os.getenv('PUSH_MAX_CLIENTS', '50'))
+
+# ======================== PREFETCH ========================
+# Фоновое обновление кэша /api/crypto для POPULAR_CRYPTOS и часто запрашиваемых символов
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PREFETCH_HOT_SIZE = 20  # символов из статистики запросов, которые держатся в кэше помимо POPULAR_CRYPTOS
+PREFETCH_HOT_HALF_LIFE = 600  # секунд: период полураспада счетчика запросов символа
+PREFETCH_HOT_MIN_SCORE = 2.0  # минимальный (затухающий) счетчик запросов для попадания в горячие
+PREFETCH_LEAD = 0.2  # доля TTL до истечения, когда запись обновляется
+PREFETCH_JITTER = 0.1  # случайный разброс момента обновления (доля интервала)
+PREFETCH_RATE = float(os.getenv('PREFETCH_RATE', '5'))  # запросов к Bybit в секунду на процесс
+PREFETCH_BURST = 10  # запас токенов для всплеска запросов
+PREFETCH_COST = 3  # оценка запросов к Bybit на одно обновление символа (тикер, свечи, прогноз)
+
+# ======================== WRITE-BEHIND ========================
+# Запись тикеров и свечей в БД из фонового потока пачками: запросы API ее не ждут
+WRITE_BEHIND_BATCH = 5000  # строк: при накоплении стольких строк запись начинается сразу
+WRITE_BEHIND_INTERVAL = 2.0  # секунд: иначе накопленное пишется не реже этого
+WRITE_BEHIND_MAX_PENDING = 100_000  # строк в памяти; сверх этого новые строки отбрасываются
+PRICE_SNAPSHOT_INTERVAL = 60  # секунд между снимками тикера одного символа в price_history
+
+# ======================== PRICE HISTORY MAINTENANCE ========================
+# Агрегаты price_history (1m/1h/1d) и срок хранения сырых снимков
+PRICE_ROLLUP_INTERVAL = 60  # секунд между пересчетами агрегатов
+PRICE_ROLLUP_LAG = 10  # секунд после конца корзины: снимки доходят до БД через write-behind с задержкой
+PRICE_RETENTION_INTERVAL = 3600  # секунд между чистками устаревших строк
+PRICE_RAW_RETENTION_DAYS = int(os.getenv('PRICE_RAW_RETENTION_DAYS', '7'))  # сырые снимки
+# Дней хранения агрегатов по разрешениям (None - бессрочно)
+PRICE_ROLLUP_RETENTION_DAYS = {'1m': 30, '1h': 730, '1d': None}
+# true - устаревшие сырые снимки переносятся в price_history_archive, false - удаляются
+PRICE_HISTORY_ARCHIVE = os.getenv('PRICE_HISTORY_ARCHIVE', 'false').lower() in ('1', 'true', 'yes')
+PRICE_RETENTION_BATCH = 10_000  # строк на одну транзакцию удаления
+PRICE_RANGE_MAX_POINTS = 1000  # точек в ответе get_price_history_range: по ним выбирается разрешение
+
 # ======================== API LIMITS ========================
 API_REQUEST_TIMEOUT = 15
 MAX_SEARCH_RESULTS = 20
+BATCH_MAX_SYMBOLS = 50  # символов в одном запросе /api/crypto/batch и /api/tickers
+CATALOG_REFRESH_INTERVAL = 3600  # секунд между обновлениями каталога инструментов
+
+# ======================== HTTP POOL ========================
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '100'))  # всего соединений в пуле
+HTTP_POOL_PER_HOST = int(os.getenv('HTTP_POOL_PER_HOST', '20'))  # соединений на один хост
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))  # секунд
+HTTP_KEEPALIVE_TIMEOUT = int(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))  # секунд
 
 # ======================== LOGGING ========================
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -0,0 +1,100 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume', 'turnover')
+
+
+class Candles:
+    """Колоночное представление свечей
+
+    Каждое поле - непрерывный массив NumPy (ts - int64 мс, остальное - float64),
+    упорядоченный по возрастанию времени. Массивы только для чтения: один объект
+    делят хранилище, индикаторы и прогноз без копирования.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, ts: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, turnover: Optional[np.ndarray] = None):
+        self.ts = self._freeze(ts, np.int64)
+        self.open = self._freeze(open, np.float64)
+        self.high = self._freeze(high, np.float64)
+        self.low = self._freeze(low, np.float64)
+        self.close = self._freeze(close, np.float64)
+        self.volume = self._freeze(volume, np.float64)
+        self.turnover = self._freeze(np.zeros(len(ts)) if turnover is None else turnover, np.float64)
+
+    @staticmethod
+    def _freeze(values, dtype) -> np.ndarray:
+        array = np.ascontiguousarray(values, dtype=dtype)
+        if array.flags.writeable:
+            array = array.view()
+            array.flags.writeable = False
+        return array
+
+    @classmethod
+    def empty(cls) -> 'Candles':
+        return cls(*(np.empty(0) for _ in COLUMNS))
+
+    @classmethod
+    def from_bybit(cls, rows: Sequence[Sequence[str]], newest_first: bool = True) -> 'Candles':
+        """Разобрать список свечей Bybit [start, open, high, low, close, volume, turnover] за один проход"""
+        if not rows:
+            return cls.empty()
+
+        table = np.array(rows, dtype=np.float64)
+        if table.ndim != 2 or table.shape[1] < 6:
+            raise ValueError(f"Unexpected kline shape: {table.shape}")
+        if newest_first:
+            table = table[::-1]
+
+        turnover = table[:, 6] if table.shape[1] > 6 else None
+        return cls(table[:, 0].astype(np.int64), table[:, 1], table[:, 2], table[:, 3],
+                   table[:, 4], table[:, 5], turnover)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, item: slice) -> 'Candles':
+        if not isinstance(item, slice):
+            raise TypeError("Candles supports slicing only")
+        return Candles(*(getattr(self, name)[item] for name in COLUMNS))
+
+    def tail(self, n: int) -> 'Candles':
+        """Последние n свечей (срезы - без копирования данных)"""
+        if n >= len(self):
+            return self
+        return self[len(self) - n:]
+
+    def merge(self, newer: 'Candles', max_len: Optional[int] = None) -> 'Candles':
+        """Заменить хвост свечами newer начиная с их первого времени открытия"""
+        if not len(newer):
+            return self
+        cut = int(np.searchsorted(self.ts, newer.ts[0], side='left'))
+        merged = Candles(*(np.concatenate((getattr(self, name)[:cut], getattr(newer, name)))
+                           for name in COLUMNS))
+        return merged.tail(max_len) if max_len else merged
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def to_columns(self) -> Dict[str, List]:
+        """Колонки для JSON ответа"""
+        return {
+            'timestamp': self.ts.tolist(),
+            'open': self.open.tolist(),
+            'high': self.high.tolist(),
+            'low': self.low.tolist(),
+            'close': self.close.tolist(),
+            'volume': self.volume.tolist()
+        }
+
+    def to_records(self, newest_first: bool = False) -> List[Dict]:
+        """Список свечей-словарей (формат /api/klines для фронтенда)"""
+        columns = self.to_columns()
+        keys = list(columns)
+        records = [dict(zip(keys, values)) for values in zip(*columns.values())]
+        if newest_first:
+            records.reverse()
+        return records
@@ -1,29 +1,136 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 import asyncio
+import io
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Dict, Optional, Sequence, Tuple
+
+from config import (MAX_SEARCH_RESULTS, CANDLE_COPY_MIN_ROWS, DB_INSERT_PAGE_SIZE, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT,
+                    DB_STATEMENT_TIMEOUT_MS, DB_HEALTHCHECK_IDLE, PRICE_SNAPSHOT_INTERVAL, PRICE_ROLLUP_LAG,
+                    PRICE_RAW_RETENTION_DAYS, PRICE_ROLLUP_RETENTION_DAYS, PRICE_HISTORY_ARCHIVE,
+                    PRICE_RETENTION_BATCH, PRICE_RANGE_MAX_POINTS)
+from models.candles import Candles
 
 logger = logging.getLogger(__name__)
 
+# Горячие запросы: готовятся (PREPARE) один раз на соединение при первом вызове.
+# Поиск с LIKE сюда не входит: индекс по префиксу используется, только если
+# шаблон известен при планировании, а общий план подготовленного запроса его не знает
+PREPARED_STATEMENTS = {
+    'candles_window': ('text, text, bigint, integer', """
+        SELECT open_time, open, high, low, close, volume, turnover
+        FROM candles
+        WHERE symbol = $1 AND "interval" = $2 AND open_time <= $3
+        ORDER BY open_time DESC
+        LIMIT $4
+    """),
+    'price_history_range': ('text, timestamp, timestamp', """
+        SELECT timestamp, price AS open, price AS high, price AS low, price AS close, volume_24h
+        FROM price_history
+        WHERE symbol = $1 AND timestamp >= $2 AND timestamp < $3
+        ORDER BY timestamp
+    """),
+    'price_rollups': ('text, text, timestamp, timestamp', """
+        SELECT bucket AS timestamp, open, high, low, close, volume_24h
+        FROM price_rollups
+        WHERE symbol = $1 AND resolution = $2 AND bucket >= $3 AND bucket < $4
+        ORDER BY bucket
+    """),
+}
+
+# Агрегаты price_history: разрешение -> (единица date_trunc, источник, период на один INSERT).
+# 1m считается из сырых снимков (источник None), 1h - из 1m, 1d - из 1h
+PRICE_ROLLUPS = {
+    '1m': ('minute', None, timedelta(hours=6)),
+    '1h': ('hour', '1m', timedelta(days=14)),
+    '1d': ('day', '1h', timedelta(days=365)),
+}
+RESOLUTION_SECONDS = {'1m': 60, '1h': 3600, '1d': 86400}
+PRICE_ROLLUP_LOCK = 7_041_900  # ключ pg_try_advisory_xact_lock: агрегаты пересчитывает один процесс
+
+ROLLUP_UPSERT = """
+    ON CONFLICT (symbol, resolution, bucket) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        volume_24h = EXCLUDED.volume_24h, samples = EXCLUDED.samples
+"""
+# volume_24h - скользящий объем за 24ч на конец корзины: объема за корзину в снимках нет
+ROLLUP_FROM_RAW = """
+    INSERT INTO price_rollups (symbol, resolution, bucket, open, high, low, close, volume_24h, samples)
+    SELECT symbol, %(resolution)s, date_trunc(%(unit)s, timestamp),
+           (array_agg(price ORDER BY timestamp))[1], max(price), min(price),
+           (array_agg(price ORDER BY timestamp DESC))[1],
+           (array_agg(volume_24h ORDER BY timestamp DESC))[1], count(*)
+    FROM price_history
+    WHERE timestamp >= %(start)s AND timestamp < %(end)s
+    GROUP BY 1, 3
+""" + ROLLUP_UPSERT
+# GROUP BY по номеру колонки: имя bucket означало бы колонку источника, а не корзину
+ROLLUP_FROM_ROLLUP = """
+    INSERT INTO price_rollups (symbol, resolution, bucket, open, high, low, close, volume_24h, samples)
+    SELECT symbol, %(resolution)s, date_trunc(%(unit)s, bucket),
+           (array_agg(open ORDER BY bucket))[1], max(high), min(low),
+           (array_agg(close ORDER BY bucket DESC))[1],
+           (array_agg(volume_24h ORDER BY bucket DESC))[1], sum(samples)
+    FROM price_rollups
+    WHERE resolution = %(source)s AND bucket >= %(start)s AND bucket < %(end)s
+    GROUP BY 1, 3
+""" + ROLLUP_UPSERT
+
 
 class Database:
-    """Асинхронный класс для работы с PostgreSQL"""
+    """Работа с PostgreSQL через пул соединений
 
-    def __init__(self, connection_string: str):
+    Каждый get_cursor берет свое соединение из ThreadedConnectionPool, поэтому
+    класс можно вызывать из нескольких потоков Flask. Если все соединения
+    заняты, вызов ждет до pool_timeout секунд. Соединение, простоявшее дольше
+    DB_HEALTHCHECK_IDLE, перед выдачей проверяется SELECT 1, а разорванное
+    соединение закрывается вместо возврата в пул. Запросы сессии ограничены
+    statement_timeout. Корутины вызывают методы через run(): запрос уходит в
+    пул потоков размером с пул соединений и не блокирует event loop.
+    """
+
+    def __init__(self, connection_string: str, min_size: int = DB_POOL_MIN, max_size: int = DB_POOL_MAX,
+                 pool_timeout: float = DB_POOL_TIMEOUT, statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
         self.connection_string = connection_string
-        self.conn = None
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.pool_timeout = pool_timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.pool: Optional[ThreadedConnectionPool] = None
         self.is_connected = False
+        self.has_trgm = False
+        self.has_candles = False
+        self.has_rollups = False
+        self._candle_partitions = set()
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_size, thread_name_prefix='db')
+        self._lock = threading.Lock()
+        self._open: set = set()  # id открытых соединений пула
+        self._last_used: Dict[int, float] = {}  # id(соединения) -> время возврата в пул
+        self._prepared: Dict[int, set] = {}  # id(соединения) -> подготовленные запросы
+        self._stats = {'checkouts': 0, 'in_use': 0, 'max_in_use': 0, 'waits': 0, 'wait_ms': 0.0,
+                       'max_wait_ms': 0.0, 'timeouts': 0, 'health_checks': 0, 'discarded': 0,
+                       'statement_timeouts': 0, 'prepares': 0}
 
     def connect(self) -> bool:
-        """Синхронное подключение к БД"""
+        """Создание пула соединений и таблиц"""
         try:
-            self.conn = psycopg2.connect(self.connection_string, connect_timeout=5)
+            self.pool = ThreadedConnectionPool(
+                self.min_size, self.max_size, self.connection_string, connect_timeout=5,
+                options=f"-c statement_timeout={self.statement_timeout_ms}"
+            )
             self.is_connected = True
+            self._track_initial()
             self.create_tables()
-            logger.info("✅ PostgreSQL подключение установлено")
+            logger.info(f"✅ PostgreSQL пул соединений создан ({self.min_size}-{self.max_size})")
             return True
         except psycopg2.OperationalError as e:
             logger.error(f"❌ Ошибка подключения PostgreSQL: {e}")
@@ -34,113 +141,409 @@ class Database:
             self.is_connected = False
             return False
 
+    def _track_initial(self):
+        """Учесть min_size соединений, которые пул открывает при создании"""
+        conns = [self.pool.getconn() for _ in range(self.min_size)]
+        for conn in conns:
+            self.pool.putconn(conn)
+        with self._lock:
+            self._open.update(id(conn) for conn in conns if not conn.closed)
+
     def reconnect(self) -> bool:
-        """Переподключение к БД"""
+        """Пересоздание пула"""
+        self._close_pool()
+        return self.connect()
+
+    def _close_pool(self):
         try:
-            if self.conn:
-                self.conn.close()
-        except:
+            if self.pool:
+                self.pool.closeall()
+        except Exception:
             pass
-        return self.connect()
+        self.pool = None
+        self.is_connected = False
+        with self._lock:
+            self._open.clear()
+            self._last_used.clear()
+            self._prepared.clear()
+
+    def _checkout(self):
+        """Взять соединение: ожидание свободного слота и проверка простоявшего соединения"""
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.pool_timeout):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise PoolError(f"No free database connection in {self.pool_timeout}s")
+        waited_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            # После рестарта сервера устаревшими могут быть все простаивающие соединения:
+            # проверяем каждое выданное пулом, пока не найдется рабочее (больше max_size их не бывает)
+            for _ in range(self.max_size + 1):
+                conn = self.pool.getconn()
+                with self._lock:
+                    idle = time.time() - self._last_used.get(id(conn), time.time())
+                if not conn.closed and (idle <= DB_HEALTHCHECK_IDLE or self._healthy(conn)):
+                    break
+                self._discard(conn)
+            else:
+                raise PoolError(f"No healthy database connection after {self.max_size + 1} attempts")
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._open.add(id(conn))
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['max_in_use'] = max(self._stats['max_in_use'], self._stats['in_use'])
+            self._stats['wait_ms'] += waited_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], round(waited_ms, 2))
+        return conn
+
+    def _healthy(self, conn) -> bool:
+        with self._lock:
+            self._stats['health_checks'] += 1
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        """Закрыть соединение и убрать его из пула (пул откроет новое)"""
+        with self._lock:
+            self._stats['discarded'] += 1
+        self.pool.putconn(conn, close=True)
+        self._forget(conn)
+
+    def _forget(self, conn):
+        with self._lock:
+            self._open.discard(id(conn))
+            self._last_used.pop(id(conn), None)
+            self._prepared.pop(id(conn), None)
+
+    def _checkin(self, conn, broken: bool):
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+            else:
+                self.pool.putconn(conn)
+                if conn.closed:
+                    # Пул закрывает соединения сверх min_size
+                    self._forget(conn)
+                else:
+                    with self._lock:
+                        self._last_used[id(conn)] = time.time()
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
 
     @contextmanager
-    def get_cursor(self):
-        """Context manager для получения курсора"""
+    def get_cursor(self, cursor_factory=RealDictCursor):
+        """Context manager для получения курсора (cursor_factory=None - строки-кортежи)"""
+        if not self.is_connected and not self.reconnect():
+            raise psycopg2.OperationalError("Database is not available")
+
+        conn = self._checkout()
         cursor = None
+        broken = False
         try:
-            if not self.is_connected:
-                self.reconnect()
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor(cursor_factory=cursor_factory)
             yield cursor
-            self.conn.commit()
+            conn.commit()
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
+            if isinstance(e, psycopg2.extensions.QueryCanceledError):
+                with self._lock:
+                    self._stats['statement_timeouts'] += 1
+            elif isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                broken = True
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
             logger.error(f"❌ Ошибка БД: {e}")
             raise
         finally:
-            if cursor:
+            if cursor is not None and not cursor.closed:
                 cursor.close()
+            self._checkin(conn, broken)
+
+    def execute_prepared(self, cur, name: str, params: Sequence):
+        """Выполнить запрос из PREPARED_STATEMENTS, подготовив его на соединении при первом вызове"""
+        conn_id = id(cur.connection)
+        with self._lock:
+            prepared = name in self._prepared.get(conn_id, ())
+        if not prepared:
+            types, sql = PREPARED_STATEMENTS[name]
+            cur.execute(f"PREPARE {name} ({types}) AS {sql}")
+            with self._lock:
+                self._prepared.setdefault(conn_id, set()).add(name)
+                self._stats['prepares'] += 1
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+
+    async def run(self, method, *args):
+        """Вызвать синхронный метод из корутины, не блокируя event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
+
+    def submit(self, method, *args):
+        """Выполнить метод в пуле потоков БД без ожидания результата"""
+        return self._executor.submit(method, *args)
+
+    def pool_stats(self) -> Dict:
+        """Метрики пула: занятость, ожидания свободного соединения, проверки и таймауты"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = len(self._open)
+        stats['wait_ms'] = round(stats['wait_ms'], 1)
+        stats['size'] = self.max_size
+        stats['saturation'] = round(stats['in_use'] / self.max_size, 2)
+        return stats
 
     def create_tables(self):
-        """Создание таблиц если их нет"""
+        """Создание таблиц если их нет
+
+        Каждая группа объектов создается в своей транзакции. Если не удалась
+        необязательная группа (секционированная таблица свечей на старом
+        PostgreSQL, нет прав), базовые таблицы остаются, а зависящие от
+        группы функции отключаются (has_candles, has_rollups).
+        """
+        if not self._create_schema_group('базовые таблицы', self._create_core_tables, required=True):
+            return
+        self._create_schema_group('индексы поиска', self._create_search_indexes)
+        self._create_schema_group('индексы price_history', self._create_price_history_indexes)
+        self.has_rollups = self._create_schema_group('агрегаты price_history', self._create_rollup_tables)
+        self.has_candles = self._create_schema_group('таблицу свечей', self._create_candle_tables)
+        self.has_trgm = self._create_trigram_indexes()
+        logger.info("✅ Таблицы БД созданы/проверены")
+
+    def _create_schema_group(self, title: str, create, required: bool = False) -> bool:
+        """Выполнить DDL группы в отдельной транзакции; False - группа не создана"""
         try:
-            with self.get_cursor() as cur:
-                # Таблица криптовалют
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS cryptocurrencies (
-                        id SERIAL PRIMARY KEY,
-                        symbol VARCHAR(20) UNIQUE NOT NULL,
-                        name VARCHAR(100) NOT NULL,
-                        display_name VARCHAR(10),
-                        emoji VARCHAR(5),
-                        is_active BOOLEAN DEFAULT TRUE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
+            with self.get_cursor(cursor_factory=None) as cur:
+                create(cur)
+            return True
+        except Exception as e:
+            if required:
+                logger.error(f"❌ Ошибка создания таблиц ({title}): {e}")
+            else:
+                logger.warning(f"⚠️ Не удалось создать {title}, функция отключена: {e}")
+            return False
 
-                # Таблица цен для кэширования
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS price_history (
-                        id SERIAL PRIMARY KEY,
-                        symbol VARCHAR(20) NOT NULL,
-                        price DECIMAL(20, 8) NOT NULL,
-                        change_24h DECIMAL(10, 2),
-                        volume_24h DECIMAL(20, 2),
-                        high_24h DECIMAL(20, 8),
-                        low_24h DECIMAL(20, 8),
-                        timestamp TIMESTAMP NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (symbol) REFERENCES cryptocurrencies(symbol) ON DELETE CASCADE
-                    )
-                """)
+    @staticmethod
+    def _create_core_tables(cur):
+        # Таблица криптовалют
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cryptocurrencies (
+                id SERIAL PRIMARY KEY,
+                symbol VARCHAR(20) UNIQUE NOT NULL,
+                name VARCHAR(100) NOT NULL,
+                display_name VARCHAR(10),
+                emoji VARCHAR(5),
+                is_active BOOLEAN DEFAULT TRUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-                # Индексы для оптимизации
-                cur.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_crypto_symbol 
-                    ON cryptocurrencies(symbol)
-                """)
+        # Таблица цен для кэширования
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS price_history (
+                id SERIAL PRIMARY KEY,
+                symbol VARCHAR(20) NOT NULL,
+                price DECIMAL(20, 8) NOT NULL,
+                change_24h DECIMAL(10, 2),
+                volume_24h DECIMAL(20, 2),
+                high_24h DECIMAL(20, 8),
+                low_24h DECIMAL(20, 8),
+                timestamp TIMESTAMP NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (symbol) REFERENCES cryptocurrencies(symbol) ON DELETE CASCADE
+            )
+        """)
+
+        # Индексы для оптимизации
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_crypto_symbol 
+            ON cryptocurrencies(symbol)
+        """)
+
+    @staticmethod
+    def _create_search_indexes(cur):
+        # Регистронезависимый поиск по префиксу: UPPER(...) LIKE 'Q%'
+        # (text_pattern_ops - индекс работает при любой collation БД)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_crypto_symbol_upper
+            ON cryptocurrencies (UPPER(symbol) text_pattern_ops)
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_crypto_name_upper
+            ON cryptocurrencies (UPPER(name) text_pattern_ops)
+        """)
+
+    @staticmethod
+    def _create_price_history_indexes(cur):
+        # История символа: WHERE symbol = ... ORDER BY timestamp DESC без сортировки.
+        # Отдельный индекс по symbol - префикс составного и не нужен
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_price_history_symbol_timestamp
+            ON price_history (symbol, timestamp DESC)
+        """)
+        cur.execute("DROP INDEX IF EXISTS idx_price_history_symbol")
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_price_history_timestamp 
+            ON price_history(timestamp DESC)
+        """)
+
+    @staticmethod
+    def _create_rollup_tables(cur):
+        # Агрегаты price_history по корзинам 1m/1h/1d (rollup_price_history)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS price_rollups (
+                symbol VARCHAR(20) NOT NULL,
+                resolution VARCHAR(4) NOT NULL,
+                bucket TIMESTAMP NOT NULL,
+                open DECIMAL(20, 8) NOT NULL,
+                high DECIMAL(20, 8) NOT NULL,
+                low DECIMAL(20, 8) NOT NULL,
+                close DECIMAL(20, 8) NOT NULL,
+                volume_24h DECIMAL(20, 2),
+                samples INTEGER NOT NULL,
+                PRIMARY KEY (symbol, resolution, bucket),
+                FOREIGN KEY (symbol) REFERENCES cryptocurrencies(symbol) ON DELETE CASCADE
+            )
+        """)
+        # Последняя корзина разрешения и чистка по сроку хранения
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_price_rollups_resolution_bucket
+            ON price_rollups (resolution, bucket)
+        """)
+        # Сырые снимки после срока хранения (PRICE_HISTORY_ARCHIVE=true)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS price_history_archive (
+                symbol VARCHAR(20) NOT NULL,
+                price DECIMAL(20, 8) NOT NULL,
+                change_24h DECIMAL(10, 2),
+                volume_24h DECIMAL(20, 2),
+                high_24h DECIMAL(20, 8),
+                low_24h DECIMAL(20, 8),
+                timestamp TIMESTAMP NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_price_history_archive_timestamp_brin
+            ON price_history_archive USING BRIN (timestamp)
+        """)
+
+    @staticmethod
+    def _create_candle_tables(cur):
+        # Свечи: секции по месяцам open_time (мс UTC), создаются при записи.
+        # Первичный ключ (symbol, interval, open_time) отдает окно серии
+        # обратным сканом индекса, BRIN по open_time - диапазоны по времени
+        # для всех символов (строки пишутся почти по возрастанию времени)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol VARCHAR(20) NOT NULL,
+                "interval" VARCHAR(4) NOT NULL,
+                open_time BIGINT NOT NULL,
+                open DOUBLE PRECISION NOT NULL,
+                high DOUBLE PRECISION NOT NULL,
+                low DOUBLE PRECISION NOT NULL,
+                close DOUBLE PRECISION NOT NULL,
+                volume DOUBLE PRECISION NOT NULL,
+                turnover DOUBLE PRECISION NOT NULL DEFAULT 0,
+                PRIMARY KEY (symbol, "interval", open_time)
+            ) PARTITION BY RANGE (open_time)
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_candles_open_time_brin
+            ON candles USING BRIN (open_time)
+        """)
+
+    def _create_trigram_indexes(self) -> bool:
+        """Индексы pg_trgm для поиска по подстроке UPPER(...) LIKE '%Q%'
+
+        Без расширения (нет прав на CREATE EXTENSION или пакета contrib)
+        поиск по подстроке выполняется сканированием таблицы, но только
+        когда совпадений по префиксу не хватило на страницу.
+        """
+        try:
+            with self.get_cursor(cursor_factory=None) as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
                 cur.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_price_history_symbol 
-                    ON price_history(symbol)
+                    CREATE INDEX IF NOT EXISTS idx_crypto_symbol_trgm
+                    ON cryptocurrencies USING GIN (UPPER(symbol) gin_trgm_ops)
                 """)
                 cur.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_price_history_timestamp 
-                    ON price_history(timestamp DESC)
+                    CREATE INDEX IF NOT EXISTS idx_crypto_name_trgm
+                    ON cryptocurrencies USING GIN (UPPER(name) gin_trgm_ops)
                 """)
-
-                logger.info("✅ Таблицы БД созданы/проверены")
+            return True
         except Exception as e:
-            logger.error(f"❌ Ошибка создания таблиц: {e}")
+            logger.warning(f"⚠️ pg_trgm недоступен, поиск по подстроке без индекса: {e}")
+            return False
+
+    @staticmethod
+    def _like_escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def search_cryptocurrencies(self, query: str, limit: int = MAX_SEARCH_RESULTS) -> List[Dict]:
+        """Поиск криптовалют в БД: точное совпадение, префикс, затем подстрока
 
-    def search_cryptocurrencies(self, query: str) -> List[Dict]:
-        """Поиск криптовалют в БД"""
+        Совпадения по префиксу берутся из индексов по UPPER(symbol) и UPPER(name).
+        Подстрока ищется вторым запросом, только если страница не заполнена
+        (индекс pg_trgm, без него - сканирование таблицы).
+        """
         if not self.is_connected:
             logger.debug("🔍 Поиск: БД недоступна")
             return []
 
+        query = query.strip().upper()
+        if not query:
+            return []
+
         try:
             with self.get_cursor() as cur:
-                query_param = f"{query.upper()}%"
+                prefix = f"{self._like_escape(query)}%"
                 cur.execute("""
                     SELECT symbol, name, display_name, emoji
                     FROM cryptocurrencies
                     WHERE (UPPER(symbol) LIKE %s OR UPPER(name) LIKE %s)
                     AND is_active = TRUE
-                    ORDER BY 
-                        CASE 
-                            WHEN UPPER(symbol) = %s THEN 1
+                    ORDER BY
+                        CASE
+                            WHEN UPPER(symbol) = %s OR UPPER(name) = %s THEN 1
                             WHEN UPPER(symbol) LIKE %s THEN 2
                             ELSE 3
                         END,
                         symbol
-                    LIMIT 20
-                """, (query_param, f"%{query.upper()}%", query.upper(), query_param))
+                    LIMIT %s
+                """, (prefix, prefix, query, query, prefix, limit))
+                results = [dict(row) for row in cur.fetchall()]
+
+                if len(results) < limit:
+                    pattern = f"%{self._like_escape(query)}%"
+                    cur.execute("""
+                        SELECT symbol, name, display_name, emoji
+                        FROM cryptocurrencies
+                        WHERE (UPPER(symbol) LIKE %s OR UPPER(name) LIKE %s)
+                        AND NOT (UPPER(symbol) LIKE %s OR UPPER(name) LIKE %s)
+                        AND is_active = TRUE
+                        ORDER BY symbol
+                        LIMIT %s
+                    """, (pattern, pattern, prefix, prefix, limit - len(results)))
+                    results.extend(dict(row) for row in cur.fetchall())
 
-                results = cur.fetchall()
                 logger.debug(f"🔍 Найдено в БД: {len(results)} результатов для '{query}'")
-                return [dict(row) for row in results]
+                return results
         except Exception as e:
             logger.error(f"❌ Ошибка поиска: {e}")
             return []
@@ -190,6 +593,46 @@ class Database:
             logger.error(f"❌ Ошибка получения списка: {e}")
             return []
 
+    def sync_instruments(self, items: List[Dict], deactivate_missing: bool = True) -> Dict:
+        """Синхронизировать каталог инструментов Bybit с таблицей cryptocurrencies
+
+        items - записи InstrumentCatalog (symbol, name, display_name, emoji).
+        Новые символы добавляются пачками через execute_values. У уже
+        известных символов названия не перезаписываются (у популярных они
+        заданы вручную), они только снова помечаются активными. Символы,
+        которых нет в каталоге, деактивируются.
+        """
+        if not self.is_connected or not items:
+            return {'synced': 0, 'deactivated': 0}
+
+        # Длины колонок таблицы: слишком длинные символы пропускаются, остальное обрезается
+        rows = [(item['symbol'], item['name'][:100], item['display_name'][:10], item.get('emoji', '')[:5])
+                for item in items if len(item['symbol']) <= 20]
+        try:
+            with self.get_cursor(cursor_factory=None) as cur:
+                execute_values(cur, """
+                    INSERT INTO cryptocurrencies (symbol, name, display_name, emoji)
+                    VALUES %s
+                    ON CONFLICT (symbol) DO UPDATE SET
+                        is_active = TRUE,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE NOT cryptocurrencies.is_active
+                """, rows, page_size=DB_INSERT_PAGE_SIZE)
+
+                deactivated = 0
+                if deactivate_missing:
+                    cur.execute("""
+                        UPDATE cryptocurrencies
+                        SET is_active = FALSE, updated_at = CURRENT_TIMESTAMP
+                        WHERE is_active = TRUE AND NOT (symbol = ANY(%s))
+                    """, ([row[0] for row in rows],))
+                    deactivated = cur.rowcount
+            logger.info(f"💾 Каталог синхронизирован: {len(rows)} символов, деактивировано {deactivated}")
+            return {'synced': len(rows), 'deactivated': deactivated}
+        except Exception as e:
+            logger.error(f"❌ Ошибка синхронизации каталога: {e}")
+            return {'synced': 0, 'deactivated': 0}
+
     def cache_price_history(self, symbol: str, price: float, change_24h: float,
                            volume_24h: float, high_24h: float, low_24h: float) -> bool:
         """Кэширование истории цен"""
@@ -201,13 +644,43 @@ class Database:
                 cur.execute("""
                     INSERT INTO price_history 
                     (symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, NOW())
+                    VALUES (%s, %s, %s, %s, %s, %s, NOW() AT TIME ZONE 'UTC')
                 """, (symbol, price, change_24h, volume_24h, high_24h, low_24h))
                 return True
         except Exception as e:
             logger.error(f"❌ Ошибка кэширования: {e}")
             return False
 
+    def insert_price_snapshots(self, rows: Sequence[Tuple]) -> Optional[int]:
+        """Записать пачку снимков (symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp)
+
+        Один INSERT на страницу строк вместо транзакции на снимок. Снимки
+        символов, которых нет в cryptocurrencies, пропускаются, а не
+        откатывают всю пачку по внешнему ключу. Возвращает число вставленных
+        строк, None - ошибка записи (пачка не записана).
+        """
+        if not rows:
+            return 0
+        if not self.is_connected:
+            return None
+
+        try:
+            written = 0
+            with self.get_cursor(cursor_factory=None) as cur:
+                # rowcount после execute_values - только по последней странице, поэтому страницы отдельно
+                for start in range(0, len(rows), DB_INSERT_PAGE_SIZE):
+                    execute_values(cur, """
+                        INSERT INTO price_history (symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp)
+                        SELECT v.symbol, v.price, v.change_24h, v.volume_24h, v.high_24h, v.low_24h, v.timestamp
+                        FROM (VALUES %s) AS v (symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp)
+                        WHERE EXISTS (SELECT 1 FROM cryptocurrencies c WHERE c.symbol = v.symbol)
+                    """, rows[start:start + DB_INSERT_PAGE_SIZE], page_size=DB_INSERT_PAGE_SIZE)
+                    written += cur.rowcount
+            return written
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи снимков цен: {e}")
+            return None
+
     def get_price_history(self, symbol: str, limit: int = 100) -> List[Dict]:
         """Получение истории цен из кэша"""
         if not self.is_connected:
@@ -228,13 +701,267 @@ class Database:
             logger.error(f"❌ Ошибка получения истории: {e}")
             return []
 
+    def rollup_price_history(self, lag: float = PRICE_ROLLUP_LAG) -> Dict[str, int]:
+        """Досчитать агрегаты 1m/1h/1d до последней закрытой корзины
+
+        Каждое разрешение пересчитывается от своей последней корзины (в нее
+        могли попасть опоздавшие снимки) кусками из PRICE_ROLLUPS, каждый в
+        своей транзакции, чтобы не упираться в statement_timeout. Пересчет
+        идемпотентен (upsert), а advisory lock не дает нескольким процессам
+        делать одну и ту же работу. Возвращает число записанных корзин.
+        """
+        rolled = {resolution: 0 for resolution in PRICE_ROLLUPS}
+        if not self.is_connected:
+            return rolled
+
+        try:
+            for resolution, (unit, source, chunk) in PRICE_ROLLUPS.items():
+                with self.get_cursor(cursor_factory=None) as cur:
+                    cur.execute("""
+                        SELECT date_trunc(%s, (now() AT TIME ZONE 'UTC') - %s * interval '1 second'),
+                               (SELECT max(bucket) FROM price_rollups WHERE resolution = %s)
+                    """, (unit, lag, resolution))
+                    end, start = cur.fetchone()
+                    if start is None:
+                        if source is None:
+                            cur.execute("SELECT date_trunc(%s, min(timestamp)) FROM price_history", (unit,))
+                        else:
+                            cur.execute("SELECT date_trunc(%s, min(bucket)) FROM price_rollups WHERE resolution = %s",
+                                        (unit, source))
+                        start = cur.fetchone()[0]
+
+                while start is not None and start < end:
+                    params = {'resolution': resolution, 'unit': unit, 'source': source,
+                              'start': start, 'end': min(start + chunk, end)}
+                    with self.get_cursor(cursor_factory=None) as cur:
+                        cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (PRICE_ROLLUP_LOCK,))
+                        if not cur.fetchone()[0]:
+                            logger.debug("💾 Агрегаты цен пересчитывает другой процесс")
+                            return rolled
+                        cur.execute(ROLLUP_FROM_RAW if source is None else ROLLUP_FROM_ROLLUP, params)
+                        rolled[resolution] += cur.rowcount
+                    start = params['end']
+        except Exception as e:
+            logger.error(f"❌ Ошибка пересчета агрегатов цен: {e}")
+        return rolled
+
+    def _delete_batched(self, query: str, params: Tuple, batch: int) -> int:
+        """Выполнять DELETE с LIMIT batch (последний параметр), пока он удаляет полную пачку"""
+        total = 0
+        while True:
+            with self.get_cursor(cursor_factory=None) as cur:
+                cur.execute(query, (*params, batch))
+                total += cur.rowcount
+                if cur.rowcount < batch:
+                    return total
+
+    def apply_price_retention(self, raw_days: int = PRICE_RAW_RETENTION_DAYS,
+                              rollup_days: Optional[Dict[str, Optional[int]]] = None,
+                              archive: bool = PRICE_HISTORY_ARCHIVE, batch: int = PRICE_RETENTION_BATCH) -> Dict[str, int]:
+        """Удалить строки старше срока хранения; сырые снимки - в архив, если archive
+
+        Сырой снимок удаляется, только если его минута уже есть в агрегате 1m.
+        Удаление идет пачками по batch строк, каждая в своей транзакции, чтобы
+        не держать долгих блокировок.
+        """
+        rollup_days = PRICE_ROLLUP_RETENTION_DAYS if rollup_days is None else rollup_days
+        removed = {'raw': 0, **{resolution: 0 for resolution in PRICE_ROLLUPS}}
+        if not self.is_connected:
+            return removed
+
+        try:
+            with self.get_cursor(cursor_factory=None) as cur:
+                cur.execute("""
+                    SELECT (now() AT TIME ZONE 'UTC') - %s * interval '1 day',
+                           (SELECT max(bucket) FROM price_rollups WHERE resolution = '1m')
+                """, (raw_days,))
+                horizon, rolled_until = cur.fetchone()
+
+            if rolled_until is not None:
+                selected = "SELECT id FROM price_history WHERE timestamp < %s LIMIT %s"
+                if archive:
+                    query = f"""
+                        WITH moved AS (
+                            DELETE FROM price_history WHERE id IN ({selected})
+                            RETURNING symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp
+                        )
+                        INSERT INTO price_history_archive
+                            (symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp)
+                        SELECT * FROM moved
+                    """
+                else:
+                    query = f"DELETE FROM price_history WHERE id IN ({selected})"
+                removed['raw'] = self._delete_batched(query, (min(horizon, rolled_until),), batch)
+
+            for resolution, days in rollup_days.items():
+                if days is None:
+                    continue
+                removed[resolution] = self._delete_batched("""
+                    DELETE FROM price_rollups WHERE ctid = ANY(ARRAY(
+                        SELECT ctid FROM price_rollups
+                        WHERE resolution = %s AND bucket < (now() AT TIME ZONE 'UTC') - %s * interval '1 day'
+                        LIMIT %s
+                    ))
+                """, (resolution, days), batch)
+        except Exception as e:
+            logger.error(f"❌ Ошибка очистки истории цен: {e}")
+        return removed
+
+    @staticmethod
+    def price_range_resolution(start: datetime, end: datetime, max_points: int = PRICE_RANGE_MAX_POINTS,
+                               now: Optional[datetime] = None) -> str:
+        """Самое подробное разрешение ('raw', '1m', '1h', '1d'), в которое период укладывается в max_points"""
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        span = (end - start).total_seconds()
+        if span / PRICE_SNAPSHOT_INTERVAL <= max_points and start >= now - timedelta(days=PRICE_RAW_RETENTION_DAYS):
+            return 'raw'
+        for resolution, seconds in RESOLUTION_SECONDS.items():
+            days = PRICE_ROLLUP_RETENTION_DAYS.get(resolution)
+            if span / seconds <= max_points and (days is None or start >= now - timedelta(days=days)):
+                return resolution
+        return '1d'
+
+    def get_price_history_range(self, symbol: str, start: datetime, end: Optional[datetime] = None,
+                                max_points: int = PRICE_RANGE_MAX_POINTS) -> Dict:
+        """История цены за период: {'resolution': ..., 'points': [{timestamp, open, high, low, close, volume_24h}]}
+
+        Короткие свежие периоды читаются из сырых снимков, длинные - из
+        агрегатов, поэтому запрос читает не больше ~max_points строк по
+        индексу независимо от размера price_history. Текущая корзина
+        появляется в агрегатах после следующего пересчета. Время - UTC без
+        tzinfo, как в столбцах timestamp/bucket.
+        """
+        end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+        resolution = self.price_range_resolution(start, end, max_points)
+        # Без таблицы агрегатов (create_tables) есть только сырые снимки за срок хранения
+        if not self.is_connected or (resolution != 'raw' and not self.has_rollups):
+            return {'resolution': resolution, 'points': []}
+
+        try:
+            with self.get_cursor() as cur:
+                if resolution == 'raw':
+                    self.execute_prepared(cur, 'price_history_range', (symbol, start, end))
+                else:
+                    self.execute_prepared(cur, 'price_rollups', (symbol, resolution, start, end))
+                return {'resolution': resolution, 'points': [dict(row) for row in cur.fetchall()]}
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения истории за период: {e}")
+            return {'resolution': resolution, 'points': []}
+
+    @staticmethod
+    def _month_bounds(open_time: int) -> Tuple[datetime, datetime]:
+        start = datetime.fromtimestamp(open_time / 1000, tz=timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        return start, end
+
+    def ensure_candle_partitions(self, cur, first_open: int, last_open: int) -> List[str]:
+        """Создать месячные секции candles для диапазона open_time (мс), вернуть новые имена
+
+        Имена запоминаются вызывающим только после commit: при откате
+        транзакции секция будет создана заново при следующей записи.
+        """
+        created = []
+        month, _ = self._month_bounds(first_open)
+        while int(month.timestamp() * 1000) <= last_open:
+            start, end = self._month_bounds(int(month.timestamp() * 1000))
+            name = f"candles_{start:%Y%m}"
+            if name not in self._candle_partitions:
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {name} PARTITION OF candles
+                    FOR VALUES FROM ({int(start.timestamp() * 1000)}) TO ({int(end.timestamp() * 1000)})
+                """)
+                created.append(name)
+            month = end
+        return created
+
+    def upsert_candle_rows(self, rows: Sequence[Tuple], method: Optional[str] = None) -> Optional[int]:
+        """Записать строки (symbol, interval, open_time, open, high, low, close, volume, turnover)
+
+        Повторная запись свечи обновляет ее (последняя свеча могла быть еще не
+        закрыта). method: 'copy' - COPY во временную таблицу и один INSERT ...
+        SELECT, 'values' - execute_values пачками; по умолчанию выбирается по
+        числу строк. Возвращает число записанных строк, None - ошибка записи.
+        """
+        if not rows:
+            return 0
+        if not self.is_connected:
+            return None
+
+        # Одна команда INSERT ... ON CONFLICT не может обновить строку дважды
+        rows = list({(r[0], r[1], int(r[2])): r for r in rows}.values())
+        method = method or ('copy' if len(rows) >= CANDLE_COPY_MIN_ROWS else 'values')
+        try:
+            with self.get_cursor(cursor_factory=None) as cur:
+                open_times = [int(r[2]) for r in rows]
+                created = self.ensure_candle_partitions(cur, min(open_times), max(open_times))
+                if method == 'copy':
+                    self._copy_candle_rows(cur, rows)
+                else:
+                    execute_values(cur, """
+                        INSERT INTO candles (symbol, "interval", open_time, open, high, low, close, volume, turnover)
+                        VALUES %s
+                        ON CONFLICT (symbol, "interval", open_time) DO UPDATE SET
+                            open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                            close = EXCLUDED.close, volume = EXCLUDED.volume, turnover = EXCLUDED.turnover
+                    """, rows, page_size=DB_INSERT_PAGE_SIZE)
+            self._candle_partitions.update(created)
+            return len(rows)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи свечей: {e}")
+            return None
+
+    @staticmethod
+    def _copy_candle_rows(cur, rows: Iterable[Tuple]):
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS candles_stage
+            (LIKE candles INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+        """)
+        buffer = io.StringIO()
+        buffer.writelines(f"{s}\t{i}\t{int(t)}\t{o!r}\t{h!r}\t{l!r}\t{c!r}\t{v!r}\t{q!r}\n"
+                          for s, i, t, o, h, l, c, v, q in rows)
+        buffer.seek(0)
+        cur.copy_expert("""
+            COPY candles_stage (symbol, "interval", open_time, open, high, low, close, volume, turnover)
+            FROM STDIN
+        """, buffer)
+        cur.execute("""
+            INSERT INTO candles
+            SELECT * FROM candles_stage
+            ON CONFLICT (symbol, "interval", open_time) DO UPDATE SET
+                open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                close = EXCLUDED.close, volume = EXCLUDED.volume, turnover = EXCLUDED.turnover
+        """)
+
+    def save_candles(self, symbol: str, interval: str, candles: Candles) -> Optional[int]:
+        """Сохранить свечи серии (symbol, interval)"""
+        rows = zip([symbol] * len(candles), [interval] * len(candles), candles.ts.tolist(),
+                   candles.open.tolist(), candles.high.tolist(), candles.low.tolist(),
+                   candles.close.tolist(), candles.volume.tolist(), candles.turnover.tolist())
+        return self.upsert_candle_rows(list(rows))
+
+    def get_candles(self, symbol: str, interval: str, limit: int,
+                    end: Optional[int] = None) -> Optional[Candles]:
+        """Последние limit свечей серии с open_time <= end (None - БД недоступна)"""
+        if not self.is_connected:
+            return None
+
+        try:
+            with self.get_cursor(cursor_factory=None) as cur:
+                self.execute_prepared(cur, 'candles_window',
+                                      (symbol, interval, end if end is not None else 2 ** 62, limit))
+                # Тот же порядок колонок, что у свечей Bybit
+                return Candles.from_bybit(cur.fetchall(), newest_first=True)
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения свечей: {e}")
+            return None
+
     def close(self):
-        """Закрытие соединения"""
+        """Закрытие всех соединений пула"""
         try:
-            if self.conn:
-                self.conn.close()
-                self.is_connected = False
-                logger.info("✅ БД соединение закрыто")
+            if self.pool:
+                self._close_pool()
+                logger.info("✅ БД соединения закрыты")
         except Exception as e:
             logger.error(f"❌ Ошибка закрытия: {e}")
 
@@ -0,0 +1,76 @@
+import numpy as np
+from typing import List, Tuple
+
+
+class WindowForecaster:
+    """Общая часть прогноза по окну для Keras и NumPy моделей
+
+    Масштабирование окон, рекурсивный прогноз и обратное преобразование.
+    Наследник реализует _infer (прямой проход) и _global_bounds (min и
+    размах ряда для scaling='global').
+
+    scaling='global' - MinMaxScaler по всему ряду символа (модель одного
+    символа); scaling='window' - каждое окно приводится к [0, 1] по своим
+    min/max, так одна общая модель обслуживает символы с разным уровнем цен.
+    horizon > 1 - выходной слой сразу на horizon шагов вперед.
+    """
+
+    def __init__(self, sequence_length: int = 60, horizon: int = 1, scaling: str = 'global'):
+        if scaling not in ('global', 'window'):
+            raise ValueError(f"Unknown scaling: {scaling}")
+        if not 1 <= horizon <= sequence_length:
+            raise ValueError("horizon must be between 1 and sequence_length")
+        self.sequence_length = sequence_length
+        self.horizon = horizon
+        self.scaling = scaling
+        self.is_trained = False
+
+    def _infer(self, x: np.ndarray) -> np.ndarray:
+        """Один прямой проход: (batch, sequence_length, 1) -> (batch, horizon)"""
+        raise NotImplementedError
+
+    def _global_bounds(self) -> Tuple[float, float]:
+        raise NotImplementedError
+
+    def _bounds(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Минимум и размах для каждого окна X формы (m, sequence_length)"""
+        if self.scaling == 'window':
+            low, high = X.min(axis=1), X.max(axis=1)
+            return low, np.where(high > low, high - low, 1.0)
+        data_min, data_range = self._global_bounds()
+        count = len(X)
+        return np.full(count, data_min), np.full(count, data_range or 1.0)
+
+    def _rollout(self, x: np.ndarray, steps: int) -> np.ndarray:
+        """Рекурсивный прогноз steps шагов для всего batch сразу
+
+        Каждый проход дает horizon шагов, окна сдвигаются на них же:
+        ceil(steps / horizon) проходов независимо от числа рядов в batch.
+        """
+        outputs, produced = [], 0
+        while produced < steps:
+            step = self._infer(x)[:, :steps - produced]
+            outputs.append(step)
+            produced += step.shape[1]
+            x = np.concatenate((x[:, step.shape[1]:, :], step[:, :, np.newaxis].astype(np.float32)), axis=1)
+        return np.concatenate(outputs, axis=1)
+
+    def forecast(self, prices: List[float], future_steps: int = 10) -> List[float]:
+        """Синхронный прогноз (для вызова в пуле потоков, не блокируя event loop)"""
+        return self.forecast_batch([prices], future_steps)[0].tolist()
+
+    def forecast_batch(self, series: List[List[float]], future_steps: int = 10) -> np.ndarray:
+        """Прогноз для нескольких рядов одним batch: массив (len(series), future_steps)"""
+        if not self.is_trained:
+            raise ValueError("Model not trained")
+
+        # Используем последние sequence_length цен каждого ряда
+        last = np.stack([np.asarray(prices[-self.sequence_length:], dtype=np.float64) for prices in series])
+        if last.shape[1] != self.sequence_length:
+            raise ValueError(f"Need at least {self.sequence_length} prices per series")
+
+        low, span = self._bounds(last)
+        scaled = ((last - low[:, None]) / span[:, None])[:, :, np.newaxis].astype(np.float32)
+
+        # Обратное преобразование к нормальным ценам
+        return self._rollout(scaled, future_steps) * span[:, None] + low[:, None]
@@ -9,15 +9,21 @@ import os
 from typing import List, Tuple, Optional
 import asyncio
 
+from models import windows
+from models.forecaster import WindowForecaster
+from models.numpy_lstm import export_npz
 
-class LSTMPredictor:
-    def __init__(self, sequence_length: int = 60):
-        self.sequence_length = sequence_length
+
+class LSTMPredictor(WindowForecaster):
+    """LSTM прогноз цены закрытия на Keras (обучение и экспорт в .npz)"""
+
+    def __init__(self, sequence_length: int = 60, horizon: int = 1, scaling: str = 'global'):
+        super().__init__(sequence_length, horizon, scaling)
         self.model: Optional[Sequential] = None
         self.scaler = MinMaxScaler(feature_range=(0, 1))
-        self.is_trained = False
+        self._compiled = None
 
-    def create_model(self, input_shape: Tuple[int, int]) -> Sequential:
+    def create_model(self, input_shape: Tuple[int, int], horizon: int = 1) -> Sequential:
         """Создание LSTM модели"""
         model = Sequential([
             LSTM(50, return_sequences=True, input_shape=input_shape),
@@ -27,7 +33,7 @@ class LSTMPredictor:
             LSTM(50, return_sequences=False),
             Dropout(0.2),
             Dense(25),
-            Dense(1)
+            Dense(horizon)
         ])
 
         model.compile(optimizer='adam', loss='mean_squared_error')
@@ -35,36 +41,70 @@ class LSTMPredictor:
 
     async def prepare_data(self, prices: List[float]) -> Tuple[np.ndarray, np.ndarray]:
         """Подготовка данных для обучения"""
+        return self._prepare(prices)
+
+    def _prepare(self, prices: List[float]) -> Tuple[np.ndarray, np.ndarray]:
         # Нормализация данных
         prices_array = np.array(prices).reshape(-1, 1)
         scaled_data = self.scaler.fit_transform(prices_array)
 
-        # Создание последовательностей
-        X, y = [], []
-        for i in range(self.sequence_length, len(scaled_data)):
-            X.append(scaled_data[i - self.sequence_length:i, 0])
-            y.append(scaled_data[i, 0])
+        # Окна (m, sequence_length, 1) - представления над scaled_data,
+        # копируются только при передаче в model.fit
+        return windows.sequences(scaled_data, self.sequence_length, self.horizon)
 
-        return np.array(X), np.array(y)
+    def _global_bounds(self) -> Tuple[float, float]:
+        return float(self.scaler.data_min_[0]), float(self.scaler.data_range_[0])
+
+    def _prepare_windows(self, prices: List[float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Окна одного ряда в масштабе модели: X, y и границы окон для обратного преобразования"""
+        if self.scaling == 'global':
+            X, y = self._prepare(prices)
+            low, span = self._bounds(X[:, :, 0])
+            return X, y.reshape(len(y), -1), low, span
+
+        X, y = windows.sequences(np.asarray(prices, dtype=np.float64), self.sequence_length, self.horizon)
+        low, span = self._bounds(X)
+        X = ((X - low[:, None]) / span[:, None])[..., np.newaxis]
+        y = (y.reshape(len(y), -1) - low[:, None]) / span[:, None]
+        return X, y, low, span
 
     async def train(self, prices: List[float], epochs: int = 50, batch_size: int = 32) -> dict:
         """Обучение модели на исторических данных"""
+        return self.fit(prices, epochs, batch_size)
+
+    def fit(self, prices: List[float], epochs: int = 50, batch_size: int = 32) -> dict:
+        """Синхронное обучение (для офлайн-обучения в отдельном процессе)"""
         if len(prices) < self.sequence_length + 100:
             raise ValueError(f"Need at least {self.sequence_length + 100} data points for training")
+        return self.fit_many([prices], epochs, batch_size)
 
-        # Подготовка данных
-        X, y = await self.prepare_data(prices)
+    def fit_many(self, series: List[List[float]], epochs: int = 50, batch_size: int = 32) -> dict:
+        """Обучение на нескольких рядах (общая модель, scaling='window')
 
-        # Reshape данных для LSTM
-        X = X.reshape(X.shape[0], X.shape[1], 1)
+        Каждый ряд делится на train/test 80/20 по времени отдельно.
+        """
+        if self.scaling == 'global' and len(series) != 1:
+            raise ValueError("Global scaling trains on a single series, use scaling='window'")
 
-        # Разделение на train/test
-        split = int(0.8 * len(X))
-        X_train, X_test = X[:split], X[split:]
-        y_train, y_test = y[:split], y[split:]
+        parts = [self._prepare_windows(prices) for prices in series
+                 if len(prices) >= self.sequence_length + self.horizon + 10]
+        if not parts or sum(len(X) for X, _, _, _ in parts) < 100:
+            raise ValueError(f"Need at least 100 training windows of {self.sequence_length} points")
+
+        train, test = [], []
+        for X, y, low, span in parts:
+            split = int(0.8 * len(X))
+            train.append((X[:split], y[:split]))
+            test.append((X[split:], y[split:], low[split:], span[split:]))
+
+        X_train = np.concatenate([X for X, _ in train])
+        y_train = np.concatenate([y for _, y in train])
+        X_test = np.concatenate([X for X, _, _, _ in test])
+        y_test = np.concatenate([y for _, y, _, _ in test])
 
         # Создание и обучение модели
-        self.model = self.create_model((X.shape[1], 1))
+        self.model = self.create_model((self.sequence_length, 1), self.horizon)
+        self._compiled = None
 
         history = self.model.fit(
             X_train, y_train,
@@ -76,38 +116,44 @@ class LSTMPredictor:
 
         self.is_trained = True
 
+        # Ошибка на отложенной выборке в ценах, а не в масштабе модели
+        low = np.concatenate([low for _, _, low, _ in test])[:, None]
+        span = np.concatenate([span for _, _, _, span in test])[:, None]
+        val_pred = self._infer(X_test.astype(np.float32)) * span + low
+        val_true = y_test * span + low
+
         return {
-            'train_loss': history.history['loss'][-1],
-            'val_loss': history.history['val_loss'][-1],
+            'train_loss': float(history.history['loss'][-1]),
+            'val_loss': float(history.history['val_loss'][-1]),
+            'val_rmse': float(np.sqrt(np.mean((val_pred - val_true) ** 2))),
             'epochs': len(history.history['loss'])
         }
 
+    def _infer(self, x: np.ndarray) -> np.ndarray:
+        """Один прямой проход: (batch, sequence_length, 1) -> (batch, horizon)
+
+        Вместо model.predict (на каждый вызов строится конвейер данных и
+        callbacks) - скомпилированный tf.function над model(x, training=False);
+        сигнатура с произвольным batch не вызывает повторной трассировки.
+        """
+        if self._compiled is None:
+            model = self.model
+            self._compiled = tf.function(
+                lambda batch: model(batch, training=False),
+                input_signature=[tf.TensorSpec([None, self.sequence_length, 1], tf.float32)]
+            )
+        return self._compiled(tf.convert_to_tensor(x, dtype=tf.float32)).numpy()
+
     async def predict(self, prices: List[float], future_steps: int = 10) -> List[float]:
         """Прогнозирование будущих цен"""
-        if not self.is_trained or self.model is None:
-            raise ValueError("Model not trained")
-
-        # Используем последние sequence_length цен для прогноза
-        last_sequence = prices[-self.sequence_length:]
-        scaled_sequence = self.scaler.transform(np.array(last_sequence).reshape(-1, 1))
-
-        predictions = []
-        current_sequence = scaled_sequence.reshape(1, self.sequence_length, 1)
-
-        for _ in range(future_steps):
-            # Прогноз следующего значения
-            next_pred = self.model.predict(current_sequence, verbose=0)
-            predictions.append(float(next_pred[0, 0]))
-
-            # Обновление последовательности
-            current_sequence = np.append(current_sequence[:, 1:, :], next_pred.reshape(1, 1, 1), axis=1)
-
-        # Обратное преобразование к нормальным ценам
-        predictions = self.scaler.inverse_transform(np.array(predictions).reshape(-1, 1))
-        return [float(p[0]) for p in predictions]
+        return self.forecast(prices, future_steps)
 
     async def save_model(self, symbol: str, directory: str = "data/models"):
         """Сохранение модели"""
+        self.save(symbol, directory)
+
+    def save(self, symbol: str, directory: str = "data/models"):
+        """Синхронное сохранение модели и scaler"""
         if not self.is_trained or self.model is None:
             raise ValueError("No model to save")
 
@@ -118,20 +164,36 @@ class LSTMPredictor:
         # Сохранение модели
         self.model.save(model_path)
 
-        # Сохранение scaler
-        scaler_data = {
-            'min_': self.scaler.min_.tolist(),
-            'scale_': self.scaler.scale_.tolist(),
-            'data_min_': self.scaler.data_min_.tolist(),
-            'data_max_': self.scaler.data_max_.tolist(),
-            'data_range_': self.scaler.data_range_.tolist()
-        }
+        # Сохранение scaler (для scaling='window' параметров нет)
+        scaler_data = {'scaling': self.scaling, 'horizon': self.horizon}
+        if self.scaling == 'global':
+            scaler_data.update({
+                'min_': self.scaler.min_.tolist(),
+                'scale_': self.scaler.scale_.tolist(),
+                'data_min_': self.scaler.data_min_.tolist(),
+                'data_max_': self.scaler.data_max_.tolist(),
+                'data_range_': self.scaler.data_range_.tolist()
+            })
 
         with open(scaler_path, 'w') as f:
             json.dump(scaler_data, f)
 
+    def export(self, symbol: str, directory: str = "data/models") -> str:
+        """Экспорт весов в {symbol}_lstm.npz для NumPy рантайма (без TensorFlow в API)"""
+        if not self.is_trained or self.model is None:
+            raise ValueError("No model to export")
+
+        data_min, data_range = self._global_bounds() if self.scaling == 'global' else (0.0, 1.0)
+        path = os.path.join(directory, f"{symbol}_lstm.npz")
+        export_npz(self.model, path, self.sequence_length, self.horizon, self.scaling, data_min, data_range)
+        return path
+
     async def load_model(self, symbol: str, directory: str = "data/models"):
         """Загрузка модели"""
+        self.load(symbol, directory)
+
+    def load(self, symbol: str, directory: str = "data/models"):
+        """Синхронная загрузка модели и scaler"""
         model_path = os.path.join(directory, f"{symbol}_lstm.h5")
         scaler_path = os.path.join(directory, f"{symbol}_scaler.json")
 
@@ -140,15 +202,20 @@ class LSTMPredictor:
 
         # Загрузка модели
         self.model = load_model(model_path)
+        self.sequence_length = int(self.model.input_shape[1])
+        self.horizon = int(self.model.output_shape[-1])
+        self._compiled = None
 
         # Загрузка scaler
         with open(scaler_path, 'r') as f:
             scaler_data = json.load(f)
 
-        self.scaler.min_ = np.array(scaler_data['min_'])
-        self.scaler.scale_ = np.array(scaler_data['scale_'])
-        self.scaler.data_min_ = np.array(scaler_data['data_min_'])
-        self.scaler.data_max_ = np.array(scaler_data['data_max_'])
-        self.scaler.data_range_ = np.array(scaler_data['data_range_'])
+        self.scaling = scaler_data.get('scaling', 'global')
+        if self.scaling == 'global':
+            self.scaler.min_ = np.array(scaler_data['min_'])
+            self.scaler.scale_ = np.array(scaler_data['scale_'])
+            self.scaler.data_min_ = np.array(scaler_data['data_min_'])
+            self.scaler.data_max_ = np.array(scaler_data['data_max_'])
+            self.scaler.data_range_ = np.array(scaler_data['data_range_'])
 
-        self.is_trained = True
\ No newline at end of file
+        self.is_trained = True
@@ -0,0 +1,148 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from models.forecaster import WindowForecaster
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # Через tanh: без переполнения exp на больших отрицательных x
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _hard_sigmoid(x: np.ndarray) -> np.ndarray:
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'relu': lambda x: np.maximum(x, 0.0),
+}
+
+
+def export_npz(model, path: str, sequence_length: int, horizon: int, scaling: str,
+               data_min: float, data_range: float):
+    """Сохранить веса Keras модели (LSTM/Dense/Dropout) в .npz
+
+    Файл самодостаточен: конфигурация слоев и параметры масштабирования
+    лежат рядом с весами, для инференса нужен только NumPy.
+    """
+    arrays, layers = {}, []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind in ('Dropout', 'InputLayer'):
+            continue
+        weights = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+        name = f"layer{len(layers)}"
+        if kind == 'LSTM':
+            if not config.get('use_bias', True) or config.get('go_backwards') or config.get('stateful'):
+                raise ValueError(f"Unsupported LSTM configuration in {layer.name}")
+            layers.append({'type': 'lstm', 'activation': config['activation'],
+                           'recurrent_activation': config['recurrent_activation'],
+                           'return_sequences': bool(config['return_sequences'])})
+            arrays[f"{name}_kernel"], arrays[f"{name}_recurrent"], arrays[f"{name}_bias"] = weights
+        elif kind == 'Dense':
+            if not config.get('use_bias', True):
+                raise ValueError(f"Unsupported Dense configuration in {layer.name}")
+            layers.append({'type': 'dense', 'activation': config['activation']})
+            arrays[f"{name}_kernel"], arrays[f"{name}_bias"] = weights
+        else:
+            raise ValueError(f"Unsupported layer for export: {kind}")
+
+    for layer in layers:
+        for key in ('activation', 'recurrent_activation'):
+            if key in layer and layer[key] not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {layer[key]}")
+
+    config = {'layers': layers, 'sequence_length': sequence_length, 'horizon': horizon,
+              'scaling': scaling, 'data_min': float(data_min), 'data_range': float(data_range)}
+    with open(path, 'wb') as f:
+        np.savez(f, config=np.array(json.dumps(config)), **arrays)
+
+
+def lstm_forward(x: np.ndarray, kernel: np.ndarray, recurrent: np.ndarray, bias: np.ndarray,
+                 activation=np.tanh, recurrent_activation=_sigmoid, return_sequences: bool = False) -> np.ndarray:
+    """Слой LSTM в порядке гейтов Keras (i, f, c, o): (batch, steps, in) -> (batch, [steps,] units)"""
+    batch, steps, _ = x.shape
+    units = recurrent.shape[0]
+
+    # Входная часть для всех шагов сразу - одно матричное умножение
+    projected = x @ kernel + bias
+    h = np.zeros((batch, units), dtype=x.dtype)
+    c = np.zeros((batch, units), dtype=x.dtype)
+    outputs = np.empty((batch, steps, units), dtype=x.dtype) if return_sequences else None
+
+    for t in range(steps):
+        z = projected[:, t] + h @ recurrent
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        g = activation(z[:, 2 * units:3 * units])
+        o = recurrent_activation(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * activation(c)
+        if outputs is not None:
+            outputs[:, t] = h
+    return outputs if return_sequences else h
+
+
+class NumpyLSTMPredictor(WindowForecaster):
+    """Прогноз по весам из .npz без TensorFlow
+
+    Импорт - только NumPy, память - только веса (сотни КБ на модель), поэтому
+    API процессы могут держать реальные модели без загрузки TensorFlow.
+    """
+
+    def __init__(self, sequence_length: int = 60, horizon: int = 1, scaling: str = 'global'):
+        super().__init__(sequence_length, horizon, scaling)
+        self.layers: List[Tuple[Dict, Dict[str, np.ndarray]]] = []
+        self.data_min = 0.0
+        self.data_range = 1.0
+
+    @classmethod
+    def from_file(cls, path: str) -> 'NumpyLSTMPredictor':
+        with np.load(path) as data:
+            config = json.loads(str(data['config']))
+            arrays = {key: data[key] for key in data.files if key != 'config'}
+
+        predictor = cls(config['sequence_length'], config['horizon'], config['scaling'])
+        predictor.data_min = config['data_min']
+        predictor.data_range = config['data_range']
+        for index, layer in enumerate(config['layers']):
+            prefix = f"layer{index}_"
+            weights = {key[len(prefix):]: value for key, value in arrays.items() if key.startswith(prefix)}
+            predictor.layers.append((layer, weights))
+        predictor.is_trained = True
+        return predictor
+
+    def load(self, symbol: str, directory: str = "data/models"):
+        """Загрузка {symbol}_lstm.npz"""
+        path = os.path.join(directory, f"{symbol}_lstm.npz")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model for {symbol} not found")
+        loaded = self.from_file(path)
+        self.__dict__.update(loaded.__dict__)
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(w.nbytes for _, weights in self.layers for w in weights.values()))
+
+    def _global_bounds(self) -> Tuple[float, float]:
+        return self.data_min, self.data_range
+
+    def _infer(self, x: np.ndarray) -> np.ndarray:
+        out = np.asarray(x, dtype=np.float32)
+        for layer, weights in self.layers:
+            activation = ACTIVATIONS[layer['activation']]
+            if layer['type'] == 'lstm':
+                out = lstm_forward(out, weights['kernel'], weights['recurrent'], weights['bias'],
+                                   activation, ACTIVATIONS[layer['recurrent_activation']],
+                                   layer['return_sequences'])
+            else:
+                out = activation(out @ weights['kernel'] + weights['bias'])
+        return out
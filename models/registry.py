@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import MODEL_DIR, MODEL_CACHE_MAX_MODELS, MODEL_CACHE_MAX_BYTES, SEQUENCE_LENGTH, SHARED_MODEL_SYMBOL
+from models.numpy_lstm import NumpyLSTMPredictor
+
+logger = logging.getLogger(__name__)
+
+
+def load_keras_model(symbol: str, directory: str, meta: Dict) -> Any:
+    """Загрузить LSTMPredictor (TensorFlow импортируется только здесь)"""
+    from models.lstm_model import LSTMPredictor
+
+    predictor = LSTMPredictor(sequence_length=meta.get('sequence_length', SEQUENCE_LENGTH))
+    predictor.load(symbol, directory)
+    return predictor
+
+
+def load_model_files(symbol: str, directory: str, meta: Dict) -> Any:
+    """Экспортированные веса .npz (NumPy рантайм), без них - .h5 через Keras"""
+    path = os.path.join(directory, f"{symbol}_lstm.npz")
+    if os.path.exists(path):
+        return NumpyLSTMPredictor.from_file(path)
+    return load_keras_model(symbol, directory, meta)
+
+
+def model_size(predictor: Any) -> int:
+    """Размер весов модели в байтах (оценка памяти для бюджета кэша)"""
+    if isinstance(predictor, NumpyLSTMPredictor):
+        return predictor.nbytes
+    return int(sum(np.asarray(w).nbytes for w in predictor.model.get_weights()))
+
+
+class LoadedModel:
+    __slots__ = ('symbol', 'version', 'meta', 'predictor', 'size', 'mtime', 'load_ms', 'lock')
+
+    def __init__(self, symbol: str, meta: Dict, predictor: Any, size: int, mtime: float, load_ms: float):
+        self.symbol = symbol
+        self.version = str(meta['version'])
+        self.meta = meta
+        self.predictor = predictor
+        self.size = size
+        self.mtime = mtime
+        self.load_ms = load_ms
+        self.lock = threading.Lock()
+
+    def info(self) -> Dict:
+        return {
+            'source': 'lstm',
+            'version': self.version,
+            'trained_at': self.meta.get('trained_at'),
+            'metrics': self.meta.get('metrics', {}),
+            'shared': bool(self.meta.get('shared', False)),
+            'runtime': 'numpy' if isinstance(self.predictor, NumpyLSTMPredictor) else 'keras'
+        }
+
+
+class ModelRegistry:
+    """Реестр обученных моделей по символам
+
+    Файлы лежат в directory: {symbol}_lstm.h5, {symbol}_scaler.json и
+    {symbol}_meta.json (версия, время обучения, метрики). Если есть
+    экспорт {symbol}_lstm.npz, модель исполняется на NumPy без импорта
+    TensorFlow, иначе загружается .h5 через Keras. Модели загружаются
+    лениво при первом прогнозе и держатся в LRU с лимитом числа моделей и
+    бюджетом памяти. Если файл модели изменился (переобучение), при
+    следующем обращении загружается новая версия.
+
+    Символы без своей модели обслуживает общая модель shared_symbol (если
+    она обучена): forecast_many считает все такие символы одним batch.
+    """
+
+    def __init__(self, directory: str = MODEL_DIR, max_models: int = MODEL_CACHE_MAX_MODELS,
+                 max_bytes: int = MODEL_CACHE_MAX_BYTES,
+                 loader: Callable[[str, str, Dict], Any] = load_model_files,
+                 sizeof: Callable[[Any], int] = model_size,
+                 shared_symbol: Optional[str] = SHARED_MODEL_SYMBOL):
+        self.directory = directory
+        self.shared_symbol = shared_symbol
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.sizeof = sizeof
+
+        self._models: 'OrderedDict[str, LoadedModel]' = OrderedDict()
+        self._bytes = 0
+        self._meta: Dict[str, Tuple[float, Dict]] = {}  # symbol -> (mtime, метаданные)
+        self._failed: Dict[str, float] = {}  # symbol -> mtime файла, который не удалось загрузить
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stats = {'hits': 0, 'loads': 0, 'load_ms': 0.0, 'load_errors': 0, 'missing': 0, 'evictions': 0}
+
+    def paths(self, symbol: str) -> Dict[str, str]:
+        return {
+            'model': os.path.join(self.directory, f"{symbol}_lstm.h5"),
+            'npz': os.path.join(self.directory, f"{symbol}_lstm.npz"),
+            'scaler': os.path.join(self.directory, f"{symbol}_scaler.json"),
+            'meta': os.path.join(self.directory, f"{symbol}_meta.json"),
+        }
+
+    def _model_mtime(self, symbol: str) -> Optional[float]:
+        paths = self.paths(symbol)
+        try:
+            return os.stat(paths['npz']).st_mtime
+        except OSError:
+            pass
+        try:
+            os.stat(paths['scaler'])
+            return os.stat(paths['model']).st_mtime
+        except OSError:
+            return None
+
+    def available(self, symbol: str) -> bool:
+        return self._model_mtime(symbol) is not None
+
+    def model_for(self, symbol: str) -> Optional[str]:
+        """Имя модели для символа: своя или общая"""
+        if self.available(symbol):
+            return symbol
+        if self.shared_symbol and self.available(self.shared_symbol):
+            return self.shared_symbol
+        return None
+
+    def metadata(self, symbol: str) -> Optional[Dict]:
+        """Метаданные модели; без _meta.json версия - время изменения файла"""
+        mtime = self._model_mtime(symbol)
+        if mtime is None:
+            return None
+        with self._lock:
+            cached = self._meta.get(symbol)
+        if cached is not None and cached[0] == mtime:
+            return dict(cached[1])
+
+        meta = {}
+        try:
+            with open(self.paths(symbol)['meta']) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        meta.setdefault('symbol', symbol)
+        meta.setdefault('version', str(int(mtime)))
+        meta.setdefault('sequence_length', SEQUENCE_LENGTH)
+        with self._lock:
+            self._meta[symbol] = (mtime, meta)
+        return dict(meta)
+
+    def version_for(self, symbol: str) -> Optional[str]:
+        """Версия модели, которая будет считать прогноз символа (для ключей кэша), без загрузки"""
+        name = self.model_for(symbol)
+        meta = self.metadata(name) if name else None
+        return f"{name}@{meta['version']}" if meta else None
+
+    def list_models(self) -> List[Dict]:
+        """Метаданные всех моделей в каталоге"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        symbols = sorted({name.rsplit('_lstm.', 1)[0] for name in names
+                          if name.endswith('_lstm.h5') or name.endswith('_lstm.npz')})
+        return [meta for meta in (self.metadata(symbol) for symbol in symbols) if meta]
+
+    def _load_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(symbol, threading.Lock())
+
+    def _cached(self, symbol: str, mtime: float) -> Optional[LoadedModel]:
+        with self._lock:
+            entry = self._models.get(symbol)
+            if entry is not None and entry.mtime == mtime:
+                self._models.move_to_end(symbol)
+                self._stats['hits'] += 1
+                return entry
+        return None
+
+    def get(self, symbol: str) -> Optional[LoadedModel]:
+        """Загруженная модель символа (загрузка при первом обращении) или None"""
+        mtime = self._model_mtime(symbol)
+        if mtime is None:
+            with self._lock:
+                self._stats['missing'] += 1
+            return None
+
+        entry = self._cached(symbol, mtime)
+        if entry is not None:
+            return entry
+
+        # Одна загрузка на символ, остальные потоки ждут ее результат
+        with self._load_lock(symbol):
+            entry = self._cached(symbol, mtime)
+            if entry is not None:
+                return entry
+            if self._failed.get(symbol) == mtime:
+                return None
+
+            meta = self.metadata(symbol) or {'version': str(int(mtime))}
+            started = time.perf_counter()
+            try:
+                predictor = self.loader(symbol, self.directory, meta)
+            except Exception as e:
+                with self._lock:
+                    self._failed[symbol] = mtime
+                    self._stats['load_errors'] += 1
+                logger.warning(f"Failed to load model for {symbol}: {e!r}")
+                return None
+            load_ms = (time.perf_counter() - started) * 1000
+
+            entry = LoadedModel(symbol, meta, predictor, self.sizeof(predictor), mtime, load_ms)
+            self._store(entry)
+            logger.info(f"Loaded model {symbol} v{entry.version} ({entry.size / 1024:.0f} KiB, {load_ms:.0f} ms)")
+            return entry
+
+    def _store(self, entry: LoadedModel):
+        with self._lock:
+            previous = self._models.pop(entry.symbol, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._models[entry.symbol] = entry
+            self._bytes += entry.size
+            self._failed.pop(entry.symbol, None)
+            self._stats['loads'] += 1
+            self._stats['load_ms'] += entry.load_ms
+
+            # Последняя загруженная модель остается, даже если одна превышает бюджет
+            while len(self._models) > 1 and (len(self._models) > self.max_models or self._bytes > self.max_bytes):
+                _, evicted = self._models.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats['evictions'] += 1
+
+    def forecast(self, symbol: str, prices, days: int) -> Optional[Tuple[List[float], Dict]]:
+        """Синхронный прогноз моделью символа: (цены, информация о модели) или None"""
+        return self.forecast_many({symbol: prices}, days).get(symbol)
+
+    def forecast_many(self, prices_by_symbol: Dict[str, Any], days: int) -> Dict[str, Tuple[List[float], Dict]]:
+        """Прогноз для нескольких символов: один batch на каждую модель
+
+        Символы, которые обслуживает одна модель (общая), считаются вместе:
+        число прямых проходов зависит от горизонта, а не от числа символов.
+        Символы без модели или с короткой историей в результат не попадают.
+        """
+        groups: Dict[str, List[str]] = {}
+        for symbol in prices_by_symbol:
+            name = self.model_for(symbol)
+            if name is None:
+                with self._lock:
+                    self._stats['missing'] += 1
+                continue
+            groups.setdefault(name, []).append(symbol)
+
+        results = {}
+        for name, symbols in groups.items():
+            entry = self.get(name)
+            if entry is None:
+                continue
+            sequence_length = entry.meta.get('sequence_length', SEQUENCE_LENGTH)
+            symbols = [symbol for symbol in symbols if len(prices_by_symbol[symbol]) >= sequence_length]
+            if not symbols:
+                continue
+            series = [np.asarray(prices_by_symbol[symbol], dtype=float) for symbol in symbols]
+            with entry.lock:
+                predictions = entry.predictor.forecast_batch(series, days)
+            info = entry.info()
+            for symbol, row in zip(symbols, predictions):
+                results[symbol] = (np.asarray(row, dtype=float).tolist(), info)
+        return results
+
+    async def predict(self, symbol: str, prices, days: int) -> Optional[Tuple[List[float], Dict]]:
+        """Прогноз в пуле потоков, чтобы загрузка и инференс не блокировали event loop"""
+        return (await self.predict_many({symbol: prices}, days)).get(symbol)
+
+    async def predict_many(self, prices_by_symbol: Dict[str, Any], days: int) -> Dict[str, Tuple[List[float], Dict]]:
+        if not any(self.model_for(symbol) for symbol in prices_by_symbol):
+            with self._lock:
+                self._stats['missing'] += len(prices_by_symbol)
+            return {}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.forecast_many, prices_by_symbol, days)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['loaded'] = list(self._models)
+            stats['bytes'] = self._bytes
+        stats['load_ms'] = round(stats['load_ms'], 1)
+        return stats
+
+
+# Глобальный экземпляр
+model_registry = ModelRegistry()
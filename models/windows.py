@@ -0,0 +1,53 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Sequence, Tuple
+
+OHLCV = ('open', 'high', 'low', 'close', 'volume')
+
+
+def feature_matrix(candles, fields: Sequence[str] = OHLCV) -> np.ndarray:
+    """Матрица признаков (n, len(fields)) из колонок Candles - одна копия"""
+    return np.column_stack([getattr(candles, name) for name in fields])
+
+
+def windows(data: np.ndarray, length: int, stride: int = 1) -> np.ndarray:
+    """Все окна длины length с шагом stride без копирования данных
+
+    data формы (n,) дает окна (m, length), формы (n, features) - окна
+    (m, length, features). Результат - представление (view) над data только
+    для чтения; копия создается, только когда ее потребует модель.
+    """
+    data = np.asarray(data)
+    if length < 1 or stride < 1:
+        raise ValueError("length and stride must be positive")
+    if len(data) < length:
+        return np.empty((0, length) + data.shape[1:], dtype=data.dtype)
+
+    view = sliding_window_view(data, length, axis=0)
+    if data.ndim > 1:
+        # sliding_window_view кладет ось окна последней: (m, features, length)
+        view = np.moveaxis(view, -1, 1)
+    return view[::stride]
+
+
+def sequences(data: np.ndarray, length: int, horizon: int = 1, stride: int = 1,
+              target: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Обучающие пары (X, y) для прогноза по окну
+
+    X[i] - окно data[i*stride : i*stride+length], y[i] - следующие horizon
+    значений целевого ряда (колонка target для многомерных данных). При
+    horizon=1 y имеет форму (m,), иначе (m, horizon). Окна без полного
+    горизонта отбрасываются. Оба массива - представления над data.
+    """
+    data = np.asarray(data)
+    if horizon < 1:
+        raise ValueError("horizon must be positive")
+    series = data if data.ndim == 1 else data[:, target]
+
+    count = max(len(data) - length - horizon + 1, 0)
+    X = windows(data[:count + length - 1], length, stride) if count else windows(data[:0], length)
+    if horizon == 1:
+        y = series[length:length + count][::stride]
+    else:
+        y = windows(series[length:], horizon, stride)[:len(X)]
+    return X, y
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк инференса LSTM: model.predict на каждый шаг и символ против
+batch-прогноза (LSTMPredictor.forecast_batch)
+Старый путь - 7 вызовов model.predict на символ с np.append окна; новый -
+окна всех символов одним batch через скомпилированный tf.function, 7
+прямых проходов на всех (или ceil(7 / horizon) с многошаговым выходом).
+Веса модели случайные: на время инференса они не влияют.
+
+    python scripts/bench_batch_inference.py --symbols 50 --days 7
+    python scripts/bench_batch_inference.py --symbols 50 --days 7 --horizon 7
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def legacy_forecast(model, scaled: np.ndarray, days: int) -> list:
+    """Прежний LSTMPredictor.forecast: model.predict на каждый шаг"""
+    predictions = []
+    current_sequence = scaled.reshape(1, len(scaled), 1)
+    for _ in range(days):
+        next_pred = model.predict(current_sequence, verbose=0)
+        predictions.append(float(next_pred[0, 0]))
+        current_sequence = np.append(current_sequence[:, 1:, :], next_pred[:, :1].reshape(1, 1, 1), axis=1)
+    return predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--horizon', type=int, default=1)
+    parser.add_argument('--sequence-length', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        print("TensorFlow is not installed: pip install -r requirements.txt")
+        sys.exit(1)
+
+    from models.lstm_model import LSTMPredictor
+
+    length = args.sequence_length
+    predictor = LSTMPredictor(sequence_length=length, horizon=args.horizon, scaling='window')
+    predictor.model = predictor.create_model((length, 1), args.horizon)
+    predictor.is_trained = True
+
+    rng = np.random.default_rng(0)
+    series = [100 * (i + 1) + np.cumsum(rng.normal(0, 1, 90)) for i in range(args.symbols)]
+
+    # Прогрев: трассировка tf.function и первый вызов predict
+    predictor.forecast_batch(series[:1], args.days)
+    legacy_forecast(predictor.model, np.zeros(length), 1)
+
+    started = time.perf_counter()
+    for prices in series:
+        window = prices[-length:]
+        legacy_forecast(predictor.model, (window - window.min()) / (window.max() - window.min()), args.days)
+    legacy_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        predictor.forecast_batch(series, args.days)
+    batch_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    passes = -(-args.days // args.horizon)
+    print(f"{args.symbols} symbols x {args.days} days, sequence {length}, horizon {args.horizon}")
+    print(f"  model.predict per step:  {legacy_ms:>9.1f} ms, {args.symbols * args.days} calls")
+    print(f"  forecast_batch:          {batch_ms:>9.1f} ms, {passes} forward passes "
+          f"({legacy_ms / batch_ms:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк кэша API: пропускная способность get/set при конкуренции потоков
+Сравнивает TTLCache (LRU + TTL + блокировка) со старым глобальным dict
+и общий для воркеров кэш на unix-сокете (services.cache_server)
+
+    python scripts/bench_cache.py --ops 200000 --threads 1,2,4,8
+    python scripts/bench_cache.py --backend socket --check-shared 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.cache import SocketCacheBackend, TTLCache
+from services.cache_server import CacheServer
+
+PAYLOAD = {
+    'success': True,
+    'data': {'symbol': 'BTCUSDT', 'current': {'price': 65000.5, 'change_24h': 1.2},
+             'history': {'prices': [65000.0 + i for i in range(90)]}},
+}
+
+
+class DictCache:
+    """Старое поведение: глобальный dict без вытеснения и блокировок"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        if key in self.data:
+            value, timestamp = self.data[key]
+            if time.time() - timestamp < 60:
+                return value
+        return None
+
+    def set(self, key, value):
+        self.data[key] = (value, time.time())
+
+
+def worker(cache, ops: int, keys: list, write_ratio: float, seed: int):
+    rnd = random.Random(seed)
+    for _ in range(ops):
+        key = keys[rnd.randrange(len(keys))]
+        if rnd.random() < write_ratio or cache.get(key) is None:
+            cache.set(key, PAYLOAD)
+
+
+def run(cache, threads: int, ops: int, keys: list, write_ratio: float) -> float:
+    per_thread = ops // threads
+    pool = [threading.Thread(target=worker, args=(cache, per_thread, keys, write_ratio, i)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def shared_worker(socket_path: str, worker_id: int, workers: int, result_queue):
+    """Воркер пишет свой ключ и читает ключи остальных процессов"""
+    cache = SocketCacheBackend(socket_path)
+    cache.set(f"crypto:worker{worker_id}", {'pid': os.getpid(), 'payload': PAYLOAD})
+    deadline = time.time() + 5
+    seen = set()
+    while time.time() < deadline and len(seen) < workers:
+        for other in range(workers):
+            value = cache.get(f"crypto:worker{other}")
+            if value is not None:
+                seen.add(other)
+        time.sleep(0.01)
+    result_queue.put((worker_id, len(seen)))
+
+
+def serve_cache(socket_path: str, max_entries: int):
+    """Сервер кэша в отдельном процессе, как sidecar в продакшене"""
+    server = CacheServer(socket_path, TTLCache(max_entries=max_entries, sizeof=lambda value: 1024))
+    server.serve_forever()
+
+
+def start_cache_server(socket_path: str, max_entries: int) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=serve_cache, args=(socket_path, max_entries), daemon=True)
+    process.start()
+    deadline = time.time() + 10
+    while not os.path.exists(socket_path):
+        if time.time() > deadline:
+            raise RuntimeError("cache server did not start")
+        time.sleep(0.05)
+    return process
+
+
+def check_shared(socket_path: str, workers: int):
+    """Проверка межпроцессной видимости: каждый процесс видит записи всех остальных"""
+    result_queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=shared_worker, args=(socket_path, i, workers, result_queue))
+                 for i in range(workers)]
+    for p in processes:
+        p.start()
+    results = sorted(result_queue.get(timeout=10) for _ in processes)
+    for p in processes:
+        p.join()
+    for worker_id, seen in results:
+        print(f"worker {worker_id}: sees {seen}/{workers} workers' entries")
+    ok = all(seen == workers for _, seen in results)
+    print("shared cache check:", "OK" if ok else "FAILED")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=200_000)
+    parser.add_argument('--threads', default='1,2,4,8')
+    parser.add_argument('--keys', type=int, default=20_000, help='размер пространства ключей')
+    parser.add_argument('--max-entries', type=int, default=5_000)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--backend', choices=['memory', 'socket'], default='memory')
+    parser.add_argument('--check-shared', type=int, default=0, metavar='N',
+                        help='проверить видимость записей между N процессами (только socket)')
+    args = parser.parse_args()
+
+    server = None
+    if args.backend == 'socket':
+        socket_path = os.path.join(tempfile.mkdtemp(), 'cache.sock')
+        server = start_cache_server(socket_path, args.max_entries)
+        if args.check_shared:
+            ok = check_shared(socket_path, args.check_shared)
+            server.terminate()
+            sys.exit(0 if ok else 1)
+
+    keys = [f"{ns}:{i}" for i in range(args.keys // 2) for ns in ('search', 'crypto')]
+    print(f"ops={args.ops} keys={len(keys)} max_entries={args.max_entries} write_ratio={args.write_ratio}\n")
+    print(f"{'cache':<10} {'threads':>7} {'ops/sec':>12} {'entries':>9} {'hit ratio':>10}")
+
+    for threads in [int(t) for t in args.threads.split(',')]:
+        if server is not None:
+            client = SocketCacheBackend(socket_path)
+            client.clear()
+            candidates = (('socket', client),)
+        else:
+            candidates = (
+                ('dict', DictCache()),
+                ('ttl-lru', TTLCache(max_entries=args.max_entries, sizeof=lambda value: 1024)),
+            )
+        for name, cache in candidates:
+            rate = run(cache, threads, args.ops, keys, args.write_ratio)
+            if not isinstance(cache, DictCache):
+                stats = cache.stats()
+                entries, ratio = stats['entries'], f"{stats['hit_ratio']:.2f}"
+            else:
+                entries, ratio = len(cache.data), '-'
+            print(f"{name:<10} {threads:>7} {rate:>12,.0f} {entries:>9} {ratio:>10}")
+
+    if server is not None:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
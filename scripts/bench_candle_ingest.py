@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк записи свечей в таблицу candles (PostgreSQL из DATABASE_URL)
+Сравнивает построчный INSERT (на выборке, с пересчетом на все строки),
+execute_values и COPY через временную таблицу. Затем замеряет повторную
+запись тех же строк (upsert), чтение окна серии и выборку диапазона
+времени по всем символам. Строки пишутся под символами BENCH*USDT и
+удаляются в конце (пустые месячные секции остаются).
+
+    python scripts/bench_candle_ingest.py --rows 1000000
+    python scripts/bench_candle_ingest.py --rows 5000000 --symbols 200 --interval 15
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.candle_store import INTERVAL_MS
+
+
+def batches(symbols: int, rows: int, interval: str, batch: int):
+    """Синтетические свечи: у каждого символа непрерывная серия до текущего времени"""
+    per_symbol = rows // symbols
+    step = INTERVAL_MS[interval]
+    now = int(time.time() * 1000)
+    first = now - now % step - per_symbol * step
+    rng = np.random.default_rng(0)
+    pending = []
+    for index in range(symbols):
+        symbol = f"BENCH{index}USDT"
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, per_symbol)))
+        ts = first + np.arange(per_symbol, dtype=np.int64) * step
+        columns = (ts.tolist(), close.tolist(), (close * 1.01).tolist(), (close * 0.99).tolist(),
+                   close.tolist(), rng.uniform(1, 100, per_symbol).tolist())
+        for t, o, h, l, c, v in zip(*columns):
+            pending.append((symbol, interval, t, o, h, l, c, v, v * c))
+            if len(pending) >= batch:
+                yield pending
+                pending = []
+    if pending:
+        yield pending
+
+
+def clear(db):
+    with db.get_cursor(cursor_factory=None) as cur:
+        cur.execute("DELETE FROM candles WHERE symbol LIKE 'BENCH%USDT'")
+
+
+def ingest(db, args, method: str) -> float:
+    started = time.perf_counter()
+    written = 0
+    for rows in batches(args.symbols, args.rows, args.interval, args.batch):
+        written += db.upsert_candle_rows(rows, method=method) or 0
+    elapsed = time.perf_counter() - started
+    if written != args.rows // args.symbols * args.symbols:
+        raise RuntimeError(f"{method}: written {written} rows, check the log")
+    return written / elapsed
+
+
+def single_inserts(db, args) -> float:
+    """Старый способ записи (как cache_price_history): INSERT на строку, одна транзакция"""
+    rows = next(batches(args.symbols, args.rows, args.interval, args.single_sample))
+    started = time.perf_counter()
+    with db.get_cursor(cursor_factory=None) as cur:
+        db._candle_partitions.update(db.ensure_candle_partitions(cur, rows[0][2], rows[-1][2]))
+        for row in rows:
+            cur.execute("""
+                INSERT INTO candles (symbol, "interval", open_time, open, high, low, close, volume, turnover)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (symbol, "interval", open_time) DO NOTHING
+            """, row)
+    return len(rows) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--interval', default='60', choices=sorted(INTERVAL_MS))
+    parser.add_argument('--batch', type=int, default=100_000, help='строк на один вызов upsert_candle_rows')
+    parser.add_argument('--single-sample', type=int, default=20_000, help='строк для замера построчного INSERT')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    from models.database import db
+    if db is None or not db.is_connected:
+        print("PostgreSQL is not available: check DATABASE_URL")
+        sys.exit(1)
+
+    print(f"{args.rows:,} rows, {args.symbols} symbols, interval {args.interval}\n")
+    print(f"{'method':<26}{'rows/s':>12}{'time for all rows':>20}")
+
+    clear(db)
+    rate = single_inserts(db, args)
+    print(f"{'INSERT per row':<26}{rate:>12,.0f}{args.rows / rate:>19.1f}s  (estimated)")
+
+    for method in ('values', 'copy'):
+        clear(db)
+        rate = ingest(db, args, method)
+        print(f"{method:<26}{rate:>12,.0f}{args.rows / rate:>19.1f}s")
+
+    rate = ingest(db, args, 'copy')
+    print(f"{'copy, rows already stored':<26}{rate:>12,.0f}{args.rows / rate:>19.1f}s")
+
+    with db.get_cursor(cursor_factory=None) as cur:
+        cur.execute("ANALYZE candles")
+
+    latencies = []
+    for _ in range(args.queries):
+        symbol = f"BENCH{random.randrange(args.symbols)}USDT"
+        started = time.perf_counter()
+        candles = db.get_candles(symbol, args.interval, 200)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert candles is not None and len(candles) == 200
+    latencies.sort()
+    print(f"\nget_candles(limit=200): p50 {latencies[len(latencies) // 2]:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms")
+
+    # Последние сутки по всем символам: лишние секции отсекаются, BRIN сужает скан
+    since = int(time.time() * 1000) - 86_400_000
+    with db.get_cursor(cursor_factory=None) as cur:
+        started = time.perf_counter()
+        cur.execute("""
+            SELECT symbol, max(high), min(low) FROM candles
+            WHERE open_time >= %s AND "interval" = %s GROUP BY symbol
+        """, (since, args.interval))
+        cur.fetchall()
+        range_ms = (time.perf_counter() - started) * 1000
+        cur.execute("""
+            EXPLAIN SELECT symbol FROM candles WHERE open_time >= %s AND "interval" = %s
+        """, (since, args.interval))
+        partitions = set(re.findall(r' on (candles_\d{6})\b', '\n'.join(row[0] for row in cur.fetchall())))
+    print(f"last 24h across symbols: {range_ms:.1f} ms, scanned partitions: {len(partitions)}")
+
+    clear(db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк инкрементальной синхронизации свечей против локальной заглушки Bybit
+Сравнивает полную загрузку окна на каждый запрос (старое поведение) с CandleStore,
+который после первой загрузки запрашивает только дельту
+
+    python scripts/bench_candle_sync.py --symbols 20 --rounds 20 --limit 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bybit_stub import start_stub_server, synthetic_base_coins
+from services.bybit_service import BybitService
+from services.candle_store import CandleStore
+
+
+class MeteredService(BybitService):
+    """Считает байты ответов Bybit (в виде JSON) и время их разбора"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upstream_bytes = 0
+
+    async def fetch_url(self, url: str, params: dict = None):
+        result = await super().fetch_url(url, params)
+        if result is not None:
+            self.upstream_bytes += len(json.dumps(result))
+        return result
+
+
+async def full_fetch(service: BybitService, symbol: str, interval: str, limit: int):
+    """Старое поведение get_kline_data: все окно целиком"""
+    result = await service.fetch_url(f"{service.base_url}/v5/market/kline", {
+        "category": "spot", "symbol": symbol, "interval": interval, "limit": limit
+    })
+    return result['list']
+
+
+async def run(name: str, service: MeteredService, fetch, symbols, rounds: int):
+    # Первая загрузка окна одинакова для обоих вариантов - не учитываем
+    for symbol in symbols:
+        await fetch(symbol)
+    service.upstream_bytes = 0
+    service._stats['upstream_requests'] = 0
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for symbol in symbols:
+            rows = await fetch(symbol)
+            [float(row[4]) for row in rows]
+    elapsed = time.perf_counter() - started
+    calls = rounds * len(symbols)
+    print(f"{name:<12} {elapsed / calls * 1000:>10.2f} {service.upstream_bytes / calls:>14,.0f} "
+          f"{service.get_stats()['upstream_requests']:>10}")
+    await service.close()
+
+
+async def main(args):
+    runner, port = await start_stub_server()
+    base_url = f"http://127.0.0.1:{port}"
+    symbols = [f"{coin}USDT" for coin in synthetic_base_coins(args.symbols)]
+
+    print(f"symbols={len(symbols)} rounds={args.rounds} interval={args.interval} limit={args.limit}\n")
+    print(f"{'mode':<12} {'ms/call':>10} {'bytes/call':>14} {'upstream':>10}")
+    try:
+        legacy = MeteredService(base_url=base_url)
+        await run('full window', legacy,
+                  lambda s: full_fetch(legacy, s, args.interval, args.limit), symbols, args.rounds)
+
+        incremental = MeteredService(base_url=base_url)
+        # sync_interval=0: дельта запрашивается на каждый вызов (худший случай)
+        incremental.candles = CandleStore(sync_interval=0)
+        await run('incremental', incremental,
+                  lambda s: incremental.candles.get_candles(incremental, s, args.interval, args.limit),
+                  symbols, args.rounds)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--interval', default='60')
+    parser.add_argument('--limit', type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк представления свечей: списки Python против колонок Candles
+Окно из 1000 свечей: разбор ответа Bybit, расчет индикаторов/прогноза,
+сериализация и занимаемая память
+
+    python scripts/bench_candles.py --candles 1000 --repeat 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.candles import Candles
+
+
+def make_rows(count: int):
+    """Ответ Bybit kline: строки, от новых к старым"""
+    now = 1_700_000_000_000
+    rng = np.random.default_rng(0)
+    close = 30000 + np.cumsum(rng.normal(0, 50, count))
+    return [[str(now - i * 3_600_000), f"{c:.2f}", f"{c * 1.01:.2f}", f"{c * 0.99:.2f}", f"{c:.2f}",
+             f"{rng.uniform(1, 100):.4f}", f"{rng.uniform(1e4, 1e6):.2f}"] for i, c in enumerate(close)]
+
+
+def legacy_path(rows):
+    """Старый путь: float() по элементам, словари на свечу, np.array для прогноза"""
+    klines = rows[::-1]
+    prices = [float(k[4]) for k in klines]
+    timestamps = [int(k[0]) for k in klines]
+    records = [{'timestamp': int(k[0]), 'open': float(k[1]), 'high': float(k[2]), 'low': float(k[3]),
+                'close': float(k[4]), 'volume': float(k[5])} for k in rows]
+    prices_array = np.array(prices, dtype=float)
+    np.mean(prices_array[-25:])
+    return prices, timestamps, records
+
+
+def columnar_path(rows):
+    """Новый путь: разбор один раз в колонки, потребители читают массивы"""
+    candles = Candles.from_bybit(rows)
+    np.mean(candles.close[-25:])
+    return candles
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def retained_bytes(fn) -> int:
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candles', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.candles)
+    candles = Candles.from_bybit(rows)
+    legacy = legacy_path(rows)
+
+    print(f"candles={args.candles} repeat={args.repeat}\n")
+    print(f"{'stage':<28} {'legacy':>12} {'columnar':>12}")
+    print(f"{'parse + consume (ms)':<28} {timed(lambda: legacy_path(rows), args.repeat):>12.3f} "
+          f"{timed(lambda: columnar_path(rows), args.repeat):>12.3f}")
+    print(f"{'history json (ms)':<28} "
+          f"{timed(lambda: json.dumps({'prices': legacy[0], 'timestamps': legacy[1]}), args.repeat):>12.3f} "
+          f"{timed(lambda: json.dumps({'prices': candles.close.tolist(), 'timestamps': candles.ts.tolist()}), args.repeat):>12.3f}")
+    print(f"{'klines json (ms)':<28} {timed(lambda: json.dumps(legacy[2]), args.repeat):>12.3f} "
+          f"{timed(lambda: json.dumps(candles.to_columns()), args.repeat):>12.3f}")
+    print(f"{'retained memory (KB)':<28} {retained_bytes(lambda: legacy_path(rows)) / 1024:>12.1f} "
+          f"{retained_bytes(lambda: Candles.from_bybit(rows)) / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
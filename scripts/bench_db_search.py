@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска по таблице cryptocurrencies (PostgreSQL из DATABASE_URL)
+Заполняет таблицу синтетическим каталогом (символы *BENCH) через
+sync_instruments и сравнивает его с построчным add_cryptocurrency. Затем
+сравнивает старый запрос поиска (LIKE по подстроке с ранжированием CASE,
+сканирование таблицы) с search_cryptocurrencies (индексы по префиксу и
+pg_trgm). В конце синтетические строки удаляются.
+
+    python scripts/bench_db_search.py --rows 50000 --queries 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bench_search import make_queries
+from scripts.bybit_stub import synthetic_base_coins
+
+OLD_QUERY = """
+    SELECT symbol, name, display_name, emoji
+    FROM cryptocurrencies
+    WHERE (UPPER(symbol) LIKE %s OR UPPER(name) LIKE %s)
+    AND is_active = TRUE
+    ORDER BY
+        CASE
+            WHEN UPPER(symbol) = %s THEN 1
+            WHEN UPPER(symbol) LIKE %s THEN 2
+            ELSE 3
+        END,
+        symbol
+    LIMIT 20
+"""
+
+
+def old_search(db, query: str):
+    """Запрос search_cryptocurrencies до индексов"""
+    query_param = f"{query.upper()}%"
+    with db.get_cursor() as cur:
+        cur.execute(OLD_QUERY, (query_param, f"%{query.upper()}%", query.upper(), query_param))
+        return cur.fetchall()
+
+
+def timed(fn, queries):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def clear(db):
+    with db.get_cursor(cursor_factory=None) as cur:
+        cur.execute("DELETE FROM cryptocurrencies WHERE symbol LIKE '%BENCH'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--single-sample', type=int, default=2000, help='строк для замера add_cryptocurrency')
+    args = parser.parse_args()
+
+    from models.database import db
+    if db is None or not db.is_connected:
+        print("PostgreSQL is not available: check DATABASE_URL")
+        sys.exit(1)
+
+    coins = synthetic_base_coins(args.rows)
+    items = [{'symbol': f"{coin}BENCH", 'name': coin, 'display_name': coin, 'emoji': '💰'} for coin in coins]
+    print(f"{len(items):,} instruments, pg_trgm: {'yes' if db.has_trgm else 'no (substring search scans)'}\n")
+
+    clear(db)
+    started = time.perf_counter()
+    for item in items[:args.single_sample]:
+        db.add_cryptocurrency(item['symbol'], item['name'], item['display_name'], item['emoji'])
+    single_s = (time.perf_counter() - started) / args.single_sample * len(items)
+    clear(db)
+    started = time.perf_counter()
+    db.sync_instruments(items, deactivate_missing=False)
+    sync_s = time.perf_counter() - started
+    print(f"catalog load: add_cryptocurrency per row {single_s:.1f}s (estimated), sync_instruments {sync_s:.2f}s")
+
+    with db.get_cursor(cursor_factory=None) as cur:
+        cur.execute("ANALYZE cryptocurrencies")
+
+    queries = make_queries(coins, args.queries)
+    print(f"\n{'search':<10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, fn in (('old', lambda q: old_search(db, q)), ('indexed', db.search_cryptocurrencies)):
+        p50, p99 = timed(fn, queries)
+        print(f"{name:<10}{p50:>10.2f}{p99:>10.2f}")
+
+    sample = coins[len(coins) // 2][:3]
+    with db.get_cursor(cursor_factory=None) as cur:
+        for label, pattern in (('prefix', f"{sample}%"), ('substring', f"%{sample[1:]}%")):
+            cur.execute("EXPLAIN SELECT symbol FROM cryptocurrencies WHERE UPPER(symbol) LIKE %s", (pattern,))
+            plan = [row[0].strip() for row in cur.fetchall()]
+            print(f"\nplan for {label} '{pattern}':\n  " + "\n  ".join(plan))
+
+    clear(db)
+
+
+if __name__ == '__main__':
+    main()
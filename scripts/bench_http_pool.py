@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк HTTP клиента BybitService против локального stub-сервера
+Сравнивает сессию на каждый запрос (старое поведение) с пулом keep-alive соединений
+
+    python scripts/bench_http_pool.py --requests 500 --concurrency 10 [--tls]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.bybit_service import BybitService
+from scripts.bybit_stub import start_stub_server
+
+
+def make_server_ssl_context(tmpdir: str):
+    """Самоподписанный сертификат для TLS режима (нужен openssl в PATH)"""
+    if not shutil.which('openssl'):
+        raise RuntimeError("openssl not found, run without --tls")
+    cert = os.path.join(tmpdir, 'cert.pem')
+    key = os.path.join(tmpdir, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-subj', '/CN=localhost', '-keyout', key, '-out', cert
+    ], check=True, capture_output=True)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+class PerRequestSessionService(BybitService):
+    """Старое поведение: новая сессия и force_close на каждый запрос"""
+
+    async def fetch_url(self, url: str, params: dict = None):
+        connector = aiohttp.TCPConnector(ssl=self._create_ssl_context(), limit=10, force_close=True)
+        session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        try:
+            async with session.get(url, params=params, allow_redirects=False) as response:
+                data = await response.json()
+                return data.get('result')
+        finally:
+            await session.close()
+
+
+async def run_load(service: BybitService, total: int, concurrency: int) -> np.ndarray:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            ticker = await service.get_current_price('BTCUSDT')
+            latencies.append(time.perf_counter() - started)
+            assert ticker is not None
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    await service.close()
+    return np.array(latencies) * 1000
+
+
+def report(name: str, latencies_ms: np.ndarray, elapsed: float):
+    print(f"{name:<22} p50={np.percentile(latencies_ms, 50):7.2f}ms  "
+          f"p99={np.percentile(latencies_ms, 99):7.2f}ms  "
+          f"rps={len(latencies_ms) / elapsed:8.1f}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server_ssl = make_server_ssl_context(tmpdir) if args.tls else None
+        runner, port = await start_stub_server(ssl_context=server_ssl)
+        scheme = 'https' if args.tls else 'http'
+        base_url = f"{scheme}://127.0.0.1:{port}"
+
+        try:
+            print(f"Stub server: {base_url}, requests={args.requests}, concurrency={args.concurrency}\n")
+            for name, service in (
+                ('per-request session', PerRequestSessionService(base_url=base_url)),
+                ('pooled keep-alive', BybitService(base_url=base_url)),
+            ):
+                started = time.perf_counter()
+                latencies = await run_load(service, args.requests, args.concurrency)
+                report(name, latencies, time.perf_counter() - started)
+        finally:
+            await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--tls', action='store_true', help='TLS на stub-сервере (самоподписанный сертификат)')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк движка индикаторов на длинных сериях
+Векторный расчет полных серий (services.indicators) против пересчета
+скалярного значения в цикле по каждой точке, плюс сверка с эталоном
+
+    python scripts/bench_indicators.py --points 100000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.candles import Candles
+from services import indicators
+
+
+def make_candles(count: int) -> Candles:
+    rng = np.random.default_rng(0)
+    close = 30000 + np.cumsum(rng.normal(0, 50, count))
+    spread = np.abs(rng.normal(0, 30, count))
+    ts = 1_700_000_000_000 + np.arange(count, dtype=np.int64) * 60_000
+    return Candles(ts, close, close + spread, close - spread, close, rng.uniform(1, 100, count))
+
+
+def loop_rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Эталон: Wilder RSI обычным циклом Python"""
+    deltas = np.diff(close)
+    result = np.full(len(close), np.nan)
+    avg_gain = np.maximum(deltas[:period], 0).mean()
+    avg_loss = np.maximum(-deltas[:period], 0).mean()
+    result[period] = 100 - 100 / (1 + avg_gain / avg_loss)
+    for i in range(period, len(deltas)):
+        avg_gain = (avg_gain * (period - 1) + max(deltas[i], 0)) / period
+        avg_loss = (avg_loss * (period - 1) + max(-deltas[i], 0)) / period
+        result[i + 1] = 100 - 100 / (1 + avg_gain / avg_loss)
+    return result
+
+
+def loop_sma(close: np.ndarray, window: int) -> np.ndarray:
+    """Старый подход: среднее окна, пересчитанное для каждой точки"""
+    result = np.full(len(close), np.nan)
+    for i in range(window - 1, len(close)):
+        result[i] = close[i - window + 1:i + 1].mean()
+    return result
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    candles = make_candles(args.points)
+    close = candles.close
+    print(f"Series: {args.points} points\n")
+
+    print(f"{'indicator':<16}{'ms':>10}")
+    for spec in indicators.DEFAULT_INDICATORS + ('ema:200',):
+        ms = timed(lambda: indicators.compute(candles, [spec]), args.repeat)
+        print(f"{spec:<16}{ms:>10.2f}")
+    total = timed(lambda: indicators.compute(candles), args.repeat)
+    print(f"{'all defaults':<16}{total:>10.2f}\n")
+
+    rsi_vector = timed(lambda: indicators.rsi(close), args.repeat)
+    rsi_loop = timed(lambda: loop_rsi(close), 1)
+    sma_vector = timed(lambda: indicators.sma(close, 50), args.repeat)
+    sma_loop = timed(lambda: loop_sma(close, 50), 1)
+    print(f"rsi:  vectorized {rsi_vector:.2f} ms, python loop {rsi_loop:.2f} ms ({rsi_loop / rsi_vector:.0f}x)")
+    print(f"sma50: vectorized {sma_vector:.2f} ms, per-point mean {sma_loop:.2f} ms ({sma_loop / sma_vector:.0f}x)")
+
+    rsi_error = np.nanmax(np.abs(indicators.rsi(close) - loop_rsi(close)))
+    sma_error = np.nanmax(np.abs(indicators.sma(close, 50) - loop_sma(close, 50)))
+    print(f"\nmax abs error vs reference: rsi {rsi_error:.2e}, sma50 {sma_error:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк реестра моделей: холодная загрузка против прогноза из памяти
+Обучает маленькие модели на синтетических ценах во временный каталог
+(или берет готовые из --directory) и измеряет первый прогноз (загрузка
+.h5 + инференс) и повторные прогнозы из LRU
+
+    python scripts/bench_model_registry.py --symbols 3 --repeat 20
+    python scripts/bench_model_registry.py --directory data/models
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.registry import ModelRegistry
+
+
+def synthetic_prices(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return (30000 + np.cumsum(rng.normal(0, 300, count))).tolist()
+
+
+def train_models(directory: str, symbols, sequence_length: int):
+    from models.lstm_model import LSTMPredictor
+
+    for i, symbol in enumerate(symbols):
+        predictor = LSTMPredictor(sequence_length=sequence_length)
+        asyncio.run(predictor.train(synthetic_prices(sequence_length + 200, i), epochs=1))
+        asyncio.run(predictor.save_model(symbol, directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', help='каталог с обученными моделями (иначе обучаются синтетические)')
+    parser.add_argument('--symbols', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        print("TensorFlow is not installed: pip install -r requirements.txt")
+        sys.exit(1)
+
+    directory = args.directory or tempfile.mkdtemp(prefix='pulsetrade-models-')
+    registry = ModelRegistry(directory=directory)
+    if not args.directory:
+        symbols = [f"SYN{i}USDT" for i in range(args.symbols)]
+        started = time.perf_counter()
+        train_models(directory, symbols, 60)
+        print(f"Trained {len(symbols)} synthetic models in {time.perf_counter() - started:.1f}s -> {directory}")
+    else:
+        symbols = [meta['symbol'] for meta in registry.list_models()][:args.symbols]
+
+    prices = synthetic_prices(90, 42)
+    print(f"\n{'symbol':<12}{'cold ms':>10}{'warm ms':>10}")
+    for symbol in symbols:
+        started = time.perf_counter()
+        registry.forecast(symbol, prices, args.days)
+        cold_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            registry.forecast(symbol, prices, args.days)
+        warm_ms = (time.perf_counter() - started) / args.repeat * 1000
+        print(f"{symbol:<12}{cold_ms:>10.1f}{warm_ms:>10.1f}")
+
+    print(f"\nregistry: {registry.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк рантайма моделей: NumPy (.npz) против Keras (.h5)
+Каждый вариант запускается в отдельном процессе, как новый воркер API:
+время импорта, загрузки модели, первого и повторного прогноза и пиковый
+RSS процесса. При наличии TensorFlow прогнозы обоих рантаймов сверяются.
+
+Без --directory создается модель той же архитектуры со случайными весами
+(для .h5 нужен TensorFlow, без него измеряется только NumPy).
+
+    python scripts/bench_model_runtime.py
+    python scripts/bench_model_runtime.py --directory data/models --symbol BTCUSDT
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def child(runtime: str, directory: str, symbol: str, days: int, repeat: int):
+    """Замер в чистом процессе: результат - JSON в stdout"""
+    started = time.perf_counter()
+    import numpy as np
+    if runtime == 'numpy':
+        from models.numpy_lstm import NumpyLSTMPredictor as Predictor
+    else:
+        from models.lstm_model import LSTMPredictor as Predictor
+    import_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    predictor = Predictor()
+    predictor.load(symbol, directory)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    prices = (30000 + np.cumsum(np.random.default_rng(0).normal(0, 300, 90))).tolist()
+    started = time.perf_counter()
+    forecast = predictor.forecast(prices, days)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        predictor.forecast(prices, days)
+    warm_ms = (time.perf_counter() - started) / repeat * 1000
+
+    print(json.dumps({
+        'import_ms': import_ms, 'load_ms': load_ms, 'first_ms': first_ms, 'warm_ms': warm_ms,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'forecast': forecast
+    }))
+
+
+def random_npz(directory: str, symbol: str, sequence_length: int = 60):
+    """Веса архитектуры LSTMPredictor.create_model (3 x LSTM(50), Dense(25), Dense(1)) без TensorFlow"""
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    layers, arrays, inputs = [], {}, 1
+    for index in range(3):
+        layers.append({'type': 'lstm', 'activation': 'tanh', 'recurrent_activation': 'sigmoid',
+                       'return_sequences': index < 2})
+        arrays[f"layer{index}_kernel"] = rng.normal(0, 0.1, (inputs, 200)).astype(np.float32)
+        arrays[f"layer{index}_recurrent"] = rng.normal(0, 0.1, (50, 200)).astype(np.float32)
+        arrays[f"layer{index}_bias"] = np.zeros(200, dtype=np.float32)
+        inputs = 50
+    for index, (n_in, n_out) in enumerate(((50, 25), (25, 1)), start=3):
+        layers.append({'type': 'dense', 'activation': 'linear'})
+        arrays[f"layer{index}_kernel"] = rng.normal(0, 0.1, (n_in, n_out)).astype(np.float32)
+        arrays[f"layer{index}_bias"] = np.zeros(n_out, dtype=np.float32)
+
+    config = {'layers': layers, 'sequence_length': sequence_length, 'horizon': 1,
+              'scaling': 'window', 'data_min': 0.0, 'data_range': 1.0}
+    np.savez(os.path.join(directory, f"{symbol}_lstm.npz"), config=np.array(json.dumps(config)), **arrays)
+
+
+def random_keras(directory: str, symbol: str):
+    """Случайная модель Keras, сохраненная в .h5 и экспортированная в .npz"""
+    from models.lstm_model import LSTMPredictor
+
+    predictor = LSTMPredictor(scaling='window')
+    predictor.model = predictor.create_model((predictor.sequence_length, 1))
+    predictor.is_trained = True
+    predictor.save(symbol, directory)
+    predictor.export(symbol, directory)
+
+
+def run_child(runtime: str, args, directory: str, symbol: str):
+    command = [sys.executable, os.path.abspath(__file__), '--child', runtime, '--directory', directory,
+               '--symbol', symbol, '--days', str(args.days), '--repeat', str(args.repeat)]
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run(command, capture_output=True, text=True, env=env, cwd=ROOT)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr else 'child failed')
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', help='каталог с моделями (иначе - случайные веса во временном каталоге)')
+    parser.add_argument('--symbol', default='BENCHUSDT')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--child', choices=['numpy', 'keras'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.directory, args.symbol, args.days, args.repeat)
+        return
+
+    has_tf = importlib.util.find_spec('tensorflow') is not None
+    directory = args.directory
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix='pulsetrade-runtime-')
+        if has_tf:
+            random_keras(directory, args.symbol)
+        else:
+            random_npz(directory, args.symbol)
+
+    results = {}
+    for runtime, filename in (('numpy', f"{args.symbol}_lstm.npz"), ('keras', f"{args.symbol}_lstm.h5")):
+        if not os.path.exists(os.path.join(directory, filename)):
+            print(f"{runtime}: {filename} not found, skipped")
+            continue
+        if runtime == 'keras' and not has_tf:
+            print("keras: TensorFlow is not installed, skipped")
+            continue
+        results[runtime] = run_child(runtime, args, directory, args.symbol)
+
+    print(f"\n{'runtime':<8}{'import ms':>11}{'load ms':>10}{'first ms':>10}{'warm ms':>10}{'peak RSS MB':>13}")
+    for runtime, r in results.items():
+        print(f"{runtime:<8}{r['import_ms']:>11.0f}{r['load_ms']:>10.1f}{r['first_ms']:>10.1f}"
+              f"{r['warm_ms']:>10.2f}{r['rss_mb']:>13.0f}")
+
+    if len(results) == 2:
+        diff = max(abs(a - b) for a, b in zip(results['numpy']['forecast'], results['keras']['forecast']))
+        print(f"\nmax |numpy - keras| over {args.days} days: {diff:.6f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк push-обновлений: опрос /api/crypto раз в 10 секунд против SSE
+Сравнивает байты на одно обновление цены и стоимость раздачи одного
+события множеству подписчиков Broadcaster
+
+    python scripts/bench_push.py --clients 1000 --events 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bybit_stub import start_stub_in_thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    port = start_stub_in_thread()
+    os.environ['BYBIT_REST_URL'] = f"http://127.0.0.1:{port}"
+
+    from api.web_app_api import app
+    from services.broadcaster import Broadcaster
+
+    client = app.test_client()
+    poll_bytes = len(client.get('/api/crypto/BTC').get_data())
+    started = time.perf_counter()
+    for _ in range(20):
+        client.get('/api/crypto/BTC')
+    poll_ms = (time.perf_counter() - started) / 20 * 1000
+
+    broadcaster = Broadcaster(max_queue=args.events + 1)
+    subscriptions = [broadcaster.subscribe(['BTCUSDT']) for _ in range(args.clients)]
+    ticker = {'last_price': 30000.0, 'change_24h': 1.5, 'high_24h': 30500.0, 'low_24h': 29500.0,
+              'volume_24h': 12345.67, 'turnover_24h': 98765432.1}
+    broadcaster.publish_ticker('BTCUSDT', ticker)
+
+    started = time.perf_counter()
+    for i in range(args.events):
+        # Обычно меняется только цена (и иногда изменение за 24ч)
+        broadcaster.publish_ticker('BTCUSDT', {**ticker, 'last_price': 30000.0 + i * 0.5,
+                                               'change_24h': 1.5 + i * 0.001})
+    publish_s = time.perf_counter() - started
+
+    sample = subscriptions[0].get(timeout=0)
+    sample = subscriptions[0].get(timeout=0)
+    delta_bytes = len(sample.encode())
+
+    deliveries = args.events * args.clients
+    print(f"Per price update for one viewer:")
+    print(f"  polling /api/crypto:  {poll_bytes:>7} bytes, {poll_ms:.2f} ms API time per request (cached)")
+    print(f"  SSE ticker delta:     {delta_bytes:>7} bytes ({poll_bytes / delta_bytes:.0f}x smaller)")
+    print(f"\nFan-out: {args.events} events x {args.clients} clients = {deliveries} deliveries")
+    print(f"  {publish_s * 1000:.1f} ms total, {publish_s / deliveries * 1e6:.2f} us per delivery, "
+          f"{publish_s / args.events * 1000:.2f} ms per event")
+    print(f"  upstream requests: 1 per poll interval per process, independent of the number of viewers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска по каталогу инструментов на синтетических символах
+Сравнивает старый линейный проход по списку instruments-info с индексами
+InstrumentCatalog (trie + n-граммы)
+
+    python scripts/bench_search.py --symbols 5000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bybit_stub import synthetic_base_coins
+from services.instrument_catalog import InstrumentCatalog
+
+
+def linear_search(instruments, query: str, limit: int = 20):
+    """Старое поведение BybitService.search_cryptocurrencies (без загрузки списка)"""
+    query_upper = query.upper()
+    filtered = []
+    for item in instruments:
+        if item.get('quoteCoin', '') != 'USDT':
+            continue
+        if query_upper in item.get('symbol', '') or query_upper in item.get('baseCoin', ''):
+            filtered.append({'symbol': item['symbol'], 'name': item['baseCoin']})
+    return filtered[:limit]
+
+
+def make_queries(coins, count: int, seed: int = 42):
+    """Как при наборе в строке поиска: префиксы и подстроки разной длины"""
+    rnd = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        coin = rnd.choice(coins)
+        start = rnd.randrange(len(coin)) if rnd.random() < 0.3 else 0
+        queries.append(coin[start:start + rnd.randint(1, len(coin))].lower())
+    return queries
+
+
+def timed(fn, queries):
+    started = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    coins = synthetic_base_coins(args.symbols)
+    instruments = [{'symbol': f"{coin}USDT", 'baseCoin': coin, 'quoteCoin': 'USDT'} for coin in coins]
+    instruments += [{'symbol': f"{coin}BTC", 'baseCoin': coin, 'quoteCoin': 'BTC'} for coin in coins[:500]]
+    queries = make_queries(coins, args.queries)
+
+    catalog = InstrumentCatalog()
+    started = time.perf_counter()
+    catalog.load(instruments)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    print(f"instruments={len(instruments)} queries={len(queries)} index build={build_ms:.1f}ms\n")
+    print(f"{'method':<10} {'us/query':>10}")
+    print(f"{'linear':<10} {timed(lambda q: linear_search(instruments, q), queries):>10.1f}")
+    print(f"{'catalog':<10} {timed(catalog.search, queries):>10.1f}")
+
+    sample = queries[0]
+    print(f"\nquery '{sample}': {[item['symbol'] for item in catalog.search(sample, 5)]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк потоковых индикаторов: обновление состояния одной свечой против
+полного пересчета окна (calculate_technical_indicators) для многих символов
+
+    python scripts/bench_streaming_indicators.py --symbols 500 --ticks 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import INDICATOR_WINDOW
+from models.candles import Candles
+from services.bybit_service import BybitService
+from services.streaming_indicators import IndicatorState, IndicatorStateStore
+
+DAY_MS = 86_400_000
+
+
+def make_candles(count: int, seed: int) -> Candles:
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 300, count))
+    ts = 1_700_000_000_000 + np.arange(count, dtype=np.int64) * DAY_MS
+    return Candles(ts, close, close, close, close, np.ones(count))
+
+
+def max_diff(a: dict, b: dict) -> float:
+    return max(abs(a[key] - b[key]) for key in a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--ticks', type=int, default=20, help='обновлений цены текущей свечи на символ')
+    args = parser.parse_args()
+
+    service = BybitService()
+    history = {f"S{i}USDT": make_candles(INDICATOR_WINDOW + 1, i) for i in range(args.symbols)}
+    store = IndicatorStateStore(max_series=args.symbols)
+    for symbol, candles in history.items():
+        store.sync(symbol, 'D', candles[:INDICATOR_WINDOW])
+
+    # Живой поток: тики текущей свечи (revise) и закрытие новой
+    rng = np.random.default_rng(42)
+    updates = []
+    for symbol, candles in history.items():
+        ts, close = int(candles.ts[-1]), float(candles.close[-1])
+        for _ in range(args.ticks - 1):
+            updates.append((symbol, ts, close + rng.normal(0, 50)))
+        updates.append((symbol, ts, close))
+
+    started = time.perf_counter()
+    for symbol, ts, close in updates:
+        store.update(symbol, 'D', ts, close)
+    stream_s = time.perf_counter() - started
+
+    async def recompute_all():
+        for symbol, ts, close in updates:
+            candles = history[symbol]
+            window = np.concatenate((candles.close[1:-1], [close]))
+            await service.calculate_technical_indicators(window)
+
+    started = time.perf_counter()
+    asyncio.run(recompute_all())
+    full_s = time.perf_counter() - started
+
+    count = len(updates)
+    print(f"{args.symbols} symbols x {args.ticks} ticks = {count} updates, window {INDICATOR_WINDOW}")
+    print(f"  streaming state:  {stream_s / count * 1e6:8.2f} us/update")
+    print(f"  full recompute:   {full_s / count * 1e6:8.2f} us/update ({full_s / stream_s:.1f}x)")
+
+    # Сверка с полным пересчетом: MA, волатильность и тренд совпадают,
+    # RSI и EMA отличаются только памятью сглаживания до начала окна
+    errors, rsi_errors, ema_errors = [], [], []
+    for symbol, candles in history.items():
+        streamed = store.sync(symbol, 'D', candles)
+        full = asyncio.run(service.calculate_technical_indicators(candles.close[-INDICATOR_WINDOW:]))
+        rsi_errors.append(abs(streamed.pop('rsi') - full.pop('rsi')))
+        ema_errors.extend(abs(streamed.pop(key) - full.pop(key)) / candles.close[-1] for key in ('ema_12', 'ema_26'))
+        errors.append(max_diff(streamed, full))
+    print(f"\nmax abs diff vs full recompute: ma/volatility/trend {max(errors):.2e}, "
+          f"rsi {max(rsi_errors):.3f}, ema {max(ema_errors):.2e} of price (smoothing memory beyond the window)")
+
+    state = IndicatorState()
+    candles = history['S0USDT']
+    for ts, close in zip(candles.ts.tolist(), candles.close.tolist()):
+        state.update(ts, close)
+    restored = IndicatorState.restore(json.loads(json.dumps(state.snapshot())))
+    print(f"snapshot/restore round trip equal: {restored.indicators() == state.indicators()}, "
+          f"snapshot {len(json.dumps(store.snapshot())) / args.symbols / 1024:.1f} KiB/symbol")
+
+
+if __name__ == '__main__':
+    main()
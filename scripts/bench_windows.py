@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк построения обучающих окон
+Старый цикл со срезами и np.array против models.windows на
+sliding_window_view (представления без копирования), для одного ряда цен
+и для OHLCV, плюс сверка результатов
+
+    python scripts/bench_windows.py --points 1000 --length 60 --repeat 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import windows
+
+
+def loop_sequences(data: np.ndarray, length: int):
+    """Старая реализация create_sequences / prepare_data"""
+    X, y = [], []
+    for i in range(len(data) - length):
+        X.append(data[i:i + length])
+        y.append(data[i + length] if data.ndim == 1 else data[i + length, 3])
+    return np.array(X), np.array(y)
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--length', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    close = 30000 + np.cumsum(rng.normal(0, 50, args.points))
+    ohlcv = np.column_stack([close, close + 10, close - 10, close, rng.uniform(1, 100, args.points)])
+
+    print(f"{'input':<14}{'loop ms':>10}{'view ms':>10}{'copy ms':>10}{'speedup':>9}{'loop MB':>10}{'view MB':>10}")
+    for name, data in (('close', close), ('ohlcv', ohlcv)):
+        X_loop, y_loop = loop_sequences(data, args.length)
+        X_view, y_view = windows.sequences(data, args.length, target=3)
+        assert np.array_equal(X_loop, X_view) and np.array_equal(y_loop, y_view), name
+        assert np.shares_memory(X_view, data)
+
+        loop_ms = timed(lambda: loop_sequences(data, args.length), args.repeat)
+        view_ms = timed(lambda: windows.sequences(data, args.length, target=3), args.repeat)
+        # Цена материализации, когда окна действительно нужны модели
+        copy_ms = timed(lambda: np.ascontiguousarray(windows.sequences(data, args.length, target=3)[0]),
+                        args.repeat)
+        print(f"{name:<14}{loop_ms:>10.3f}{view_ms:>10.3f}{copy_ms:>10.3f}{loop_ms / view_ms:>8.0f}x"
+              f"{X_loop.nbytes / 1e6:>10.2f}{0:>10.2f}")
+
+    X, y = windows.sequences(ohlcv, args.length, horizon=7, stride=5, target=3)
+    print(f"\nohlcv horizon=7 stride=5: X {X.shape}, y {y.shape}, shares memory: {np.shares_memory(X, ohlcv)}")
+
+
+if __name__ == '__main__':
+    main()
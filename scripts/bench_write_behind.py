@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк записи снимков тикеров в price_history (PostgreSQL из DATABASE_URL)
+Сравнивает задержку, которую запись добавляет вызывающему: cache_price_history
+(транзакция на снимок) против write_behind.put (строка в очередь), и время,
+за которое очередь доводит все снимки до таблицы. Снимки пишутся под
+символом BENCHUSDT и удаляются в конце.
+
+    python scripts/bench_write_behind.py --snapshots 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.write_behind import WriteBehindBuffer
+
+SYMBOL = 'BENCHUSDT'
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def clear(db):
+    with db.get_cursor(cursor_factory=None) as cur:
+        cur.execute("DELETE FROM price_history WHERE symbol = %s", (SYMBOL,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshots', type=int, default=20_000)
+    parser.add_argument('--single-sample', type=int, default=2000, help='снимков для замера cache_price_history')
+    parser.add_argument('--batch', type=int, default=5000, help='WRITE_BEHIND_BATCH')
+    args = parser.parse_args()
+
+    from models.database import db
+    if db is None or not db.is_connected:
+        print("PostgreSQL is not available: check DATABASE_URL")
+        sys.exit(1)
+
+    db.add_cryptocurrency(SYMBOL, 'Bench', 'BENCH', '💰')
+    clear(db)
+    print(f"{'write path':<24}{'p50 us':>10}{'p99 us':>10}{'total s':>10}")
+
+    latencies = []
+    started = time.perf_counter()
+    for index in range(args.single_sample):
+        call = time.perf_counter()
+        db.cache_price_history(SYMBOL, 100.0 + index, 1.0, 1000.0, 101.0, 99.0)
+        latencies.append((time.perf_counter() - call) * 1e6)
+    total = (time.perf_counter() - started) / args.single_sample * args.snapshots
+    p50, p99 = percentiles(latencies)
+    print(f"{'cache_price_history':<24}{p50:>10.0f}{p99:>10.0f}{total:>9.1f}s  (estimated)")
+
+    clear(db)
+    buffer = WriteBehindBuffer(batch_size=args.batch, max_pending=args.snapshots)
+    buffer.start(db)
+    latencies = []
+    started = time.perf_counter()
+    for index in range(args.snapshots):
+        call = time.perf_counter()
+        buffer.put('tickers', (SYMBOL, 100.0 + index, 1.0, 1000.0, 101.0, 99.0,
+                               datetime.now(timezone.utc).replace(tzinfo=None)))
+        latencies.append((time.perf_counter() - call) * 1e6)
+    buffer.stop(timeout=60)
+    total = time.perf_counter() - started
+    p50, p99 = percentiles(latencies)
+    print(f"{'write_behind.put':<24}{p50:>10.0f}{p99:>10.0f}{total:>10.1f}")
+
+    stats = buffer.stats()
+    print(f"\nwritten {stats['written']:,}, skipped {stats['skipped']:,}, dropped {stats['dropped']:,}, failed {stats['failed']:,}, "
+          f"flushes {stats['flushes']}, max flush {stats['max_flush_ms']} ms")
+
+    clear(db)
+    with db.get_cursor(cursor_factory=None) as cur:
+        cur.execute("DELETE FROM cryptocurrencies WHERE symbol = %s", (SYMBOL,))
+
+
+if __name__ == '__main__':
+    main()
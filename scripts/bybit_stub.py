@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка публичного Bybit V5 REST API для бенчмарков и нагрузочных тестов
+Отдает синтетические tickers, kline и instruments-info в формате Bybit
+
+    python scripts/bybit_stub.py --port 18080
+"""
+
+import argparse
+import asyncio
+import math
+import threading
+import time
+
+from aiohttp import web
+
+INTERVAL_MS = {
+    '1': 60_000, '3': 180_000, '5': 300_000, '15': 900_000, '30': 1_800_000,
+    '60': 3_600_000, '120': 7_200_000, '240': 14_400_000, '360': 21_600_000,
+    '720': 43_200_000, 'D': 86_400_000, 'W': 604_800_000, 'M': 2_592_000_000,
+}
+
+BASE_COINS = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'TON', 'DOT', 'LINK']
+
+
+def synthetic_base_coins(count: int):
+    """Детерминированный список монет: популярные + сгенерированные"""
+    coins = list(BASE_COINS)
+    i = 0
+    while len(coins) < count:
+        a, b, c = i % 26, (i // 26) % 26, (i // 676) % 26
+        coins.append(f"{chr(65 + c)}{chr(65 + b)}{chr(65 + a)}{i % 10}")
+        i += 1
+    return coins[:count]
+
+
+def _price(symbol: str, ts_ms: int) -> float:
+    seed = sum(ord(ch) for ch in symbol)
+    return 100.0 + seed + 10 * math.sin(ts_ms / 86_400_000 + seed)
+
+
+def _ticker(symbol: str) -> dict:
+    price = _price(symbol, int(time.time() * 1000))
+    return {
+        'symbol': symbol,
+        'lastPrice': f"{price:.4f}",
+        'prevPrice24h': f"{price * 0.98:.4f}",
+        'highPrice24h': f"{price * 1.03:.4f}",
+        'lowPrice24h': f"{price * 0.96:.4f}",
+        'volume24h': '12345.67',
+        'turnover24h': '98765432.1',
+        'price24hPcnt': '0.0204',
+    }
+
+
+def _ok(result: dict) -> web.Response:
+    return web.json_response({'retCode': 0, 'retMsg': 'OK', 'result': result, 'time': int(time.time() * 1000)})
+
+
+def make_app(instruments: int = 500, latency_ms: float = 0.0) -> web.Application:
+    """Собрать aiohttp приложение заглушки"""
+    coins = synthetic_base_coins(instruments)
+    stats = {'requests': 0}
+
+    async def maybe_sleep():
+        stats['requests'] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    async def tickers(request):
+        await maybe_sleep()
+        symbol = request.query.get('symbol')
+        symbols = [symbol] if symbol else [f"{coin}USDT" for coin in coins]
+        return _ok({'category': 'spot', 'list': [_ticker(s) for s in symbols]})
+
+    async def kline(request):
+        await maybe_sleep()
+        symbol = request.query.get('symbol', 'BTCUSDT')
+        interval = request.query.get('interval', '60')
+        step = INTERVAL_MS.get(interval, 3_600_000)
+        limit = min(int(request.query.get('limit', '200')), 1000)
+        now = int(time.time() * 1000)
+        end = int(request.query.get('end', now))
+        start = int(request.query.get('start', 0))
+        last_open = end - end % step
+
+        rows = []
+        open_time = last_open
+        while len(rows) < limit and open_time >= start:
+            close = _price(symbol, open_time + step)
+            open_ = _price(symbol, open_time)
+            rows.append([
+                str(open_time), f"{open_:.4f}", f"{max(open_, close) * 1.01:.4f}",
+                f"{min(open_, close) * 0.99:.4f}", f"{close:.4f}", '100.5', '10050.0'
+            ])
+            open_time -= step
+        return _ok({'category': 'spot', 'symbol': symbol, 'list': rows})
+
+    async def instruments_info(request):
+        await maybe_sleep()
+        return _ok({'category': 'spot', 'list': [
+            {'symbol': f"{coin}USDT", 'baseCoin': coin, 'quoteCoin': 'USDT', 'status': 'Trading'}
+            for coin in coins
+        ]})
+
+    async def stub_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get('/v5/market/tickers', tickers)
+    app.router.add_get('/v5/market/kline', kline)
+    app.router.add_get('/v5/market/instruments-info', instruments_info)
+    app.router.add_get('/stub/stats', stub_stats)
+    return app
+
+
+async def start_stub_server(host: str = '127.0.0.1', port: int = 0, ssl_context=None, **app_kwargs):
+    """Запустить заглушку в текущем цикле, вернуть (runner, port)"""
+    runner = web.AppRunner(make_app(**app_kwargs), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, ssl_context=ssl_context)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+def start_stub_in_thread(**kwargs) -> int:
+    """Запустить заглушку в фоновом потоке, вернуть порт"""
+    ready = threading.Event()
+    holder = {}
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner, port = loop.run_until_complete(start_stub_server(**kwargs))
+        holder['port'] = port
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, name='bybit-stub', daemon=True).start()
+    ready.wait()
+    return holder['port']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--instruments', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='искусственная задержка ответа')
+    args = parser.parse_args()
+    web.run_app(make_app(args.instruments, args.latency_ms), host=args.host, port=args.port)
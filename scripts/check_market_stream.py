@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Проверка MarketStream на локальных заглушках REST и WebSocket
+Поднимает scripts/bybit_stub.py и scripts/ws_replay_stub.py, который рвет
+соединение каждые --drop-after кадров, и проверяет, что поток
+переподключается, заново подписывается и обновляет тикеры и свечи, а
+get_current_price/get_kline_data отвечают без запросов к REST.
+
+    python scripts/check_market_stream.py --seconds 5 --drop-after 150
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bybit_stub import start_stub_in_thread
+from scripts.ws_replay_stub import start_ws_stub_in_thread
+from services.bybit_service import BybitService
+from services.market_stream import MarketStream
+
+
+async def run_check(rest_port: int, ws_port: int, symbols, intervals, seconds: float, silent: bool) -> bool:
+    service = BybitService(base_url=f"http://127.0.0.1:{rest_port}")
+    stream = MarketStream(service, url=f"ws://127.0.0.1:{ws_port}/v5/public/spot",
+                          symbols=symbols, intervals=intervals, ping_interval=0.5, max_backoff=0.5)
+
+    # Окна свечей загружаются через REST, дальше их ведет поток
+    for symbol in symbols:
+        for interval in intervals:
+            await service.get_kline_data(symbol, interval, 90)
+
+    task = asyncio.ensure_future(stream._run())
+    await asyncio.sleep(seconds)
+
+    upstream_before = service.get_stats()['upstream_requests']
+    for symbol in symbols:
+        await service.get_current_price(symbol)
+        for interval in intervals:
+            await service.get_kline_data(symbol, interval, 90)
+    upstream_reads = service.get_stats()['upstream_requests'] - upstream_before
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await service.close()
+
+    stats = stream.stats()
+    print(f"stream:  {stats}")
+    print(f"tickers: {service.tickers.stats()}")
+    print(f"candles: {service.candles.stats()}")
+    print(f"REST requests for {len(symbols)} tickers + {len(symbols) * len(intervals)} kline reads "
+          f"after warm-up: {upstream_reads}")
+
+    checks = {
+        'reconnected': stats['connects'] >= 2,
+        'tickers streamed': service.tickers.stats()['symbols'] == len(symbols),
+        'candles streamed': service.candles.stats()['stream_updates'] > 0,
+        'reads served locally': upstream_reads == 0,
+    }
+    if silent:
+        checks['heartbeat timeout detected'] = stats['errors'] > 0
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return all(checks.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', default='BTCUSDT,ETHUSDT,SOLUSDT')
+    parser.add_argument('--intervals', default='D,60')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--drop-after', type=int, default=150)
+    parser.add_argument('--silent-after', type=int, default=0, help='проверить heartbeat вместо обрыва')
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(',')
+    intervals = args.intervals.split(',')
+    rest_port = start_stub_in_thread()
+    ws_port = start_ws_stub_in_thread(symbols=symbols, intervals=intervals,
+                                      drop_after=0 if args.silent_after else args.drop_after,
+                                      silent_after=args.silent_after)
+    ok = asyncio.run(run_check(rest_port, ws_port, symbols, intervals, args.seconds, bool(args.silent_after)))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
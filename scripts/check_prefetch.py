@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Проверка фонового обновления кэша (services.prefetcher) на заглушке Bybit
+Запросы к /api/crypto/<symbol> идут вперемешку по популярным символам и
+одному часто запрашиваемому непопулярному. TTL и время отдачи устаревшего
+значения сокращены до --ttl и --stale секунд, чтобы за --duration секунд
+прошло много циклов обновления. Каждый вариант (без обновления и с ним)
+запускается в отдельном процессе после --warmup секунд от старта. Для
+каждого выводится доля запросов со свежим, устаревшим и отсутствующим
+кэшем и нагрузка на upstream.
+
+    python scripts/check_prefetch.py
+    python scripts/check_prefetch.py --ttl 4 --duration 30 --rps 20
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+HOT_SYMBOL = 'PEPEUSDT'
+
+
+def child(args):
+    """Прогон в чистом процессе: результат - JSON в stdout"""
+    from scripts.bybit_stub import start_stub_in_thread
+
+    port = start_stub_in_thread()
+    os.environ['BYBIT_REST_URL'] = f"http://127.0.0.1:{port}"
+
+    import api.web_app_api as web
+    from config import POPULAR_CRYPTOS
+
+    web.cache.ttls['crypto'] = args.ttl
+    web.cache.stale_ttl = args.stale
+    web.prefetcher.ttl = args.ttl
+    web.prefetcher.bucket.rate = args.rate
+    client = web.app.test_client()
+    if args.child == 'on':
+        web.prefetcher.start(web.background_loop)
+    time.sleep(args.warmup)
+
+    def upstream_requests() -> int:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stub/stats") as response:
+            return json.loads(response.read())['requests']
+
+    popular = [crypto['symbol'] for crypto in POPULAR_CRYPTOS]
+    outcomes = {'fresh': 0, 'stale': 0, 'miss': 0}
+    latencies = []
+    rng = random.Random(0)
+    started_requests = upstream_requests()
+    started = time.time()
+    while time.time() - started < args.duration:
+        symbol = HOT_SYMBOL if rng.random() < 0.3 else rng.choice(popular)
+        entry = web.cache.get_entry(f"crypto:{symbol}")
+        outcomes['miss' if entry is None else 'stale' if entry[1] else 'fresh'] += 1
+
+        request_started = time.perf_counter()
+        client.get(f"/api/crypto/{symbol}")
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        time.sleep(rng.expovariate(args.rps))
+
+    elapsed = time.time() - started
+    latencies.sort()
+    print(json.dumps({
+        'outcomes': outcomes, 'upstream_rps': (upstream_requests() - started_requests) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2], 'p99_ms': latencies[int(len(latencies) * 0.99)],
+        'prefetch': web.prefetcher.stats()
+    }))
+
+
+def run_child(mode: str, args) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--ttl', str(args.ttl),
+               '--stale', str(args.stale), '--warmup', str(args.warmup), '--duration', str(args.duration),
+               '--rps', str(args.rps), '--rate', str(args.rate)]
+    output = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr else 'child failed')
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ttl', type=float, default=5.0, help='TTL кэша /api/crypto, секунд')
+    parser.add_argument('--stale', type=float, default=5.0, help='сколько секунд отдается устаревшее значение')
+    parser.add_argument('--warmup', type=float, default=2.0, help='пауза после старта процесса')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--rps', type=float, default=4.0, help='средняя частота запросов пользователей')
+    parser.add_argument('--rate', type=float, default=20.0, help='бюджет upstream запросов обновления в секунду')
+    parser.add_argument('--child', choices=['off', 'on'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{'prefetch':<10}{'requests':>9}{'fresh':>8}{'stale':>8}{'miss':>7}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'upstream/s':>12}")
+    results = {}
+    for mode in ('off', 'on'):
+        r = results[mode] = run_child(mode, args)
+        total = sum(r['outcomes'].values())
+        share = {k: v / total * 100 for k, v in r['outcomes'].items()}
+        print(f"{mode:<10}{total:>9}{share['fresh']:>7.1f}%{share['stale']:>7.1f}%{share['miss']:>6.1f}%"
+              f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['upstream_rps']:>12.1f}")
+
+    stats = results['on']['prefetch']
+    print(f"\nprefetch: {stats['refreshes']} refreshes, {stats['errors']} errors, "
+          f"max lag {stats['max_lag_s']} s, throttled {stats['throttled_s']} s, hot: {stats['hot']}")
+
+
+if __name__ == '__main__':
+    main()
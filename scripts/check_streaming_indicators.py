@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Проверка потоковых индикаторов (services/streaming_indicators.py) против
+полного пересчета серии: RunningEMA - с EMA через scipy.signal.lfilter,
+WilderRSI и RollingWindow - с services.indicators. Цены подаются по одной,
+часть обновлений идет через revise (незакрытая свеча), состояние проходит
+snapshot/restore через JSON.
+
+    python scripts/check_streaming_indicators.py
+    python scripts/check_streaming_indicators.py --points 5000 --window 26
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from scipy.signal import lfilter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import indicators
+from services.streaming_indicators import IndicatorState, RollingWindow, RunningEMA, WilderRSI
+
+TOLERANCE = 1e-9
+
+
+def reference_ema(values: np.ndarray, window: int) -> np.ndarray:
+    """EMA рекуррентным фильтром: y[i] = alpha * x[i] + (1 - alpha) * y[i - 1], y[0] = x[0]"""
+    alpha = 2.0 / (window + 1)
+    result, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * values[0]])
+    return result
+
+
+def stream(indicator, values: np.ndarray, rng: np.random.Generator) -> list:
+    """Подать значения по одному; перед частью из них - черновое значение и revise"""
+    result = []
+    for x in values:
+        if rng.random() < 0.3:
+            indicator.update(x * (1 + rng.normal(0, 0.01)))
+            indicator.revise(x)
+        else:
+            indicator.update(x)
+        result.append(indicator.value if not isinstance(indicator, RollingWindow) else indicator.mean)
+    return result
+
+
+def relative_error(a, b) -> float:
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    mask = ~np.isnan(b)
+    return float(np.max(np.abs(a[mask] - b[mask]) / np.abs(b[mask])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=2000)
+    parser.add_argument('--window', type=int, default=12, help='окно EMA и скользящего среднего')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    close = 30000 + np.cumsum(rng.normal(0, 300, args.points))
+    checks = []
+
+    ema = RunningEMA(args.window)
+    streamed = stream(ema, close, rng)
+    checks.append((f"RunningEMA({args.window}) == lfilter EMA",
+                   relative_error(streamed, reference_ema(close, args.window)) < TOLERANCE))
+    checks.append(("RunningEMA == indicators.ema",
+                   relative_error(streamed, indicators.ema(close, args.window)) < TOLERANCE))
+
+    half = args.points // 2
+    ema = RunningEMA(args.window)
+    stream(ema, close[:half], rng)
+    restored = RunningEMA.restore(json.loads(json.dumps(ema.snapshot())))
+    checks.append(("RunningEMA continues after snapshot/restore",
+                   relative_error(stream(restored, close[half:], rng),
+                                  reference_ema(close, args.window)[half:]) < TOLERANCE))
+
+    rsi = WilderRSI(14)
+    streamed = [np.nan if v is None else v for v in stream(rsi, close, rng)]
+    checks.append(("WilderRSI(14) == indicators.rsi", relative_error(streamed, indicators.rsi(close, 14)) < 1e-6))
+
+    window = RollingWindow(args.window)
+    streamed = stream(window, close, rng)
+    expected = indicators.sma(close, args.window)
+    checks.append((f"RollingWindow({args.window}).mean == indicators.sma",
+                   relative_error(streamed[args.window - 1:], expected[args.window - 1:]) < TOLERANCE))
+
+    state = IndicatorState()
+    for ts, x in enumerate(close.tolist()):
+        state.update(ts, x * 1.01)
+        state.update(ts, x)
+    result = state.indicators()
+    checks.append(("IndicatorState ema_12/ema_26 == lfilter EMA",
+                   all(abs(result[f'ema_{n}'] - reference_ema(close, n)[-1]) / close[-1] < TOLERANCE
+                       for n in IndicatorState.EMA_WINDOWS)))
+    restored = IndicatorState.restore(json.loads(json.dumps(state.snapshot())))
+    checks.append(("IndicatorState snapshot/restore keeps indicators", restored.indicators() == result))
+
+    for name, passed in checks:
+        print(f"  [{'ok' if passed else 'FAIL'}] {name}")
+    sys.exit(0 if all(passed for _, passed in checks) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Экспорт обученных моделей .h5 в .npz для NumPy рантайма
+Нужен для моделей, обученных до появления экспорта (train_models.py
+экспортирует сам). Файл пишется атомарно; --check сверяет прогноз NumPy
+рантайма с Keras на синтетических ценах.
+
+    python scripts/export_models.py
+    python scripts/export_models.py --symbols BTCUSDT,ETHUSDT --check
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import MODEL_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default=MODEL_DIR)
+    parser.add_argument('--symbols', help='символы через запятую (по умолчанию все .h5 в каталоге)')
+    parser.add_argument('--check', action='store_true', help='сверить прогнозы NumPy и Keras')
+    args = parser.parse_args()
+
+    try:
+        from models.lstm_model import LSTMPredictor
+    except ImportError:
+        print("TensorFlow is not installed: pip install -r requirements.txt")
+        sys.exit(1)
+    from models.numpy_lstm import NumpyLSTMPredictor
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(',')]
+    else:
+        symbols = sorted(name[:-len('_lstm.h5')] for name in os.listdir(args.directory) if name.endswith('_lstm.h5'))
+
+    prices = (30000 + np.cumsum(np.random.default_rng(0).normal(0, 300, 90))).tolist()
+    failed = 0
+    for symbol in symbols:
+        try:
+            predictor = LSTMPredictor()
+            predictor.load(symbol, args.directory)
+
+            tmp_dir = tempfile.mkdtemp(prefix=f".{symbol}-", dir=args.directory)
+            try:
+                os.replace(predictor.export(symbol, tmp_dir), os.path.join(args.directory, f"{symbol}_lstm.npz"))
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception as e:
+            failed += 1
+            print(f"❌ {symbol}: {e!r}")
+            continue
+
+        line = f"✅ {symbol}"
+        if args.check:
+            runtime = NumpyLSTMPredictor.from_file(os.path.join(args.directory, f"{symbol}_lstm.npz"))
+            diff = np.max(np.abs(np.array(runtime.forecast(prices, 7)) - np.array(predictor.forecast(prices, 7))))
+            line += f"  max |numpy - keras| = {diff:.6f}"
+        print(line)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
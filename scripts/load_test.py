@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест Flask API в режимах выполнения async обработчиков
+Поднимает заглушку Bybit, запускает API в каждом режиме (API_LOOP_MODE)
+и сравнивает пропускную способность и хвостовые задержки
+
+    python scripts/load_test.py --duration 10 --concurrency 16
+    python scripts/load_test.py --modes shared --path "/api/crypto/BTCUSDT"
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from scripts.bybit_stub import start_stub_in_thread
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_api(mode: str, port: int, stub_port: int, extra_env: dict) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'API_LOOP_MODE': mode,
+        'BYBIT_REST_URL': f"http://127.0.0.1:{stub_port}",
+        'FLASK_ENV': 'production',
+        'LOG_LEVEL': 'WARNING',
+    })
+    env.update(extra_env)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'api.web_app_api'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"API did not start in mode '{mode}'")
+
+
+def run_load(port: int, path: str, method: str, duration: float, concurrency: int):
+    """Закрытая модель нагрузки: concurrency клиентов, каждый со своим keep-alive соединением"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        local = []
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request(method, path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    with lock:
+                        errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    elapsed = time.perf_counter() - started
+    return np.array(latencies) * 1000, errors[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='per_request,shared')
+    parser.add_argument('--path', default='/api/klines/BTCUSDT?interval=60&limit=200')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--upstream-latency-ms', type=float, default=20.0,
+                        help='задержка заглушки Bybit (имитация сети)')
+    parser.add_argument('--env', action='append', default=[], help='KEY=VALUE для процесса API')
+    args = parser.parse_args()
+
+    stub_port = start_stub_in_thread(latency_ms=args.upstream_latency_ms)
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    print(f"{args.method} {args.path}  duration={args.duration}s  concurrency={args.concurrency}  "
+          f"upstream latency={args.upstream_latency_ms}ms\n")
+    print(f"{'mode':<12} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    for mode in args.modes.split(','):
+        port = free_port()
+        process = start_api(mode, port, stub_port, extra_env)
+        try:
+            run_load(port, args.path, args.method, min(2.0, args.duration), args.concurrency)  # прогрев
+            latencies, errors, elapsed = run_load(port, args.path, args.method, args.duration, args.concurrency)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+        if len(latencies) == 0:
+            print(f"{mode:<12} no successful requests")
+            continue
+        print(f"{mode:<12} {len(latencies):>9} {errors:>7} {len(latencies) / elapsed:>9.1f} "
+              f"{np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 95):>9.2f} "
+              f"{np.percentile(latencies, 99):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Обслуживание price_history (PostgreSQL из DATABASE_URL) одним запуском
+Досчитывает агрегаты 1m/1h/1d, затем удаляет (или с --archive переносит в
+price_history_archive) строки старше срока хранения. То же самое API
+делает в фоне (services/price_maintenance.py); скрипт нужен для cron без
+запущенного API и для первого пересчета большой таблицы. С --report
+печатает размеры таблиц и время запроса истории за разные периоды.
+
+    python scripts/maintain_price_history.py
+    python scripts/maintain_price_history.py --raw-days 3 --archive
+    python scripts/maintain_price_history.py --skip-retention --report BTCUSDT
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import PRICE_HISTORY_ARCHIVE, PRICE_RAW_RETENTION_DAYS
+
+REPORT_SPANS = (timedelta(hours=6), timedelta(days=7), timedelta(days=90), timedelta(days=730))
+
+
+def report(db, symbol: str, queries: int):
+    with db.get_cursor(cursor_factory=None) as cur:
+        for table in ('price_history', 'price_rollups', 'price_history_archive'):
+            cur.execute("SELECT reltuples::bigint, pg_total_relation_size(%s) FROM pg_class WHERE relname = %s",
+                        (table, table))
+            rows, size = cur.fetchone()
+            print(f"{table:<24}{rows:>14,} rows{size / 2 ** 20:>10.1f} MB")
+
+    print(f"\n{'period':<12}{'resolution':>12}{'points':>10}{'p50 ms':>10}")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for span in REPORT_SPANS:
+        latencies = []
+        for _ in range(queries):
+            started = time.perf_counter()
+            result = db.get_price_history_range(symbol, now - span, now)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        print(f"{str(span.days) + 'd' if span.days else str(span):<12}{result['resolution']:>12}"
+              f"{len(result['points']):>10}{latencies[len(latencies) // 2]:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--raw-days', type=int, default=PRICE_RAW_RETENTION_DAYS, help='дней хранения сырых снимков')
+    parser.add_argument('--archive', action='store_true', default=PRICE_HISTORY_ARCHIVE,
+                        help='переносить сырые снимки в price_history_archive вместо удаления')
+    parser.add_argument('--skip-rollup', action='store_true')
+    parser.add_argument('--skip-retention', action='store_true')
+    parser.add_argument('--report', metavar='SYMBOL', help='размеры таблиц и время запроса истории символа')
+    parser.add_argument('--queries', type=int, default=20, help='запросов на период для --report')
+    args = parser.parse_args()
+
+    from models.database import db
+    if db is None or not db.is_connected:
+        print("PostgreSQL is not available: check DATABASE_URL")
+        sys.exit(1)
+
+    if not args.skip_rollup:
+        started = time.perf_counter()
+        rolled = db.rollup_price_history()
+        print(f"rollup: {rolled} buckets in {time.perf_counter() - started:.1f}s")
+    if not args.skip_retention:
+        started = time.perf_counter()
+        removed = db.apply_price_retention(raw_days=args.raw_days, archive=args.archive)
+        action = 'archived' if args.archive else 'deleted'
+        print(f"retention: {removed} rows {action} in {time.perf_counter() - started:.1f}s")
+    if args.report:
+        print()
+        report(db, args.report.upper(), args.queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Офлайн-обучение LSTM моделей по символам
+Загружает дневную историю для символов из POPULAR_CRYPTOS (или из БД),
+обучает модели параллельно в пуле процессов с ограничением потоков
+TensorFlow на процесс и атомарно записывает их в каталог реестра
+(MODEL_DIR) вместе с метриками и экспортом весов .npz для NumPy рантайма.
+Обучение идет только на закрытых дневных свечах. Символы, данные и
+параметры которых не изменились с прошлого обучения, пропускаются.
+
+    python scripts/train_models.py
+    python scripts/train_models.py --source db --workers 4 --threads 2
+    python scripts/train_models.py --synthetic --epochs 2 --directory /tmp/models
+    python scripts/train_models.py --shared --horizon 7
+    python scripts/check_training.py  # синтетическое обучение и загрузка моделей реестром
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import POPULAR_CRYPTOS, MODEL_DIR, SEQUENCE_LENGTH, EPOCHS, BATCH_SIZE, SHARED_MODEL_SYMBOL
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def load_symbols(source: str) -> List[str]:
+    """Символы из БД (если доступна) или из POPULAR_CRYPTOS"""
+    if source == 'db':
+        from models.database import db
+
+        if db is not None and db.is_connected:
+            symbols = [row['symbol'] for row in db.get_all_cryptocurrencies()]
+            if symbols:
+                return symbols
+        logger.warning("БД недоступна или пуста, используются POPULAR_CRYPTOS")
+    return [crypto['symbol'] for crypto in POPULAR_CRYPTOS]
+
+
+def synthetic_history(symbol: str, count: int) -> List[float]:
+    """Детерминированное случайное блуждание для проверки без сети"""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    return (1000 + np.cumsum(rng.normal(0, 10, count))).clip(min=1).tolist()
+
+
+def closed_closes(candles) -> List[float]:
+    """Закрытия только закрытых дневных свечей (как closed_candles в API)
+
+    Последняя свеча Bybit еще формируется: ее цена меняется с каждым тиком,
+    а вместе с ней - отпечаток данных, и символ переобучался бы каждый запуск.
+    """
+    from services.candle_store import INTERVAL_MS
+
+    if len(candles) and candles.ts[-1] + INTERVAL_MS["D"] > time.time() * 1000:
+        candles = candles[:len(candles) - 1]
+    return candles.close.tolist()
+
+
+async def fetch_bybit_history(symbols: List[str], limit: int) -> Dict[str, List[float]]:
+    from services.bybit_service import BybitService
+
+    service = BybitService()
+    try:
+        histories = {}
+        for symbol in symbols:
+            # +1: последняя (незакрытая) свеча отбрасывается
+            candles = await service.get_kline_data(symbol, "D", limit + 1)
+            if candles is not None and len(candles):
+                histories[symbol] = closed_closes(candles)[-limit:]
+        return histories
+    finally:
+        await service.close()
+
+
+def load_db_history(symbols: List[str], limit: int) -> Dict[str, List[float]]:
+    """Закрытия дневных свечей из таблицы candles - тот же ряд, на котором модель прогнозирует"""
+    from models.database import db
+
+    if db is None or not db.is_connected:
+        return {}
+    histories = {}
+    for symbol in symbols:
+        candles = db.get_candles(symbol, "D", limit + 1)
+        if candles is not None and len(candles):
+            histories[symbol] = closed_closes(candles)[-limit:]
+    return histories
+
+
+def fingerprint(series: List[List[float]], params: Dict) -> str:
+    """Хэш данных и параметров обучения: по нему решается, нужно ли переобучение"""
+    digest = hashlib.sha256()
+    for prices in series:
+        digest.update(np.asarray(prices, dtype=np.float64).tobytes())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def is_up_to_date(directory: str, symbol: str, data_fingerprint: str) -> bool:
+    """Модель обучена на тех же данных и параметрах, а экспорт .npz (его отдает реестр) не старше .h5"""
+    paths = [os.path.join(directory, f"{symbol}{suffix}")
+             for suffix in ('_lstm.h5', '_scaler.json', '_meta.json', '_lstm.npz')]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    try:
+        if os.path.getmtime(paths[3]) < os.path.getmtime(paths[0]):
+            return False
+        with open(paths[2]) as f:
+            return json.load(f).get('data_fingerprint') == data_fingerprint
+    except (OSError, ValueError):
+        return False
+
+
+def init_worker(threads: int):
+    """Ограничение потоков TensorFlow/BLAS в процессе пула (до импорта TF)"""
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def train_symbol(job: Dict) -> Dict:
+    """Обучить и записать модель одного символа (выполняется в процессе пула)"""
+    from models.lstm_model import LSTMPredictor
+
+    symbol, directory = job['symbol'], job['directory']
+    started = time.time()
+    try:
+        predictor = LSTMPredictor(sequence_length=job['sequence_length'], horizon=job['horizon'],
+                                  scaling=job['scaling'])
+        metrics = predictor.fit_many(job['series'], epochs=job['epochs'], batch_size=job['batch_size'])
+
+        meta = {
+            'symbol': symbol,
+            'version': time.strftime('%Y%m%d%H%M%S', time.gmtime(started)),
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(started)),
+            'sequence_length': job['sequence_length'],
+            'horizon': job['horizon'],
+            'scaling': job['scaling'],
+            'shared': job['shared'],
+            'epochs': job['epochs'],
+            'batch_size': job['batch_size'],
+            'data_points': sum(len(prices) for prices in job['series']),
+            'data_fingerprint': job['fingerprint'],
+            'metrics': metrics,
+        }
+
+        # Пишем во временный каталог рядом с реестром и переносим через
+        # os.replace. Веса переносятся последними: реестр определяет новую
+        # версию по времени изменения .npz (или .h5), и к этому моменту
+        # scaler и метаданные уже новые
+        tmp_dir = tempfile.mkdtemp(prefix=f".{symbol}-", dir=directory)
+        try:
+            predictor.save(symbol, tmp_dir)
+            predictor.export(symbol, tmp_dir)
+            with open(os.path.join(tmp_dir, f"{symbol}_meta.json"), 'w') as f:
+                json.dump(meta, f, indent=2)
+            for suffix in ('_scaler.json', '_meta.json', '_lstm.h5', '_lstm.npz'):
+                name = f"{symbol}{suffix}"
+                os.replace(os.path.join(tmp_dir, name), os.path.join(directory, name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return {'symbol': symbol, 'status': 'trained', 'seconds': time.time() - started,
+                'version': meta['version'], 'metrics': metrics}
+    except Exception as e:
+        return {'symbol': symbol, 'status': 'error', 'seconds': time.time() - started, 'error': repr(e)}
+
+
+def train_all(jobs: List[Dict], workers: int, threads: int) -> List[Dict]:
+    if not jobs:
+        return []
+    # spawn: TensorFlow не переживает fork, а главный процесс его не импортирует
+    context = multiprocessing.get_context('spawn')
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(train_symbol, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'trained':
+                logger.info(f"✅ {result['symbol']}: v{result['version']} за {result['seconds']:.1f}s, "
+                            f"val_rmse={result['metrics'].get('val_rmse', 0):.4f}")
+            else:
+                logger.error(f"❌ {result['symbol']}: {result['error']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', help='символы через запятую (по умолчанию POPULAR_CRYPTOS или БД)')
+    parser.add_argument('--source', choices=['bybit', 'db'], default='bybit',
+                        help='откуда брать дневные свечи (db - таблица candles)')
+    parser.add_argument('--synthetic', action='store_true', help='синтетическая история вместо загрузки')
+    parser.add_argument('--history', type=int, default=1000, help='дневных свечей на символ')
+    parser.add_argument('--directory', default=MODEL_DIR)
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--sequence-length', type=int, default=SEQUENCE_LENGTH)
+    parser.add_argument('--horizon', type=int, default=1, help='шагов на выходе модели (прямой многошаговый прогноз)')
+    parser.add_argument('--shared', action='store_true',
+                        help=f'одна общая модель {SHARED_MODEL_SYMBOL} на все символы (масштаб по окну)')
+    parser.add_argument('--workers', type=int, default=0, help='процессов обучения (по умолчанию по числу CPU)')
+    parser.add_argument('--threads', type=int, default=0, help='потоков TensorFlow на процесс')
+    parser.add_argument('--force', action='store_true', help='переобучить даже без изменений в данных')
+    args = parser.parse_args()
+
+    symbols = [s.strip().upper() for s in args.symbols.split(',')] if args.symbols else load_symbols(args.source)
+    os.makedirs(args.directory, exist_ok=True)
+
+    if args.synthetic:
+        histories = {symbol: synthetic_history(symbol, args.history) for symbol in symbols}
+    elif args.source == 'db':
+        histories = load_db_history(symbols, args.history)
+    else:
+        histories = asyncio.run(fetch_bybit_history(symbols, args.history))
+
+    params = {'sequence_length': args.sequence_length, 'horizon': args.horizon, 'epochs': args.epochs,
+              'batch_size': args.batch_size, 'scaling': 'window' if args.shared else 'global',
+              'shared': args.shared}
+    ready, missing = {}, []
+    for symbol in symbols:
+        prices = histories.get(symbol)
+        if not prices or len(prices) < args.sequence_length + 100:
+            missing.append(symbol)
+        else:
+            ready[symbol] = prices
+
+    # Общая модель - одна задача на все ряды, иначе - задача на символ
+    if args.shared:
+        candidates = [(SHARED_MODEL_SYMBOL, list(ready.values()))] if ready else []
+    else:
+        candidates = [(symbol, [prices]) for symbol, prices in ready.items()]
+
+    jobs, skipped = [], []
+    for name, series in candidates:
+        data_fingerprint = fingerprint(series, params)
+        if not args.force and is_up_to_date(args.directory, name, data_fingerprint):
+            skipped.append(name)
+            continue
+        jobs.append({'symbol': name, 'series': series, 'fingerprint': data_fingerprint,
+                     'directory': args.directory, **params})
+
+    if missing:
+        logger.warning(f"⚠️ Недостаточно истории: {', '.join(missing)}")
+    if skipped:
+        logger.info(f"⏭️ Без изменений: {', '.join(skipped)}")
+
+    if jobs and importlib.util.find_spec('tensorflow') is None:
+        print("TensorFlow is not installed: pip install -r requirements.txt")
+        sys.exit(1)
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or max(1, min(len(jobs), cpus))
+    threads = args.threads or max(1, cpus // workers)
+    logger.info(f"🧠 Обучение {len(jobs)} моделей: {workers} процессов x {threads} потоков -> {args.directory}")
+
+    started = time.time()
+    results = train_all(jobs, workers, threads)
+    failed = [r for r in results if r['status'] != 'trained']
+
+    print(f"\nTrained: {len(results) - len(failed)}, skipped: {len(skipped)}, "
+          f"no data: {len(missing)}, failed: {len(failed)} in {time.time() - started:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
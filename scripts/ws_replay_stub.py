@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка публичного WebSocket Bybit V5 (/v5/public/spot)
+Отвечает на subscribe/ping и проигрывает кадры tickers.* и kline.* -
+записанные с настоящего потока (--frames) или синтетические, согласованные
+с ценами scripts/bybit_stub.py. Умеет рвать соединение (--drop-after) и
+замолкать (--silent-after) для проверки переподключения и heartbeat.
+
+    python scripts/ws_replay_stub.py --port 18081 --drop-after 200
+    python scripts/ws_replay_stub.py --record frames.jsonl --seconds 60 --symbols BTCUSDT,ETHUSDT
+    python scripts/ws_replay_stub.py --frames frames.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.bybit_stub import INTERVAL_MS, _price, _ticker
+
+DAY_MS = 86_400_000
+
+
+def synthetic_frames(symbols: List[str], intervals: List[str], count: int = 100,
+                     period: float = 0.05) -> List[Dict]:
+    """Кадры в формате записи: [{'t': смещение в секундах, 'frame': сообщение Bybit}]"""
+    frames = []
+    started = int(time.time() * 1000)
+    for i in range(count):
+        now = started + int(i * period * 1000)
+        for symbol in symbols:
+            ticker = _ticker(symbol)
+            frames.append({'t': i * period, 'frame': {
+                'topic': f"tickers.{symbol}", 'ts': now, 'type': 'snapshot', 'data': ticker}})
+            for interval in intervals:
+                step = INTERVAL_MS[interval]
+                start = now - now % step
+                open_, close = _price(symbol, start), _price(symbol, now)
+                frames.append({'t': i * period, 'frame': {
+                    'topic': f"kline.{interval}.{symbol}", 'ts': now, 'type': 'snapshot', 'data': [{
+                        'start': start, 'end': start + step - 1, 'interval': interval,
+                        'open': f"{open_:.4f}", 'close': f"{close:.4f}",
+                        'high': f"{max(open_, close) * 1.01:.4f}", 'low': f"{min(open_, close) * 0.99:.4f}",
+                        'volume': '100.5', 'turnover': '10050.0', 'confirm': False, 'timestamp': now}]}})
+    return frames
+
+
+def load_frames(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def retime(frame: Dict, offset_ms: int) -> Dict:
+    """Сдвинуть время кадра (offset кратен суткам - начала свечей остаются выровненными)"""
+    frame = json.loads(json.dumps(frame))
+    if 'ts' in frame:
+        frame['ts'] += offset_ms
+    data = frame.get('data')
+    if isinstance(data, list):
+        for row in data:
+            for key in ('start', 'end', 'timestamp'):
+                if key in row:
+                    row[key] = int(row[key]) + offset_ms
+    return frame
+
+
+def make_ws_app(frames: Optional[List[Dict]] = None, symbols: Optional[List[str]] = None,
+                intervals: Optional[List[str]] = None, speed: float = 1.0,
+                drop_after: int = 0, silent_after: int = 0) -> web.Application:
+    """Собрать aiohttp приложение заглушки WebSocket"""
+    stats = {'connections': 0, 'subscribes': 0, 'pings': 0, 'frames_sent': 0, 'drops': 0}
+
+    def current_frames() -> List[Dict]:
+        if frames is not None:
+            return frames
+        return synthetic_frames(symbols or ['BTCUSDT', 'ETHUSDT'], intervals or ['D', '60'])
+
+    async def stream(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        stats['connections'] += 1
+        topics = set()
+        state = {'sent': 0, 'silent': False}
+
+        async def replay():
+            recorded = current_frames()
+            if not recorded:
+                return
+            first_ts = recorded[0]['frame'].get('ts', int(time.time() * 1000))
+            offset = (int(time.time() * 1000) - first_ts) // DAY_MS * DAY_MS
+            started = time.monotonic()
+            for item in recorded:
+                delay = item['t'] / speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if item['frame'].get('topic') not in topics:
+                    continue
+                await ws.send_json(retime(item['frame'], offset))
+                state['sent'] += 1
+                stats['frames_sent'] += 1
+                if drop_after and state['sent'] >= drop_after:
+                    stats['drops'] += 1
+                    await ws.close()
+                    return
+                if silent_after and state['sent'] >= silent_after:
+                    state['silent'] = True
+                    return
+
+        replay_task = None
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT or state['silent']:
+                    continue
+                request_data = json.loads(message.data)
+                op = request_data.get('op')
+                if op == 'subscribe':
+                    stats['subscribes'] += 1
+                    topics.update(request_data.get('args', []))
+                    await ws.send_json({'success': True, 'ret_msg': '', 'conn_id': str(id(ws)), 'op': 'subscribe'})
+                    if replay_task is None:
+                        replay_task = asyncio.ensure_future(replay())
+                elif op == 'ping':
+                    stats['pings'] += 1
+                    await ws.send_json({'success': True, 'ret_msg': 'pong', 'conn_id': str(id(ws)), 'op': 'ping'})
+        finally:
+            if replay_task is not None:
+                replay_task.cancel()
+        return ws
+
+    async def stub_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get('/v5/public/spot', stream)
+    app.router.add_get('/stub/stats', stub_stats)
+    return app
+
+
+def start_ws_stub_in_thread(host: str = '127.0.0.1', port: int = 0, **app_kwargs) -> int:
+    """Запустить заглушку в фоновом потоке, вернуть порт"""
+    ready = threading.Event()
+    holder = {}
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(make_ws_app(**app_kwargs), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        holder['port'] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, name='ws-replay-stub', daemon=True).start()
+    ready.wait()
+    return holder['port']
+
+
+async def record(url: str, symbols: List[str], intervals: List[str], seconds: float, path: str):
+    """Записать кадры с настоящего потока в JSONL для последующего проигрывания"""
+    topics = [f"tickers.{s}" for s in symbols] + [f"kline.{i}.{s}" for s in symbols for i in intervals]
+    count = 0
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(url) as ws:
+            for i in range(0, len(topics), 10):
+                await ws.send_json({'op': 'subscribe', 'args': topics[i:i + 10]})
+            started = time.monotonic()
+            with open(path, 'w') as f:
+                while time.monotonic() - started < seconds:
+                    try:
+                        message = await ws.receive(timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    frame = json.loads(message.data)
+                    if 'topic' in frame:
+                        f.write(json.dumps({'t': round(time.monotonic() - started, 3), 'frame': frame}) + '\n')
+                        count += 1
+    print(f"Recorded {count} frames to {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18081)
+    parser.add_argument('--frames', help='JSONL файл записанных кадров')
+    parser.add_argument('--symbols', default='BTCUSDT,ETHUSDT')
+    parser.add_argument('--intervals', default='D,60')
+    parser.add_argument('--speed', type=float, default=1.0, help='ускорение проигрывания')
+    parser.add_argument('--drop-after', type=int, default=0, help='закрыть соединение после N кадров')
+    parser.add_argument('--silent-after', type=int, default=0, help='замолчать (без pong) после N кадров')
+    parser.add_argument('--record', help='записать кадры с --url в указанный файл и выйти')
+    parser.add_argument('--url', default='wss://stream.bybit.com/v5/public/spot')
+    parser.add_argument('--seconds', type=float, default=60)
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(',')
+    intervals = args.intervals.split(',')
+    if args.record:
+        asyncio.run(record(args.url, symbols, intervals, args.seconds, args.record))
+    else:
+        web.run_app(make_ws_app(load_frames(args.frames) if args.frames else None, symbols, intervals,
+                                args.speed, args.drop_after, args.silent_after),
+                    host=args.host, port=args.port)
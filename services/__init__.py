@@ -1,3 +1,8 @@
 from services.bybit_service import bybit_service
+from services.background_loop import background_loop
+from services.broadcaster import broadcaster, push_poller
+from services.market_stream import market_stream
+from services.write_behind import write_behind
+from services.price_maintenance import price_maintenance
 
-__all__ = ['bybit_service']
\ No newline at end of file
+__all__ = ['bybit_service', 'background_loop', 'broadcaster', 'push_poller', 'market_stream', 'write_behind', 'price_maintenance']
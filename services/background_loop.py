@@ -0,0 +1,171 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """Долгоживущий event loop в отдельном потоке
+
+    Синхронный код (обработчики Flask) отправляет корутины в общий цикл,
+    поэтому пулы соединений, кэши и in-flight запросы переживают отдельный запрос.
+    """
+
+    def __init__(self, name: str = 'async-loop'):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks: List[Callable[[], Awaitable]] = []
+        # Долгоживущие задачи сервисов: имя -> (pid, задача; None - еще не создана в цикле)
+        self._tasks: Dict[str, Tuple[int, Optional[asyncio.Task]]] = {}
+
+    @property
+    def is_running(self) -> bool:
+        """Цикл запущен в текущем процессе"""
+        return (self._thread is not None and self._thread.is_alive()
+                and self._pid == os.getpid())
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Запустить поток с циклом (идемпотентно, безопасно после fork)"""
+        if self.is_running:
+            return self.loop
+
+        with self._lock:
+            if self.is_running:
+                return self.loop
+
+            ready = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            logger.info(f"Background event loop '{self.name}' started (pid={self._pid})")
+            return self.loop
+
+    def _run(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """Отправить корутину в цикл, вернуть concurrent.futures.Future
+
+        Корутина выполняется в копии contextvars вызывающего потока,
+        поэтому flask.request и app context доступны внутри обработчика.
+        """
+        loop = self.start()
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def _copy_result(task: asyncio.Future):
+            if future.cancelled():
+                return
+            try:
+                if task.cancelled():
+                    future.set_exception(concurrent.futures.CancelledError())
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+            except concurrent.futures.InvalidStateError:
+                pass
+
+        def _schedule():
+            if future.cancelled():
+                coro.close()
+                return
+            task = asyncio.ensure_future(coro)
+            task.add_done_callback(_copy_result)
+            future.add_done_callback(
+                lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel)
+            )
+
+        loop.call_soon_threadsafe(_schedule, context=context)
+        return future
+
+    def start_task(self, name: str, coro_factory: Callable[[], Awaitable]) -> bool:
+        """Запустить фоновую задачу сервиса, если она еще не работает в этом процессе
+
+        coro_factory вызывается уже в цикле. Задачи учитываются по pid: после
+        fork задача родителя осталась в мертвом цикле, и в дочернем процессе
+        она запускается заново. False - задача уже запущена.
+        """
+        pid = os.getpid()
+        with self._lock:
+            current = self._tasks.get(name)
+            if current is not None and current[0] == pid and (current[1] is None or not current[1].done()):
+                return False
+            self._tasks[name] = (pid, None)
+
+        async def _start():
+            task = asyncio.ensure_future(coro_factory())
+            with self._lock:
+                self._tasks[name] = (pid, task)
+
+        self.submit(_start())
+        return True
+
+    def cancel_task(self, name: str):
+        """Отменить фоновую задачу, запущенную start_task"""
+        with self._lock:
+            current = self._tasks.pop(name, None)
+        if current is not None and current[0] == os.getpid() and current[1] is not None:
+            self.loop.call_soon_threadsafe(current[1].cancel)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Выполнить корутину в цикле и дождаться результата"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable]):
+        """Корутина-функция, вызываемая в цикле перед его остановкой"""
+        self._shutdown_hooks.append(hook)
+
+    async def _run_shutdown_hooks(self):
+        for hook in reversed(self._shutdown_hooks):
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"Shutdown hook error: {e}")
+
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self, timeout: float = 5.0):
+        """Выполнить shutdown hooks и остановить цикл"""
+        if not self.is_running:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._run_shutdown_hooks(), self.loop).result(timeout)
+        except Exception as e:
+            logger.error(f"Background loop shutdown error: {e}")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        logger.info(f"Background event loop '{self.name}' stopped")
+
+
+# Глобальный экземпляр
+background_loop = BackgroundLoop()
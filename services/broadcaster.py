@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from config import PUSH_QUEUE_SIZE, PUSH_POLL_INTERVAL, MARKET_STREAM_INTERVALS
+from services.bybit_service import bybit_service
+from services.candle_store import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+def encode_event(event: str, data: Dict) -> str:
+    """Сообщение Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """Очередь событий одного клиента по набору символов"""
+
+    def __init__(self, symbols: Iterable[str], max_queue: int):
+        self.symbols = frozenset(symbols)
+        self.queue: 'queue.Queue[str]' = queue.Queue(max_queue)
+        self.dropped = 0
+
+    def put(self, message: str):
+        # Медленный клиент не должен держать память: отбрасываем самое старое
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float) -> Optional[str]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    """Раздача событий по символам всем подписчикам
+
+    Источник (WebSocket поток или опрос) публикует событие один раз: оно
+    кодируется в SSE единожды и кладется в очереди подписчиков символа.
+    Для тикеров отправляются только изменившиеся поля.
+    """
+
+    def __init__(self, max_queue: int = PUSH_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._last_tickers: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'delivered': 0, 'ticker_deltas': 0, 'unchanged_tickers': 0}
+
+    def subscribe(self, symbols: Iterable[str]) -> Subscription:
+        subscription = Subscription(symbols, self.max_queue)
+        with self._lock:
+            for symbol in subscription.symbols:
+                self._subscribers.setdefault(symbol, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for symbol in subscription.symbols:
+                subscribers = self._subscribers.get(symbol)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[symbol]
+
+    def symbols(self) -> List[str]:
+        """Символы, у которых есть подписчики"""
+        with self._lock:
+            return list(self._subscribers)
+
+    @property
+    def clients(self) -> int:
+        with self._lock:
+            return len({sub for subs in self._subscribers.values() for sub in subs})
+
+    def publish(self, symbol: str, event: str, data: Dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(symbol, ()))
+            self._stats['published'] += 1
+            self._stats['delivered'] += len(subscribers)
+        if not subscribers:
+            return
+        message = encode_event(event, data)
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def publish_ticker(self, symbol: str, ticker: Dict):
+        """Опубликовать изменившиеся поля тикера"""
+        with self._lock:
+            last = self._last_tickers.get(symbol, {})
+            delta = {key: value for key, value in ticker.items() if last.get(key) != value}
+            self._last_tickers[symbol] = ticker
+            if not delta:
+                self._stats['unchanged_tickers'] += 1
+                return
+            self._stats['ticker_deltas'] += 1
+        delta['symbol'] = symbol
+        self.publish(symbol, 'ticker', delta)
+
+    def last_ticker(self, symbol: str) -> Optional[Dict]:
+        with self._lock:
+            return self._last_tickers.get(symbol)
+
+    def seed_ticker(self, symbol: str, ticker: Dict) -> Dict:
+        """Запомнить тикер как отправленный, если по символу еще ничего не публиковалось"""
+        with self._lock:
+            return self._last_tickers.setdefault(symbol, ticker)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['symbols'] = len(self._subscribers)
+            subscriptions = {sub for subs in self._subscribers.values() for sub in subs}
+        stats['clients'] = len(subscriptions)
+        stats['dropped'] = sum(sub.dropped for sub in subscriptions)
+        return stats
+
+
+class PushPoller:
+    """Источник событий без WebSocket потока: один опрос тикеров на процесс
+
+    Раз в interval запрашивает все тикеры одним запросом и публикует
+    изменения для символов с подписчиками. При смене периода свечи
+    публикует закрывшуюся свечу (через хранилище свечей - дельтой).
+    При включенном WebSocket потоке опрашиваются только символы, которых
+    нет в подписке потока (covered возвращает True для покрытых).
+    """
+
+    def __init__(self, service, broadcaster: Broadcaster, interval: float = PUSH_POLL_INTERVAL,
+                 candle_intervals: Iterable[str] = MARKET_STREAM_INTERVALS):
+        self.service = service
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.candle_intervals = [i for i in candle_intervals if i in INTERVAL_MS and i != 'M']
+        self._open_times: Dict[tuple, int] = {}
+        self.covered: Optional[Callable[[str], bool]] = None
+
+    def start(self, loop):
+        """Запустить опрос в указанном BackgroundLoop"""
+        loop.start_task(f"push-poller-{id(self)}", self._run)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Push poll error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        symbols = self.broadcaster.symbols()
+        if self.covered is not None:
+            symbols = [symbol for symbol in symbols if not self.covered(symbol)]
+        if not symbols:
+            return
+
+        tickers = await self.service.get_all_tickers()
+        for symbol in symbols:
+            if tickers and symbol in tickers:
+                self.broadcaster.publish_ticker(symbol, tickers[symbol])
+
+        now_ms = int(time.time() * 1000)
+        for symbol in symbols:
+            for interval in self.candle_intervals:
+                await self._check_closed_candle(symbol, interval, now_ms)
+
+    async def _check_closed_candle(self, symbol: str, interval: str, now_ms: int):
+        step = INTERVAL_MS[interval]
+        open_now = now_ms - now_ms % step
+        key = (symbol, interval)
+        previous = self._open_times.get(key)
+        self._open_times[key] = open_now
+        if previous is None or open_now <= previous:
+            return
+
+        candles = await self.service.get_kline_data(symbol, interval, 2)
+        if candles is None:
+            return
+        for record in candles.to_records():
+            if record['timestamp'] == previous:
+                self.broadcaster.publish(symbol, 'candle', {'symbol': symbol, 'interval': interval, **record})
+
+
+# Глобальные экземпляры
+broadcaster = Broadcaster()
+push_poller = PushPoller(bybit_service, broadcaster)
@@ -2,25 +2,72 @@ import aiohttp
 import asyncio
 import ssl
 import logging
-from typing import List, Dict, Optional
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Optional, Set
 import numpy as np
 
+from config import (BYBIT_REST_URL, HTTP_POOL_SIZE, HTTP_POOL_PER_HOST, HTTP_DNS_CACHE_TTL,
+                    HTTP_KEEPALIVE_TIMEOUT, MAX_SEARCH_RESULTS, POPULAR_CRYPTOS, PRICE_SNAPSHOT_INTERVAL)
+from models.candles import Candles
+from services import indicators
+from services.candle_store import CandleStore
+from services.instrument_catalog import InstrumentCatalog
+from services.streaming_indicators import IndicatorStateStore
+from services.ticker_store import TickerStore
+
 logger = logging.getLogger(__name__)
 
 
 class BybitService:
     """Асинхронный сервис для работы с Bybit API V5"""
 
-    def __init__(self):
-        self.base_url = "https://api.bybit.com"
+    def __init__(self, base_url: str = BYBIT_REST_URL,
+                 pool_size: int = HTTP_POOL_SIZE,
+                 pool_per_host: int = HTTP_POOL_PER_HOST,
+                 dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+                 keepalive_timeout: int = HTTP_KEEPALIVE_TIMEOUT):
+        self.base_url = base_url
         self.timeout = aiohttp.ClientTimeout(total=30)
-
-    async def create_session(self):
-        """Создание безопасной сессии"""
+        self.pool_size = pool_size
+        self.pool_per_host = pool_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.ssl_context = self._create_ssl_context()
+
+        # Одна keep-alive сессия на event loop: сессии aiohttp привязаны к своему циклу
+        self._sessions = weakref.WeakKeyDictionary()
+        # In-flight запросы (single-flight) тоже живут в рамках своего цикла
+        self._inflight = weakref.WeakKeyDictionary()
+        self._loop_state_lock = threading.Lock()
+
+        # Каталог спотовых инструментов для поиска без запроса к API
+        self.catalog = InstrumentCatalog()
+        # Свечи с инкрементальной синхронизацией (запрашивается только дельта)
+        self.candles = CandleStore()
+        self.indicator_states = IndicatorStateStore()
+        self.tickers = TickerStore()
+        # Очередь записи снимков тикеров в price_history (services.write_behind), задается API
+        self.writer = None
+        # Символы, снимки которых пишутся (не все спотовые пары из get_all_tickers), задается API
+        self.tracked_symbols: Callable[[], Set[str]] = lambda: {c['symbol'] for c in POPULAR_CRYPTOS}
+        self._snapshot_at: Dict[str, float] = {}
+
+        self._stats = {'requests': 0, 'upstream_requests': 0, 'coalesced': 0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _create_ssl_context() -> ssl.SSLContext:
+        """SSL контекст создается один раз на сервис"""
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
+        return ssl_context
 
+    async def create_session(self):
+        """Создание сессии с пулом keep-alive соединений"""
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json',
@@ -28,9 +75,12 @@ class BybitService:
         }
 
         connector = aiohttp.TCPConnector(
-            ssl=ssl_context,
-            limit=10,
-            force_close=True,
+            ssl=self.ssl_context,
+            limit=self.pool_size,
+            limit_per_host=self.pool_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
             enable_cleanup_closed=True
         )
 
@@ -43,9 +93,84 @@ class BybitService:
 
         return session
 
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Получить долгоживущую сессию текущего event loop"""
+        loop = asyncio.get_running_loop()
+        with self._loop_state_lock:
+            session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = await self.create_session()
+            with self._loop_state_lock:
+                self._sessions[loop] = session
+            logger.debug(f"Created pooled session (limit={self.pool_size}, per_host={self.pool_per_host})")
+        return session
+
+    async def close(self):
+        """Закрыть сессию текущего event loop (вызывать перед остановкой цикла)"""
+        loop = asyncio.get_running_loop()
+        with self._loop_state_lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def record_ticker(self, symbol: str, ticker: Dict, tracked: Optional[Set[str]] = None):
+        """Поставить снимок тикера в очередь записи (не чаще PRICE_SNAPSHOT_INTERVAL на символ)
+
+        Пишутся только отслеживаемые символы (tracked_symbols): иначе пакетный
+        запрос всех тикеров складывал бы в price_history каждую спотовую пару.
+        """
+        if self.writer is None:
+            return
+        if symbol not in (self.tracked_symbols() if tracked is None else tracked):
+            return
+        now = time.monotonic()
+        if now - self._snapshot_at.get(symbol, float('-inf')) < PRICE_SNAPSHOT_INTERVAL:
+            return
+        self._snapshot_at[symbol] = now
+        self.writer.put('tickers', (symbol, ticker['last_price'], ticker['change_24h'], ticker['volume_24h'],
+                                    ticker['high_24h'], ticker['low_24h'],
+                                    datetime.now(timezone.utc).replace(tzinfo=None)))
+
+    def get_stats(self) -> Dict:
+        """Счетчики запросов: всего, ушло в Bybit, объединено с уже летящими"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._loop_state_lock:
+            stats['inflight'] = sum(len(tasks) for tasks in self._inflight.values())
+        return stats
+
     async def fetch_url(self, url: str, params: dict = None) -> Optional[dict]:
-        """Получить данные с URL"""
-        session = await self.create_session()
+        """Получить данные с URL
+
+        Одновременные вызовы с одинаковыми (url, params) ждут один запрос к Bybit.
+        Результат общий для всех ожидающих - вызывающий код не должен его изменять.
+        """
+        loop = asyncio.get_running_loop()
+        key = (url, tuple(sorted((params or {}).items())))
+
+        with self._loop_state_lock:
+            inflight = self._inflight.setdefault(loop, {})
+
+        self._count('requests')
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_upstream(url, params))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            self._count('coalesced')
+
+        # shield: отмена одного из ожидающих не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    async def _fetch_upstream(self, url: str, params: dict = None) -> Optional[dict]:
+        """Выполнить HTTP запрос к Bybit"""
+        self._count('upstream_requests')
+        session = await self.get_session()
 
         try:
             async with session.get(url, params=params, allow_redirects=False) as response:
@@ -74,49 +199,26 @@ class BybitService:
             logger.error(f"Error: {e}")
             return None
 
-        finally:
-            await session.close()
-
     async def search_cryptocurrencies(self, query: str) -> List[Dict]:
-        """Поиск криптовалют"""
+        """Поиск криптовалют по локальному каталогу инструментов"""
         try:
-            url = f"{self.base_url}/v5/market/instruments-info"
-            result = await self.fetch_url(url, {"category": "spot"})
-
-            if not result or 'list' not in result:
-                logger.warning("Empty search result")
-                return []
-
-            query_upper = query.upper()
-            filtered = []
+            if not self.catalog.is_loaded:
+                await self.catalog.refresh(self)
 
-            for item in result.get('list', []):
-                symbol = item.get('symbol', '')
-                base_coin = item.get('baseCoin', '')
-                quote_coin = item.get('quoteCoin', '')
-
-                # Только USDT пары
-                if quote_coin != 'USDT':
-                    continue
-
-                # Проверка совпадения
-                if query_upper in symbol or query_upper in base_coin:
-                    filtered.append({
-                        'symbol': symbol,
-                        'name': base_coin,
-                        'display_name': base_coin,
-                        'emoji': '💰'
-                    })
-
-            logger.info(f"Found {len(filtered)} results for '{query}'")
-            return filtered[:20]
+            results = self.catalog.search(query, MAX_SEARCH_RESULTS)
+            logger.debug(f"Found {len(results)} results for '{query}'")
+            return results
 
         except Exception as e:
             logger.error(f"Search error: {e}")
             return []
 
     async def get_current_price(self, symbol: str) -> Optional[Dict]:
-        """Получить текущую цену"""
+        """Получить текущую цену (из WebSocket потока, если символ на него подписан)"""
+        ticker = self.tickers.get(symbol)
+        if ticker is not None:
+            return ticker
+
         try:
             url = f"{self.base_url}/v5/market/tickers"
             result = await self.fetch_url(url, {"category": "spot", "symbol": symbol})
@@ -125,87 +227,79 @@ class BybitService:
                 logger.warning(f"No ticker data for {symbol}")
                 return None
 
-            ticker = result['list'][0]
-
-            # Получаем необходимые поля с проверками
-            try:
-                last_price = float(ticker.get('lastPrice', 0))
-                prev_price_24h = float(ticker.get('prevPrice24h', last_price))
-            except (ValueError, TypeError):
-                logger.error(f"Invalid price data for {symbol}")
-                return None
-
-            # Рассчитываем изменение
-            if prev_price_24h > 0:
-                change_24h = ((last_price - prev_price_24h) / prev_price_24h) * 100
-            else:
-                change_24h = 0
-
-            return {
-                'last_price': last_price,
-                'change_24h': change_24h,
-                'high_24h': float(ticker.get('highPrice24h', last_price)),
-                'low_24h': float(ticker.get('lowPrice24h', last_price)),
-                'volume_24h': float(ticker.get('volume24h', 0)),
-                'turnover_24h': float(ticker.get('turnover24h', 0))
-            }
+            ticker = self._parse_ticker(result['list'][0])
+            if ticker is not None:
+                self.record_ticker(symbol, ticker)
+            return ticker
 
         except Exception as e:
             logger.error(f"Current price error: {e}")
             return None
 
-    async def get_price_history(self, symbol: str, days: int = 90) -> Optional[Dict]:
-        """Получить историю цен"""
+    async def get_all_tickers(self) -> Optional[Dict[str, Dict]]:
+        """Тикеры всех спотовых пар одним запросом: {symbol: ticker}"""
         try:
-            url = f"{self.base_url}/v5/market/kline"
-            result = await self.fetch_url(url, {
-                "category": "spot",
-                "symbol": symbol,
-                "interval": "D",
-                "limit": min(days, 1000)
-            })
+            url = f"{self.base_url}/v5/market/tickers"
+            result = await self.fetch_url(url, {"category": "spot"})
 
             if not result or 'list' not in result:
-                logger.warning(f"No history data for {symbol}")
+                logger.warning("No tickers data")
                 return None
 
-            klines = result.get('list', [])
-            if not klines:
-                return None
+            tickers = {}
+            tracked = self.tracked_symbols() if self.writer is not None else set()
+            for item in result['list']:
+                ticker = self._parse_ticker(item)
+                if ticker is not None:
+                    tickers[item.get('symbol', '')] = ticker
+                    self.record_ticker(item.get('symbol', ''), ticker, tracked)
+            return tickers
 
-            # Разворачиваем (API возвращает в обратном порядке)
-            klines.reverse()
-
-            # Извлекаем цены и временные метки
-            prices = []
-            timestamps = []
-
-            for k in klines:
-                try:
-                    price = float(k[4])  # Close price
-                    timestamp = int(k[0])
-                    prices.append(price)
-                    timestamps.append(timestamp)
-                except (ValueError, IndexError, TypeError):
-                    logger.warning(f"Invalid kline data: {k}")
-                    continue
-
-            if not prices:
-                logger.warning(f"No valid prices for {symbol}")
-                return None
+        except Exception as e:
+            logger.error(f"Tickers error: {e}")
+            return None
 
-            logger.info(f"Got {len(prices)} price points for {symbol}")
-            return {
-                'prices': prices,
-                'timestamps': timestamps
-            }
+    @staticmethod
+    def _parse_ticker(ticker: Dict) -> Optional[Dict]:
+        """Тикер Bybit -> цены и изменение за 24ч"""
+        # Получаем необходимые поля с проверками
+        try:
+            last_price = float(ticker.get('lastPrice', 0))
+            prev_price_24h = float(ticker.get('prevPrice24h', last_price))
+        except (ValueError, TypeError):
+            logger.error(f"Invalid price data for {ticker.get('symbol')}")
+            return None
 
-        except Exception as e:
-            logger.error(f"History error: {e}")
+        # Рассчитываем изменение
+        if prev_price_24h > 0:
+            change_24h = ((last_price - prev_price_24h) / prev_price_24h) * 100
+        else:
+            change_24h = 0
+
+        return {
+            'last_price': last_price,
+            'change_24h': change_24h,
+            'high_24h': float(ticker.get('highPrice24h', last_price)),
+            'low_24h': float(ticker.get('lowPrice24h', last_price)),
+            'volume_24h': float(ticker.get('volume24h', 0)),
+            'turnover_24h': float(ticker.get('turnover24h', 0))
+        }
+
+    async def get_price_history(self, symbol: str, days: int = 90) -> Optional[Dict]:
+        """Получить историю цен (списки для JSON ответа)"""
+        candles = await self.get_kline_data(symbol, "D", days)
+        if candles is None:
+            logger.warning(f"No history data for {symbol}")
             return None
 
-    async def get_kline_data(self, symbol: str, interval: str = "60", limit: int = 200) -> Optional[List]:
-        """Получить свечи"""
+        logger.debug(f"Got {len(candles)} price points for {symbol}")
+        return {
+            'prices': candles.close.tolist(),
+            'timestamps': candles.ts.tolist()
+        }
+
+    async def get_kline_data(self, symbol: str, interval: str = "60", limit: int = 200) -> Optional[Candles]:
+        """Получить свечи в колоночном виде (по возрастанию времени)"""
         try:
             # Валидация параметров
             valid_intervals = ["1", "5", "15", "30", "60", "120", "240", "360", "720", "D", "W", "M"]
@@ -214,45 +308,35 @@ class BybitService:
 
             limit = min(max(limit, 1), 1000)
 
-            url = f"{self.base_url}/v5/market/kline"
-            result = await self.fetch_url(url, {
-                "category": "spot",
-                "symbol": symbol,
-                "interval": interval,
-                "limit": limit
-            })
-
-            if not result or 'list' not in result:
+            candles = await self.candles.get_candles(self, symbol, interval, limit)
+            if candles is None or not len(candles):
                 logger.warning(f"No kline data for {symbol}")
                 return None
 
-            klines = result.get('list', [])
-            if not klines:
-                return None
-
-            logger.info(f"Got {len(klines)} klines for {symbol}")
-            return klines
+            logger.debug(f"Got {len(candles)} klines for {symbol}")
+            return candles
 
         except Exception as e:
             logger.error(f"Kline error: {e}")
             return None
 
-    async def calculate_technical_indicators(self, prices: List[float]) -> Dict:
-        """Рассчитать технические индикаторы"""
+    async def calculate_technical_indicators(self, prices) -> Dict:
+        """Рассчитать технические индикаторы (список или массив цен закрытия)"""
         try:
-            if not prices or len(prices) < 2:
+            if prices is None or len(prices) < 2:
                 logger.warning("Not enough prices for indicators")
                 return self._default_indicators()
 
-            prices_array = np.array(prices, dtype=float)
+            prices_array = np.asarray(prices, dtype=float)
 
-            # RSI
-            rsi = self._calculate_rsi(prices_array)
-
-            # Moving Averages
-            ma_7 = float(np.mean(prices_array[-7:])) if len(prices_array) >= 7 else float(prices_array[-1])
-            ma_25 = float(np.mean(prices_array[-25:])) if len(prices_array) >= 25 else float(prices_array[-1])
-            ma_50 = float(np.mean(prices_array[-50:])) if len(prices_array) >= 50 else float(prices_array[-1])
+            # RSI (Уайлдер) и скользящие средние - последние точки полных серий
+            rsi = indicators.last_value(indicators.rsi(prices_array), 50.0)
+            last_price = float(prices_array[-1])
+            ma_7 = indicators.last_value(indicators.sma(prices_array, 7), last_price)
+            ma_25 = indicators.last_value(indicators.sma(prices_array, 25), last_price)
+            ma_50 = indicators.last_value(indicators.sma(prices_array, 50), last_price)
+            ema_12 = indicators.last_value(indicators.ema(prices_array, 12), last_price)
+            ema_26 = indicators.last_value(indicators.ema(prices_array, 26), last_price)
 
             # Volatility
             returns = np.diff(prices_array) / prices_array[:-1] * 100
@@ -267,6 +351,8 @@ class BybitService:
                 'ma_7': float(ma_7),
                 'ma_25': float(ma_25),
                 'ma_50': float(ma_50),
+                'ema_12': float(ema_12),
+                'ema_26': float(ema_26),
                 'volatility': float(volatility),
                 'trend_strength': float(trend_strength)
             }
@@ -275,31 +361,6 @@ class BybitService:
             logger.error(f"Indicators error: {e}")
             return self._default_indicators()
 
-    def _calculate_rsi(self, prices: np.ndarray, period: int = 14) -> float:
-        """Расчет RSI"""
-        try:
-            if len(prices) < period + 1:
-                return 50.0
-
-            deltas = np.diff(prices)
-            gains = np.where(deltas > 0, deltas, 0)
-            losses = np.where(deltas < 0, -deltas, 0)
-
-            avg_gain = np.mean(gains[-period:])
-            avg_loss = np.mean(losses[-period:])
-
-            if avg_loss == 0:
-                return 100.0 if avg_gain > 0 else 50.0
-
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-
-            return float(rsi)
-
-        except Exception as e:
-            logger.error(f"RSI calculation error: {e}")
-            return 50.0
-
     def _default_indicators(self) -> Dict:
         """Индикаторы по умолчанию"""
         return {
@@ -307,6 +368,8 @@ class BybitService:
             'ma_7': 0.0,
             'ma_25': 0.0,
             'ma_50': 0.0,
+            'ema_12': 0.0,
+            'ema_26': 0.0,
             'volatility': 0.0,
             'trend_strength': 0.0
         }
@@ -0,0 +1,314 @@
+import json
+import logging
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (CACHE_TTL, CACHE_TTLS, CACHE_STALE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES,
+                    CACHE_BACKEND, CACHE_SOCKET_PATH)
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Приблизительный размер значения в байтах (рекурсивно по dict/list/tuple)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'stale_until', 'size')
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+
+
+class CacheBackend:
+    """Интерфейс хранилища кэша
+
+    Значения должны сериализоваться в JSON - так их может хранить
+    и общий для воркеров процесс (см. SocketCacheBackend).
+    """
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Получить (значение, устарело ли) или None если записи нет"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Any]:
+        """Получить значение если оно не истекло"""
+        entry = self.get_entry(key)
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Установить значение только если свежей записи нет (для межпроцессных блокировок)"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+class TTLCache(CacheBackend):
+    """Потокобезопасный LRU кэш с TTL по пространствам имен
+
+    Пространство имен - префикс ключа до первого ':' (search:btc -> search).
+    После истечения TTL значение еще stale_ttl секунд отдается как устаревшее
+    (stale-while-revalidate), затем удаляется. Размер ограничен числом записей
+    и бюджетом байт; при переполнении вытесняются давно не используемые записи.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = CACHE_TTL,
+                 stale_ttl: float = CACHE_STALE_TTL, sizeof: Callable[[Any], int] = estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.sizeof = sizeof
+
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+
+    @staticmethod
+    def namespace(key: str) -> str:
+        return key.split(':', 1)[0]
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttls.get(self.namespace(key), self.default_ttl)
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Получить (значение, устарело ли) или None если записи нет"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            if now >= entry.stale_until:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if now < entry.expires_at:
+                self._stats['hits'] += 1
+                return entry.value, False
+
+            self._stats['stale_hits'] += 1
+            return entry.value, True
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Установить значение (ttl по умолчанию берется из пространства имен)"""
+        self._set(key, value, ttl, only_if_absent=False)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return self._set(key, value, ttl, only_if_absent=True)
+
+    def _set(self, key: str, value: Any, ttl: Optional[float], only_if_absent: bool) -> bool:
+        ttl = self.ttl_for(key) if ttl is None else ttl
+        now = time.time()
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            logger.warning(f"Cache value for '{key}' is larger than the cache budget ({size} bytes)")
+            return False
+
+        with self._lock:
+            if only_if_absent:
+                current = self._entries.get(key)
+                if current is not None and now < current.expires_at:
+                    return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_ttl, size)
+            self._bytes += size
+            self._stats['sets'] += 1
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+        return True
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Метрики кэша: попадания, промахи, вытеснения и занятый объем"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        stats['backend'] = 'memory'
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class SocketCacheBackend(CacheBackend):
+    """Клиент общего для всех воркеров хоста кэша (services.cache_server)
+
+    Соединение с unix-сокетом держится отдельно в каждом потоке. Если сервер
+    недоступен, операции ведут себя как промахи - запросы идут в Bybit напрямую.
+    """
+
+    def __init__(self, socket_path: str = CACHE_SOCKET_PATH, timeout: float = 1.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._errors = 0
+        self._errors_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = CacheConnection(self.socket_path, self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _count_error(self):
+        with self._errors_lock:
+            self._errors += 1
+
+    def _call(self, request: Dict) -> Optional[Dict]:
+        try:
+            return self._connection().call(request)
+        except TypeError as e:
+            # Значение не сериализуется в JSON: до сокета запрос не дошел, соединение цело
+            self._count_error()
+            logger.warning(f"Cache value is not JSON serializable ({request.get('key')}): {e}")
+            return None
+        except (OSError, ValueError) as e:
+            self._count_error()
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None:
+                conn.close()
+                self._local.conn = None
+            logger.warning(f"Cache server error ({self.socket_path}): {e}")
+            return None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, bool]]:
+        response = self._call({'op': 'get', 'key': key})
+        if not response or not response.get('found'):
+            return None
+        return response['value'], response['stale']
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._call({'op': 'set', 'key': key, 'value': value, 'ttl': ttl})
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        response = self._call({'op': 'add', 'key': key, 'value': value, 'ttl': ttl})
+        # Сервер недоступен - не блокируем обновление
+        return True if response is None else bool(response.get('added'))
+
+    def delete(self, key: str):
+        self._call({'op': 'delete', 'key': key})
+
+    def clear(self):
+        self._call({'op': 'clear'})
+
+    def stats(self) -> Dict:
+        response = self._call({'op': 'stats'}) or {}
+        stats = response.get('stats', {})
+        stats['backend'] = 'socket'
+        with self._errors_lock:
+            stats['client_errors'] = self._errors
+        return stats
+
+
+class CacheConnection:
+    """Соединение с сервером кэша: сообщения JSON с 4-байтовым префиксом длины"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+
+    def call(self, request: Dict) -> Dict:
+        send_message(self.sock, request)
+        response = recv_message(self.sock)
+        if response is None:
+            raise ConnectionError("cache server closed connection")
+        return response
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def send_message(sock: socket.socket, message: Dict):
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(struct.pack('!I', len(payload)) + payload)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict]:
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    (length,) = struct.unpack('!I', header)
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+    return json.loads(payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    """Создать кэш по настройке CACHE_BACKEND: memory (по умолчанию) или socket"""
+    if backend == 'socket':
+        logger.info(f"Using shared cache server at {CACHE_SOCKET_PATH}")
+        return SocketCacheBackend(CACHE_SOCKET_PATH)
+    return TTLCache()
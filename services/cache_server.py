@@ -0,0 +1,108 @@
+import argparse
+import logging
+import os
+import socketserver
+import threading
+from typing import Dict, Optional
+
+from config import CACHE_SOCKET_PATH
+from services.cache import TTLCache, recv_message, send_message
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheRequestHandler(socketserver.BaseRequestHandler):
+    """Одно клиентское соединение: последовательность запрос/ответ"""
+
+    def handle(self):
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (OSError, ValueError) as e:
+                logger.debug(f"Cache client error: {e}")
+                return
+            if request is None:
+                return
+
+            try:
+                response = self.server.dispatch(request)
+            except Exception as e:
+                logger.error(f"Cache server error: {e}")
+                response = {'ok': False, 'error': str(e)}
+
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class CacheServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Сервер кэша для всех воркеров одного хоста (sidecar)
+
+    Хранит значения в TTLCache и отдает их по unix-сокету, поэтому N воркеров
+    gunicorn делают один запрос к Bybit и держат одну копию истории цен.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = CACHE_SOCKET_PATH, cache: Optional[TTLCache] = None):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.cache = cache or TTLCache()
+        super().__init__(socket_path, _CacheRequestHandler)
+
+    def dispatch(self, request: Dict) -> Dict:
+        op = request.get('op')
+        key = request.get('key')
+
+        if op == 'get':
+            entry = self.cache.get_entry(key)
+            if entry is None:
+                return {'ok': True, 'found': False}
+            return {'ok': True, 'found': True, 'value': entry[0], 'stale': entry[1]}
+        if op == 'set':
+            self.cache.set(key, request.get('value'), request.get('ttl'))
+            return {'ok': True}
+        if op == 'add':
+            return {'ok': True, 'added': self.cache.add(key, request.get('value'), request.get('ttl'))}
+        if op == 'delete':
+            self.cache.delete(key)
+            return {'ok': True}
+        if op == 'clear':
+            self.cache.clear()
+            return {'ok': True}
+        if op == 'stats':
+            return {'ok': True, 'stats': self.cache.stats()}
+        return {'ok': False, 'error': f"unknown op: {op}"}
+
+    def start_in_thread(self) -> threading.Thread:
+        """Запустить сервер в фоновом потоке (для тестов и бенчмарков)"""
+        thread = threading.Thread(target=self.serve_forever, name='cache-server', daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Общий кэш API для воркеров одного хоста")
+    parser.add_argument('--socket', default=CACHE_SOCKET_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = CacheServer(args.socket)
+    logger.info(f"✅ Cache server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
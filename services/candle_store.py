@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config import CANDLE_SYNC_INTERVAL, CANDLE_STORE_MAX_SERIES
+from models.candles import Candles
+
+logger = logging.getLogger(__name__)
+
+# Длительность свечи в мс (M - приблизительно, используется только для определения закрытия)
+INTERVAL_MS = {
+    '1': 60_000, '3': 180_000, '5': 300_000, '15': 900_000, '30': 1_800_000,
+    '60': 3_600_000, '120': 7_200_000, '240': 14_400_000, '360': 21_600_000,
+    '720': 43_200_000, 'D': 86_400_000, 'W': 604_800_000, 'M': 2_592_000_000,
+}
+
+MAX_KLINE_LIMIT = 1000
+
+
+class _Series:
+    __slots__ = ('candles', 'synced_at', 'exhausted')
+
+    def __init__(self):
+        self.candles = Candles.empty()
+        self.synced_at = 0.0
+        self.exhausted = False  # у Bybit нет более старых свечей
+
+
+class CandleStore:
+    """Локальное хранилище свечей по (symbol, interval) с инкрементальной синхронизацией
+
+    Первый запрос загружает окно целиком. Дальше запрашивается только дельта:
+    свечи начиная с последней сохраненной (она могла быть еще не закрыта),
+    они сливаются с локальными данными, а окно отдается из памяти.
+
+    С подключенным storage (models.database.Database) окно новой серии сначала
+    читается из таблицы candles, и у Bybit запрашивается только дельта после
+    последней сохраненной свечи. Закрытые свечи из Bybit и из потока ставятся
+    в очередь writer (services.write_behind) и пишутся пачками, не задерживая
+    ответ.
+    """
+
+    def __init__(self, sync_interval: float = CANDLE_SYNC_INTERVAL, max_series: int = CANDLE_STORE_MAX_SERIES,
+                 storage=None, writer=None):
+        self.sync_interval = sync_interval
+        self.max_series = max_series
+        self._series: 'OrderedDict[Tuple[str, str], _Series]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'full_fetches': 0, 'delta_fetches': 0, 'rows_fetched': 0,
+                       'stream_updates': 0, 'db_hits': 0, 'db_misses': 0, 'db_errors': 0,
+                       'db_queued': 0, 'db_dropped': 0}
+        self.storage = storage
+        self.writer = writer
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _get_series(self, key: Tuple[str, str]) -> _Series:
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = _Series()
+                self._series[key] = series
+                while len(self._series) > self.max_series:
+                    self._series.popitem(last=False)
+            else:
+                self._series.move_to_end(key)
+            return series
+
+    async def get_candles(self, service, symbol: str, interval: str, limit: int) -> Optional[Candles]:
+        """Последние limit свечей по возрастанию времени"""
+        limit = min(max(limit, 1), MAX_KLINE_LIMIT)
+        series = self._get_series((symbol, interval))
+        now = time.time()
+        held = len(series.candles)
+
+        # Окно из БД догоняется дельтой, даже если в нем нет еще не закрытых свечей
+        restored = False
+        if not held and self.storage is not None:
+            held = await self._restore(series, symbol, interval, limit)
+            restored = held > 0
+
+        if not held or (held < limit and not series.exhausted and not restored):
+            candles = await self._fetch(service, symbol, interval, limit=max(limit, held))
+            if candles is None:
+                return series.candles.tail(limit) if held else None
+            self._count('full_fetches')
+            self._replace(series, candles, requested=max(limit, held))
+            self._persist(symbol, interval, candles)
+        elif now - series.synced_at >= self.sync_interval:
+            last_open = int(series.candles.ts[-1])
+            candles = await self._fetch(service, symbol, interval, limit=MAX_KLINE_LIMIT, start=last_open)
+            if candles is not None:
+                self._count('delta_fetches')
+                if len(candles) >= MAX_KLINE_LIMIT:
+                    # Разрыв больше одной страницы - проще загрузить окно заново
+                    self._replace(series, candles, requested=MAX_KLINE_LIMIT)
+                else:
+                    self._merge(series, candles)
+                self._persist(symbol, interval, candles)
+        else:
+            self._count('local_hits')
+
+        return series.candles.tail(limit)
+
+    async def _restore(self, series: _Series, symbol: str, interval: str, limit: int) -> int:
+        """Загрузить окно серии из БД; synced_at = 0 - сразу запросить дельту у Bybit"""
+        try:
+            candles = await self.storage.run(self.storage.get_candles, symbol, interval, limit)
+        except Exception as e:
+            self._count('db_errors')
+            logger.warning(f"Candle storage read failed for {symbol}/{interval}: {e}")
+            return 0
+
+        # В БД только закрытые свечи: недостающие до limit придут с дельтой.
+        # Неполное окно или разрыв больше страницы дельты - дешевле загрузить окно из Bybit
+        newer = (time.time() * 1000 - candles.ts[-1]) // INTERVAL_MS.get(interval, 1) if candles else 0
+        if not candles or len(candles) + newer < limit or newer >= MAX_KLINE_LIMIT:
+            self._count('db_misses')
+            return 0
+
+        self._count('db_hits')
+        with self._lock:
+            series.candles = candles
+            series.synced_at = 0.0
+            series.exhausted = False
+        return len(candles)
+
+    def _persist(self, symbol: str, interval: str, candles: Candles):
+        """Поставить закрытые свечи в очередь записи в БД (write-behind)"""
+        if self.writer is None or not len(candles):
+            return
+        closed = candles[:int(np.searchsorted(candles.ts, time.time() * 1000 - INTERVAL_MS.get(interval, 0),
+                                              side='right'))]
+        if not len(closed):
+            return
+
+        count = len(closed)
+        rows = zip([symbol] * count, [interval] * count, closed.ts.tolist(), closed.open.tolist(),
+                   closed.high.tolist(), closed.low.tolist(), closed.close.tolist(), closed.volume.tolist(),
+                   closed.turnover.tolist())
+        self._count('db_queued' if self.writer.put_many('candles', rows) else 'db_dropped', count)
+
+    async def _fetch(self, service, symbol: str, interval: str, limit: int,
+                     start: Optional[int] = None) -> Optional[Candles]:
+        params = {
+            "category": "spot",
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+        if start is not None:
+            params["start"] = start
+
+        result = await service.fetch_url(f"{service.base_url}/v5/market/kline", params)
+        if not result or 'list' not in result:
+            return None
+
+        rows = result.get('list', [])
+        self._count('rows_fetched', len(rows))
+        try:
+            # Разбор один раз: строки Bybit (от новых к старым) -> колонки NumPy
+            return Candles.from_bybit(rows, newest_first=True)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid kline data for {symbol}: {e}")
+            return None
+
+    def _replace(self, series: _Series, candles: Candles, requested: int):
+        with self._lock:
+            series.candles = candles
+            series.synced_at = time.time()
+            series.exhausted = len(candles) < requested
+
+    def _merge(self, series: _Series, candles: Candles):
+        with self._lock:
+            series.synced_at = time.time()
+            series.candles = series.candles.merge(candles, max_len=MAX_KLINE_LIMIT)
+
+    def apply_stream(self, symbol: str, interval: str, candles: Candles) -> bool:
+        """Свечи из WebSocket потока: обновить текущую или добавить следующую
+
+        Серия должна быть загружена через REST. Успешное обновление сдвигает
+        synced_at, поэтому пока поток жив, get_candles не ходит за дельтой.
+        При пропуске свечей серия помечается для синхронизации через REST.
+        """
+        if not len(candles):
+            return False
+        with self._lock:
+            series = self._series.get((symbol, interval))
+            if series is None or not len(series.candles):
+                return False
+
+            last_open = int(series.candles.ts[-1])
+            first_open = int(candles.ts[0])
+            if first_open < last_open:
+                return False
+            if first_open - last_open > INTERVAL_MS.get(interval, 0) * 1.5:
+                series.synced_at = 0.0
+                return False
+
+            series.candles = series.candles.merge(candles, max_len=MAX_KLINE_LIMIT)
+            series.synced_at = time.time()
+            self._stats['stream_updates'] += 1
+        self._persist(symbol, interval, candles)
+        return True
+
+    def last_closed_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        """Время открытия последней закрытой свечи в хранилище"""
+        with self._lock:
+            series = self._series.get((symbol, interval))
+            open_times = series.candles.ts[-2:].tolist() if series else []
+        now_ms = int(time.time() * 1000)
+        step = INTERVAL_MS.get(interval, 0)
+        for open_time in reversed(open_times):
+            if open_time + step <= now_ms:
+                return open_time
+        return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['series'] = len(self._series)
+            stats['candles'] = sum(len(s.candles) for s in self._series.values())
+            stats['bytes'] = sum(s.candles.nbytes for s in self._series.values())
+        return stats
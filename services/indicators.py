@@ -0,0 +1,217 @@
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.signal import lfilter
+
+from models.candles import Candles
+
+logger = logging.getLogger(__name__)
+
+# Индикаторы считаются по всей серии за O(n): скользящие окна - через
+# кумулятивные суммы, EMA/Wilder - через рекуррентный фильтр lfilter.
+# Значения до заполнения окна - NaN (в JSON - null).
+
+Series = Union[np.ndarray, Dict[str, np.ndarray]]
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _nan(n: int) -> np.ndarray:
+    return np.full(n, np.nan)
+
+
+def sma(values, window: int) -> np.ndarray:
+    """Простое скользящее среднее"""
+    values = _as_array(values)
+    result = _nan(len(values))
+    if window < 1 or len(values) < window:
+        return result
+    # Кумулятивная сумма от среднего серии - меньше накопленная ошибка на длинных сериях
+    offset = values.mean()
+    csum = np.cumsum(np.concatenate(([0.0], values - offset)))
+    result[window - 1:] = (csum[window:] - csum[:-window]) / window + offset
+    return result
+
+
+def rolling_std(values, window: int, ddof: int = 0) -> np.ndarray:
+    """Скользящее стандартное отклонение"""
+    values = _as_array(values)
+    result = _nan(len(values))
+    if window < 1 or len(values) < window or window - ddof <= 0:
+        return result
+    # Сдвиг к среднему уменьшает потерю точности в E[x^2] - E[x]^2
+    centered = values - values.mean()
+    csum = np.cumsum(np.concatenate(([0.0], centered)))
+    csum_sq = np.cumsum(np.concatenate(([0.0], centered * centered)))
+    window_sum = csum[window:] - csum[:-window]
+    window_sq = csum_sq[window:] - csum_sq[:-window]
+    variance = (window_sq - window_sum * window_sum / window) / (window - ddof)
+    result[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return result
+
+
+def _smooth(values: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1], y[-1] = seed"""
+    if not len(values):
+        return values
+    result, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * seed])
+    return result
+
+
+def ema(values, window: int) -> np.ndarray:
+    """Экспоненциальное скользящее среднее (alpha = 2 / (window + 1), старт с первого значения)"""
+    values = _as_array(values)
+    if window < 1 or not len(values):
+        return _nan(len(values))
+    return _smooth(values, 2.0 / (window + 1), values[0])
+
+
+def wilder(values, period: int) -> np.ndarray:
+    """Сглаживание Уайлдера (alpha = 1 / period, старт с SMA первых period значений)"""
+    values = _as_array(values)
+    result = _nan(len(values))
+    if period < 1 or len(values) < period:
+        return result
+    seed = values[:period].mean()
+    result[period - 1] = seed
+    result[period:] = _smooth(values[period:], 1.0 / period, seed)
+    return result
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """RSI Уайлдера"""
+    close = _as_array(close)
+    result = _nan(len(close))
+    if len(close) < period + 1:
+        return result
+
+    deltas = np.diff(close)
+    avg_gain = wilder(np.maximum(deltas, 0.0), period)
+    avg_loss = wilder(np.maximum(-deltas, 0.0), period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # Нет падений: 100, нет движения вовсе: 50
+    values = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), values)
+    values[:period - 1] = np.nan
+    result[1:] = values
+    return result
+
+
+def bollinger(close, window: int = 20, k: float = 2.0) -> Dict[str, np.ndarray]:
+    """Полосы Боллинджера"""
+    middle = sma(close, window)
+    deviation = rolling_std(close, window)
+    return {
+        'upper': middle + k * deviation,
+        'middle': middle,
+        'lower': middle - k * deviation
+    }
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD: разница EMA, сигнальная линия и гистограмма"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return {
+        'macd': line,
+        'signal': signal_line,
+        'histogram': line - signal_line
+    }
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    if not len(close):
+        return close
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """Average True Range"""
+    return wilder(true_range(high, low, close), period)
+
+
+def volatility(close, window: int = 20) -> np.ndarray:
+    """Скользящая волатильность доходностей в процентах"""
+    close = _as_array(close)
+    result = _nan(len(close))
+    if len(close) < 2:
+        return result
+    returns = np.diff(close) / close[:-1] * 100
+    result[1:] = rolling_std(returns, window)
+    return result
+
+
+# ===== Выбор индикаторов по запросу =====
+
+# имя -> (функция от свечей, параметры по умолчанию)
+_REGISTRY: Dict[str, Tuple[Callable[..., Series], Tuple]] = {
+    'sma': (lambda c, window: sma(c.close, int(window)), (20,)),
+    'ema': (lambda c, window: ema(c.close, int(window)), (20,)),
+    'rsi': (lambda c, period: rsi(c.close, int(period)), (14,)),
+    'bb': (lambda c, window, k: bollinger(c.close, int(window), float(k)), (20, 2.0)),
+    'macd': (lambda c, fast, slow, signal: macd(c.close, int(fast), int(slow), int(signal)), (12, 26, 9)),
+    'atr': (lambda c, period: atr(c.high, c.low, c.close, int(period)), (14,)),
+    'volatility': (lambda c, window: volatility(c.close, int(window)), (20,)),
+}
+
+AVAILABLE_INDICATORS = tuple(_REGISTRY)
+DEFAULT_INDICATORS = ('sma:7', 'sma:25', 'sma:50', 'rsi', 'bb', 'macd', 'atr', 'volatility')
+MAX_INDICATOR_WINDOW = 1000
+
+
+def parse_spec(spec: str) -> Tuple[str, Tuple]:
+    """'sma:50' -> ('sma', (50,)), 'bb:20:2.5' -> ('bb', (20, 2.5))"""
+    name, *raw_params = spec.strip().lower().split(':')
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown indicator '{name}'. Available: {', '.join(AVAILABLE_INDICATORS)}")
+
+    _, defaults = _REGISTRY[name]
+    if len(raw_params) > len(defaults):
+        raise ValueError(f"Too many parameters for '{name}' (max {len(defaults)})")
+
+    params = list(defaults)
+    for i, raw in enumerate(raw_params):
+        try:
+            value = float(raw)
+        except ValueError:
+            raise ValueError(f"Invalid parameter '{raw}' for '{name}'")
+        if not 0 < value <= MAX_INDICATOR_WINDOW:
+            raise ValueError(f"Parameter '{raw}' for '{name}' is out of range")
+        # Окна и периоды - целые (по типу значения по умолчанию), множитель bb - дробный
+        if isinstance(defaults[i], int):
+            if not value.is_integer():
+                raise ValueError(f"Parameter '{raw}' for '{name}' must be an integer")
+            value = int(value)
+        params[i] = value
+    return name, tuple(params)
+
+
+def compute(candles: Candles, specs: Optional[Sequence[str]] = None) -> Dict[str, Series]:
+    """Рассчитать выбранные индикаторы по всей серии свечей"""
+    result = {}
+    for spec in specs or DEFAULT_INDICATORS:
+        name, params = parse_spec(spec)
+        func, _ = _REGISTRY[name]
+        result[spec.strip().lower()] = func(candles, *params)
+    return result
+
+
+def series_to_json(series: Series) -> Union[List, Dict[str, List]]:
+    """NaN -> None, округление для компактного ответа"""
+    if isinstance(series, dict):
+        return {key: series_to_json(value) for key, value in series.items()}
+    rounded = np.round(series, 8)
+    return [None if v != v else v for v in rounded.tolist()]
+
+
+def last_value(series: np.ndarray, default: float) -> float:
+    """Последнее значение серии или default, если окно еще не заполнено"""
+    if not len(series) or np.isnan(series[-1]):
+        return default
+    return float(series[-1])
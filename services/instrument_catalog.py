@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+from config import CATALOG_REFRESH_INTERVAL, MAX_SEARCH_RESULTS
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.ids: List[int] = []
+
+
+def _append_unique(ids: List[int], item_id: int):
+    """id добавляются по возрастанию, поэтому дубликат может быть только последним"""
+    if not ids or ids[-1] != item_id:
+        ids.append(item_id)
+
+
+class _CatalogIndex:
+    """Неизменяемый снимок каталога с индексами (заменяется целиком при обновлении)
+
+    Записи упорядочены по (длина символа, символ), поэтому списки id в индексах
+    уже отсортированы в порядке выдачи внутри одного уровня ранжирования.
+    """
+
+    def __init__(self, items: List[Dict]):
+        self.items = sorted(items, key=lambda item: (len(item['symbol']), item['symbol']))
+        self.tokens = [(item['symbol'].upper(), item['name'].upper()) for item in self.items]
+        self.symbols = frozenset(item['symbol'] for item in self.items)
+        self.exact: Dict[str, List[int]] = {}
+        self.trie = _TrieNode()
+        self.ngrams: Dict[str, List[int]] = {}
+
+        for item_id, tokens in enumerate(self.tokens):
+            for token in tokens:
+                _append_unique(self.exact.setdefault(token, []), item_id)
+
+                node = self.trie
+                for ch in token:
+                    node = node.children.setdefault(ch, _TrieNode())
+                    _append_unique(node.ids, item_id)
+
+                for n in range(1, NGRAM_SIZE + 1):
+                    for i in range(len(token) - n + 1):
+                        _append_unique(self.ngrams.setdefault(token[i:i + n], []), item_id)
+
+    def prefix_ids(self, query: str) -> List[int]:
+        node = self.trie
+        for ch in query:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return node.ids
+
+    def substring_ids(self, query: str) -> List[int]:
+        if len(query) <= NGRAM_SIZE:
+            return self.ngrams.get(query, [])
+
+        # Пересекаем списки всех n-грамм запроса, начиная с самого короткого
+        postings = []
+        for i in range(len(query) - NGRAM_SIZE + 1):
+            ids = self.ngrams.get(query[i:i + NGRAM_SIZE])
+            if not ids:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates.intersection_update(ids)
+            if not candidates:
+                return []
+        return [item_id for item_id in sorted(candidates)
+                if query in self.tokens[item_id][0] or query in self.tokens[item_id][1]]
+
+
+class InstrumentCatalog:
+    """Локальный каталог спотовых инструментов Bybit для поиска без запросов к API
+
+    Каталог обновляется в фоне по расписанию. Поиск ранжирует совпадения:
+    точное > префикс > подстрока (по symbol и baseCoin). С подключенным
+    storage (models.database.Database) изменившийся каталог синхронизируется
+    с таблицей cryptocurrencies.
+    """
+
+    def __init__(self, quote_coin: str = 'USDT', refresh_interval: float = CATALOG_REFRESH_INTERVAL):
+        self.quote_coin = quote_coin
+        self.refresh_interval = refresh_interval
+        self.loaded_at: Optional[float] = None
+        self._index = _CatalogIndex([])
+        self.storage = None
+        self._synced_digest: Optional[int] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._index.items)
+
+    def has_symbol(self, symbol: str) -> bool:
+        """Есть ли такая пара в последнем загруженном каталоге"""
+        return symbol in self._index.symbols
+
+    def load(self, instruments: List[Dict]):
+        """Построить индексы по списку instruments-info и атомарно заменить снимок"""
+        items = []
+        for instrument in instruments:
+            if instrument.get('quoteCoin') != self.quote_coin:
+                continue
+            symbol = instrument.get('symbol', '')
+            base_coin = instrument.get('baseCoin', '')
+            if not symbol:
+                continue
+            items.append({
+                'symbol': symbol,
+                'name': base_coin,
+                'display_name': base_coin,
+                'emoji': '💰'
+            })
+
+        self._index = _CatalogIndex(items)
+        self.loaded_at = time.time()
+        logger.info(f"Instrument catalog loaded: {len(items)} {self.quote_coin} pairs")
+
+    async def refresh(self, service) -> bool:
+        """Загрузить каталог через BybitService"""
+        result = await service.fetch_url(f"{service.base_url}/v5/market/instruments-info", {"category": "spot"})
+        if not result or 'list' not in result:
+            logger.warning("Instrument catalog refresh failed")
+            return False
+        self.load(result['list'])
+        if self.storage is not None:
+            await self.sync_storage()
+        return True
+
+    async def sync_storage(self):
+        """Записать каталог в БД, если список символов изменился с прошлой синхронизации"""
+        items = self._index.items
+        digest = hash(tuple(item['symbol'] for item in items))
+        if not items or digest == self._synced_digest:
+            return
+        self._synced_digest = digest
+        try:
+            await self.storage.run(self.storage.sync_instruments, list(items))
+        except Exception as e:
+            self._synced_digest = None
+            logger.error(f"Instrument catalog sync error: {e}")
+
+    async def _refresh_loop(self, service):
+        while True:
+            try:
+                await self.refresh(service)
+            except Exception as e:
+                logger.error(f"Instrument catalog refresh error: {e}")
+            # Джиттер, чтобы воркеры не обновлялись одновременно
+            await asyncio.sleep(self.refresh_interval * random.uniform(0.9, 1.1))
+
+    def start_background_refresh(self, service, loop):
+        """Запустить периодическое обновление в указанном BackgroundLoop"""
+        loop.start_task(f"catalog-refresh-{id(self)}", lambda: self._refresh_loop(service))
+
+    def search(self, query: str, limit: int = MAX_SEARCH_RESULTS) -> List[Dict]:
+        """Поиск: точные совпадения, затем по префиксу, затем по подстроке"""
+        query = query.strip().upper()
+        index = self._index
+        if not query:
+            return []
+
+        result_ids: List[int] = []
+        seen = set()
+        for ids in (index.exact.get(query, []), index.prefix_ids(query), index.substring_ids(query)):
+            for item_id in ids:
+                if item_id not in seen:
+                    seen.add(item_id)
+                    result_ids.append(item_id)
+                    if len(result_ids) >= limit:
+                        return [dict(index.items[i]) for i in result_ids]
+        return [dict(index.items[i]) for i in result_ids]
+
+    def stats(self) -> Dict:
+        return {
+            'instruments': len(self),
+            'loaded_at': self.loaded_at,
+            'ngrams': len(self._index.ngrams)
+        }
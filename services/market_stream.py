@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Dict, Iterable, List, Optional, Set
+
+import aiohttp
+import numpy as np
+
+from config import (BYBIT_WS_URL, MARKET_STREAM_SYMBOLS, MARKET_STREAM_INTERVALS,
+                    MARKET_STREAM_PING_INTERVAL, MARKET_STREAM_MAX_BACKOFF, MARKET_STREAM_MAX_TOPICS)
+from models.candles import Candles
+from services.broadcaster import broadcaster
+from services.bybit_service import bybit_service, BybitService
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBE_BATCH = 10  # Bybit spot принимает до 10 топиков в одном subscribe
+
+
+class MarketStream:
+    """Публичный WebSocket поток Bybit: tickers.* и kline.* в локальные хранилища
+
+    Одна корутина в фоновом event loop держит соединение: подписывается на
+    топики, шлет ping и при обрыве или молчании дольше двух интервалов ping
+    переподключается с экспоненциальной паузой и подписывается заново.
+    Тикеры пишутся в service.tickers, свечи - в service.candles и состояния
+    индикаторов, поэтому /api/crypto и /api/klines читают локальные данные.
+
+    Кроме symbols из конфигурации поток подписывается на символы клиентов
+    /api/stream (sync_subscribers): только пары из каталога инструментов, не
+    больше max_topics топиков всего, и отписывается, когда клиентов символа
+    не осталось. Пока каталог не загружен, пары с котируемой монетой каталога
+    принимаются условно и перепроверяются, как только он загрузится.
+    """
+
+    def __init__(self, service: BybitService, url: str = BYBIT_WS_URL,
+                 symbols: Iterable[str] = MARKET_STREAM_SYMBOLS,
+                 intervals: Iterable[str] = MARKET_STREAM_INTERVALS,
+                 ping_interval: float = MARKET_STREAM_PING_INTERVAL,
+                 max_backoff: float = MARKET_STREAM_MAX_BACKOFF,
+                 max_topics: int = MARKET_STREAM_MAX_TOPICS):
+        self.service = service
+        self.url = url
+        self.intervals = list(intervals)
+        self.ping_interval = ping_interval
+        self.max_backoff = max_backoff
+        self.max_topics = max_topics
+        self.base_symbols = list(dict.fromkeys(symbols))
+        self.topics: List[str] = self.topics_for(self.base_symbols)
+        self._client_symbols: Set[str] = set()
+        self._requested: List[str] = []  # символы клиентов из последнего sync_subscribers
+        self._provisional = False  # есть символы, принятые до загрузки каталога
+        self.connected = False
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._loop = None  # BackgroundLoop, в котором запущен поток
+        self._stats = {'connects': 0, 'disconnects': 0, 'messages': 0,
+                       'ticker_updates': 0, 'candle_updates': 0, 'errors': 0,
+                       'unknown_symbols': 0, 'capped_symbols': 0}
+
+    def topics_for(self, symbols: Iterable[str]) -> List[str]:
+        topics = []
+        for symbol in symbols:
+            topics.append(f"tickers.{symbol}")
+            topics.extend(f"kline.{interval}.{symbol}" for interval in self.intervals)
+        return topics
+
+    def covers(self, symbol: str) -> bool:
+        """Символ в подписке потока (остальные символы клиентов обслуживает опрос)"""
+        return symbol in self._client_symbols or symbol in self.base_symbols
+
+    def _accept_client_symbols(self, symbols: Iterable[str]) -> Set[str]:
+        """Символы клиентов, которые можно держать в потоке: есть в каталоге и влезают в max_topics"""
+        catalog = self.service.catalog
+        provisional = not catalog.is_loaded
+        per_symbol = 1 + len(self.intervals)
+        budget = self.max_topics - len(self.topics_for(self.base_symbols))
+        accepted = set()
+        for symbol in symbols:
+            if symbol in self.base_symbols or symbol in accepted:
+                continue
+            known = symbol.endswith(catalog.quote_coin) if provisional else catalog.has_symbol(symbol)
+            if not known:
+                self._stats['unknown_symbols'] += 1
+                continue
+            if budget < per_symbol:
+                self._stats['capped_symbols'] += 1
+                continue
+            accepted.add(symbol)
+            budget -= per_symbol
+        self._provisional = provisional and bool(accepted)
+        return accepted
+
+    async def sync_subscribers(self, symbols: Iterable[str]):
+        """Привести подписки к символам клиентов /api/stream (порядок - от давних клиентов)
+
+        Изменения применяются к self.topics до первого await, поэтому
+        параллельные вызовы не теряют друг друга.
+        """
+        self._requested = list(symbols)
+        wanted = self._accept_client_symbols(self._requested)
+        added = self.topics_for(sorted(wanted - self._client_symbols))
+        removed = self.topics_for(sorted(self._client_symbols - wanted))
+        self._client_symbols = wanted
+        removed_set = set(removed)
+        self.topics = [topic for topic in self.topics if topic not in removed_set] + added
+
+        ws = self._ws
+        if ws is not None and not ws.closed:
+            if removed:
+                await self._send_batched(ws, 'unsubscribe', removed)
+            if added:
+                await self._subscribe(ws, added)
+
+    async def _revalidate(self):
+        """Перепроверить по загрузившемуся каталогу символы, принятые условно"""
+        if self._provisional and self.service.catalog.is_loaded:
+            await self.sync_subscribers(self._requested)
+
+    def start(self, loop):
+        """Запустить поток в указанном BackgroundLoop"""
+        self._loop = loop
+        loop.start_task(f"market-stream-{id(self)}", self._run)
+
+    async def stop(self):
+        if self._loop is not None:
+            self._loop.cancel_task(f"market-stream-{id(self)}")
+            self._loop = None
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                await self._connect_once()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats['errors'] += 1
+                logger.warning(f"Market stream error: {e!r}")
+            finally:
+                self.connected = False
+                self._ws = None
+
+            self._stats['disconnects'] += 1
+            delay = min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            logger.info(f"Market stream reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _connect_once(self):
+        await self._revalidate()  # до подключения: меняются только self.topics
+        session = await self.service.get_session()
+        # Без сообщений (включая pong) дольше двух интервалов ping - соединение мертвое
+        async with session.ws_connect(self.url, receive_timeout=self.ping_interval * 2) as ws:
+            self._ws = ws
+            self.connected = True
+            self._stats['connects'] += 1
+            logger.info(f"Market stream connected: {self.url} ({len(self.topics)} topics)")
+
+            await self._subscribe(ws, list(self.topics))
+            ping_task = asyncio.ensure_future(self._ping_loop(ws))
+            try:
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        self._stats['messages'] += 1
+                        self.handle_message(json.loads(message.data))
+                    elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+            finally:
+                ping_task.cancel()
+
+    async def _subscribe(self, ws: aiohttp.ClientWebSocketResponse, topics: List[str]):
+        await self._send_batched(ws, 'subscribe', topics)
+
+    @staticmethod
+    async def _send_batched(ws: aiohttp.ClientWebSocketResponse, op: str, topics: List[str]):
+        for i in range(0, len(topics), SUBSCRIBE_BATCH):
+            await ws.send_json({"op": op, "args": topics[i:i + SUBSCRIBE_BATCH]})
+
+    async def _ping_loop(self, ws: aiohttp.ClientWebSocketResponse):
+        while not ws.closed:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await self._revalidate()
+                await ws.send_json({"op": "ping"})
+            except (ConnectionError, aiohttp.ClientError) as e:
+                # Соединение уже рвется: переподключение сделает _run, когда закончится чтение
+                logger.debug(f"Market stream ping failed: {e!r}")
+                return
+
+    def handle_message(self, message: Dict):
+        """Разобрать сообщение Bybit (публично для тестовых стендов)"""
+        topic = message.get('topic')
+        if not topic:
+            if message.get('op') == 'subscribe' and not message.get('success', True):
+                logger.warning(f"Market stream subscribe failed: {message.get('ret_msg')}")
+            return
+
+        data = message.get('data')
+        try:
+            if topic.startswith('tickers.'):
+                self._on_ticker(data)
+            elif topic.startswith('kline.'):
+                _, interval, symbol = topic.split('.', 2)
+                self._on_klines(symbol, interval, data)
+        except (KeyError, TypeError, ValueError) as e:
+            self._stats['errors'] += 1
+            logger.warning(f"Invalid market stream message for {topic}: {e}")
+
+    def _on_ticker(self, data: Dict):
+        ticker = BybitService._parse_ticker(data)
+        if ticker is not None:
+            self.service.tickers.update(data['symbol'], ticker)
+            self.service.record_ticker(data['symbol'], ticker)
+            broadcaster.publish_ticker(data['symbol'], ticker)
+            self._stats['ticker_updates'] += 1
+
+    def _on_klines(self, symbol: str, interval: str, rows: List[Dict]):
+        if not rows:
+            return
+        rows = sorted(rows, key=lambda row: int(row['start']))
+        table = np.array([[row['start'], row['open'], row['high'], row['low'], row['close'],
+                           row['volume'], row['turnover']] for row in rows], dtype=np.float64)
+        candles = Candles(table[:, 0].astype(np.int64), table[:, 1], table[:, 2], table[:, 3],
+                          table[:, 4], table[:, 5], table[:, 6])
+        self.service.candles.apply_stream(symbol, interval, candles)
+        for ts, close in zip(candles.ts.tolist(), candles.close.tolist()):
+            self.service.indicator_states.update(symbol, interval, ts, close)
+        # Подписчикам /api/stream - только закрытые свечи
+        for row, record in zip(rows, candles.to_records()):
+            if row.get('confirm'):
+                broadcaster.publish(symbol, 'candle', {'symbol': symbol, 'interval': interval, **record})
+        self._stats['candle_updates'] += len(rows)
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats['connected'] = self.connected
+        stats['topics'] = len(self.topics)
+        stats['client_symbols'] = len(self._client_symbols)
+        return stats
+
+
+# Глобальный экземпляр
+market_stream = MarketStream(bybit_service)
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config import POPULAR_CRYPTOS, PREDICT_WARM_DELAY
+from services.candle_store import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionWarmer:
+    """Прогрев кэша прогнозов сразу после закрытия свечи
+
+    Прогноз зависит только от закрытых свечей и версии модели, поэтому
+    после закрытия дневной свечи (плюс delay на публикацию биржей) прогнозы
+    популярных символов считаются один раз заранее, и запросы к
+    /api/predict попадают в кэш. warm - корутина, считающая и кэширующая
+    прогнозы для списка символов.
+    """
+
+    def __init__(self, warm: Callable[[List[str]], Awaitable], symbols: Optional[Iterable[str]] = None,
+                 interval: str = "D", delay: float = PREDICT_WARM_DELAY):
+        self.warm = warm
+        self.symbols = list(symbols) if symbols is not None else [crypto['symbol'] for crypto in POPULAR_CRYPTOS]
+        self.interval = interval
+        self.delay = delay
+        self._stats = {'runs': 0, 'errors': 0, 'last_run': None, 'last_ms': 0.0}
+
+    def start(self, loop):
+        """Запустить прогрев в указанном BackgroundLoop"""
+        loop.start_task(f"prediction-warmer-{id(self)}", self._run)
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """Секунд до следующего закрытия свечи плюс delay"""
+        now_ms = int((time.time() if now is None else now) * 1000)
+        step = INTERVAL_MS[self.interval]
+        next_close = now_ms - now_ms % step + step
+        return max((next_close - now_ms) / 1000 + self.delay, 1.0)
+
+    async def _run(self):
+        # Первый прогрев при старте процесса, дальше - после каждого закрытия
+        while True:
+            await self.warm_once()
+            await asyncio.sleep(self.seconds_until_next())
+
+    async def warm_once(self):
+        started = time.perf_counter()
+        try:
+            await self.warm(self.symbols)
+            self._stats['runs'] += 1
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Prediction warm-up error: {e}")
+        self._stats['last_run'] = int(time.time())
+        self._stats['last_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats['symbols'] = len(self.symbols)
+        stats['next_in'] = round(self.seconds_until_next())
+        return stats
+
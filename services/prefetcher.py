@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config import (POPULAR_CRYPTOS, CACHE_TTL, PREFETCH_HOT_SIZE, PREFETCH_HOT_HALF_LIFE, PREFETCH_HOT_MIN_SCORE,
+                    PREFETCH_LEAD, PREFETCH_JITTER, PREFETCH_RATE, PREFETCH_BURST, PREFETCH_COST)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничение частоты запросов: rate токенов в секунду, не больше burst в запасе"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Дождаться tokens токенов; возвращает время ожидания в секундах"""
+        waited = 0.0
+        tokens = min(tokens, self.burst)
+        while True:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return waited
+            delay = (tokens - self._tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class HotSet:
+    """Затухающие счетчики запросов по символам
+
+    Каждый запрос добавляет 1, счетчик уменьшается вдвое за half_life
+    секунд: символ остается горячим, пока его продолжают запрашивать.
+    """
+
+    def __init__(self, half_life: float = PREFETCH_HOT_HALF_LIFE, max_tracked: int = 1000):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._scores: Dict[str, tuple] = {}  # symbol -> (счетчик, время обновления)
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def touch(self, symbol: str, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            score, updated = self._scores.get(symbol, (0.0, now))
+            self._scores[symbol] = (self._decayed(score, updated, now) + 1.0, now)
+            if len(self._scores) > self.max_tracked:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        # Убираем затухшие, а если их мало - половину самых холодных
+        scores = {s: self._decayed(v, t, now) for s, (v, t) in self._scores.items()}
+        cold = [s for s, v in scores.items() if v < 0.1]
+        if len(cold) < len(scores) // 10:
+            cold = sorted(scores, key=scores.get)[:len(scores) // 2]
+        for symbol in cold:
+            del self._scores[symbol]
+
+    def top(self, count: int, min_score: float = PREFETCH_HOT_MIN_SCORE, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        with self._lock:
+            scores = [(self._decayed(v, t, now), s) for s, (v, t) in self._scores.items()]
+        return [s for v, s in heapq.nlargest(count, scores) if v >= min_score]
+
+
+class Prefetcher:
+    """Фоновое обновление кэша до истечения TTL
+
+    Закрепленные символы (POPULAR_CRYPTOS) и горячие символы из статистики
+    запросов обновляются через ttl * (1 - lead) после прошлого обновления
+    со случайным разбросом jitter, чтобы обновления символов и воркеров не
+    совпадали. Запросы к Bybit ограничены токенами (rate в секунду, cost на
+    обновление символа): при нехватке бюджета обновления ждут, а не
+    превышают лимит. refresh(symbol) - корутина, обновляющая кэш символа;
+    claim(symbol, ttl) - необязательная проверка, что обновление не
+    выполняет другой воркер (общий кэш).
+    """
+
+    def __init__(self, refresh: Callable[[str], Awaitable], ttl: float = CACHE_TTL,
+                 symbols: Optional[Iterable[str]] = None, hot_size: int = PREFETCH_HOT_SIZE,
+                 lead: float = PREFETCH_LEAD, jitter: float = PREFETCH_JITTER,
+                 rate: float = PREFETCH_RATE, burst: float = PREFETCH_BURST, cost: float = PREFETCH_COST,
+                 claim: Optional[Callable[[str, float], bool]] = None, hot: Optional[HotSet] = None):
+        self.refresh = refresh
+        self.ttl = ttl
+        self.pinned = list(symbols) if symbols is not None else [crypto['symbol'] for crypto in POPULAR_CRYPTOS]
+        self.hot_size = hot_size
+        self.lead = lead
+        self.jitter = jitter
+        self.cost = cost
+        self.claim = claim
+        self.hot = hot or HotSet()
+        self.bucket = TokenBucket(rate, burst)
+
+        self._due: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {'refreshes': 0, 'errors': 0, 'claimed_elsewhere': 0, 'throttled_s': 0.0,
+                       'max_lag_s': 0.0, 'requests': 0, 'request_misses': 0}
+
+    @property
+    def interval(self) -> float:
+        return self.ttl * (1 - self.lead)
+
+    def _next_due(self, now: float) -> float:
+        spread = self.interval * self.jitter
+        return now + self.interval + random.uniform(-spread, spread)
+
+    def track(self, symbol: str, cached: bool):
+        """Учесть запрос пользователя: cached=False - ответ собирался синхронно"""
+        self.hot.touch(symbol)
+        with self._lock:
+            self._stats['requests'] += 1
+            if not cached:
+                self._stats['request_misses'] += 1
+                # Кэш только что заполнен запросом - следующее обновление через интервал
+                self._due.setdefault(symbol, self._next_due(time.time()))
+
+    def targets(self) -> List[str]:
+        symbols = list(self.pinned)
+        for symbol in self.hot.top(self.hot_size):
+            if symbol not in symbols:
+                symbols.append(symbol)
+        return symbols
+
+    def start(self, loop):
+        """Запустить обновление в указанном BackgroundLoop"""
+        loop.start_task(f"prefetcher-{id(self)}", self._run)
+
+    async def _run(self):
+        # Закрепленные символы при старте разносятся по первому интервалу
+        now = time.time()
+        for symbol in self.pinned:
+            self._due.setdefault(symbol, now + random.uniform(0, self.interval * self.jitter))
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Prefetch error: {e}")
+            await asyncio.sleep(1.0)
+
+    async def run_due(self):
+        """Обновить символы, у которых наступило время обновления"""
+        targets = self.targets()
+        active = set(targets)
+        with self._lock:
+            for symbol in list(self._due):
+                if symbol not in active:
+                    del self._due[symbol]
+
+        now = time.time()
+        for symbol in targets:
+            with self._lock:
+                due = self._due.setdefault(symbol, now)
+                if due > time.time():
+                    continue
+                self._stats['max_lag_s'] = max(self._stats['max_lag_s'], round(time.time() - due, 2))
+                self._due[symbol] = self._next_due(time.time())
+
+            if self.claim is not None and not self.claim(symbol, self.interval * (1 - 2 * self.jitter)):
+                self._stats['claimed_elsewhere'] += 1
+                continue
+
+            self._stats['throttled_s'] += await self.bucket.acquire(self.cost)
+            try:
+                await self.refresh(symbol)
+                self._stats['refreshes'] += 1
+            except Exception as e:
+                self._stats['errors'] += 1
+                logger.warning(f"Prefetch of {symbol} failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['scheduled'] = len(self._due)
+        stats['throttled_s'] = round(stats['throttled_s'], 2)
+        stats['pinned'] = len(self.pinned)
+        stats['hot'] = self.hot.top(self.hot_size)
+        return stats
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from config import PRICE_ROLLUP_INTERVAL, PRICE_RETENTION_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class PriceHistoryMaintenance:
+    """Фоновое обслуживание price_history
+
+    Каждые rollup_interval секунд досчитывает агрегаты 1m/1h/1d
+    (Database.rollup_price_history), а раз в retention_interval удаляет или
+    архивирует строки старше срока хранения (Database.apply_price_retention).
+    Запросы идут в пул потоков БД через storage.run и не блокируют event loop.
+    Несколько процессов API не мешают друг другу: пересчет под advisory lock.
+    """
+
+    def __init__(self, storage=None, rollup_interval: float = PRICE_ROLLUP_INTERVAL,
+                 retention_interval: float = PRICE_RETENTION_INTERVAL):
+        self.storage = storage
+        self.rollup_interval = rollup_interval
+        self.retention_interval = retention_interval
+        self._retention_at = 0.0
+        self._stats = {'runs': 0, 'errors': 0, 'rolled': 0, 'removed': 0, 'last_run': None,
+                       'last_ms': 0.0, 'last_retention': None}
+
+    def start(self, loop):
+        """Запустить обслуживание в указанном BackgroundLoop"""
+        loop.start_task(f"price-maintenance-{id(self)}", self._run)
+
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.rollup_interval)
+
+    async def run_once(self):
+        if self.storage is None:
+            return
+        started = time.perf_counter()
+        try:
+            rolled = await self.storage.run(self.storage.rollup_price_history)
+            self._stats['rolled'] += sum(rolled.values())
+            if time.time() - self._retention_at >= self.retention_interval:
+                self._retention_at = time.time()
+                removed = await self.storage.run(self.storage.apply_price_retention)
+                self._stats['removed'] += sum(removed.values())
+                self._stats['last_retention'] = int(self._retention_at)
+                if any(removed.values()):
+                    logger.info(f"Price history retention: {removed}")
+            self._stats['runs'] += 1
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Price history maintenance error: {e}")
+        self._stats['last_run'] = int(time.time())
+        self._stats['last_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats['attached'] = self.storage is not None
+        return stats
+
+
+# Глобальный экземпляр
+price_maintenance = PriceHistoryMaintenance()
@@ -0,0 +1,378 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import CANDLE_STORE_MAX_SERIES, INDICATOR_WINDOW
+from models.candles import Candles
+
+# Онлайн-версии индикаторов: одна новая свеча - O(1).
+# update(x) добавляет точку, revise(x) заменяет последнюю (свеча еще не закрыта
+# и ее цена меняется). Состояние сериализуется в dict (snapshot/restore).
+
+
+class RunningEMA:
+    """Экспоненциальное среднее (alpha = 2 / (window + 1), старт с первого значения)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.value: Optional[float] = None
+        self._prev: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        self._prev = self.value
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def revise(self, x: float) -> float:
+        self.value = self._prev
+        return self.update(x)
+
+    def snapshot(self) -> Dict:
+        return {'window': self.window, 'value': self.value, 'prev': self._prev}
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'RunningEMA':
+        ema = cls(state['window'])
+        ema.value = state['value']
+        ema._prev = state['prev']
+        return ema
+
+
+class WilderRSI:
+    """RSI Уайлдера: первые period изменений - простое среднее, дальше сглаживание 1/period"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0  # число учтенных изменений цены
+        self.last_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self._prev: Optional[Tuple] = None
+
+    def _state(self) -> Tuple:
+        return self.count, self.last_close, self.avg_gain, self.avg_loss
+
+    def update(self, close: float) -> Optional[float]:
+        self._prev = self._state()
+        if self.last_close is not None:
+            delta = close - self.last_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            self.count += 1
+            if self.count <= self.period:
+                # Накопление простого среднего для затравки
+                self.avg_gain += (gain - self.avg_gain) / self.count
+                self.avg_loss += (loss - self.avg_loss) / self.count
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        self.last_close = close
+        return self.value
+
+    def revise(self, close: float) -> Optional[float]:
+        if self._prev is not None:
+            self.count, self.last_close, self.avg_gain, self.avg_loss = self._prev
+        return self.update(close)
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count < self.period:
+            return None
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+    def snapshot(self) -> Dict:
+        return {'period': self.period, 'state': list(self._state()),
+                'prev': list(self._prev) if self._prev is not None else None}
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'WilderRSI':
+        rsi = cls(state['period'])
+        rsi.count, rsi.last_close, rsi.avg_gain, rsi.avg_loss = state['state']
+        rsi._prev = tuple(state['prev']) if state['prev'] is not None else None
+        return rsi
+
+
+class RollingWindow:
+    """Скользящее окно на кольцевом буфере: среднее и дисперсия за O(1)
+
+    Суммы ведутся относительно опорного значения (первой точки), чтобы
+    E[x^2] - E[x]^2 не теряло точность на ценах порядка 1e4-1e5, и раз в
+    RESUM_EVERY окон пересчитываются по буферу (накопленная ошибка сложений).
+    """
+
+    RESUM_EVERY = 16
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = np.zeros(window)
+        self.size = 0
+        self.head = 0  # позиция следующей записи
+        self.shift: Optional[float] = None
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self._writes = 0
+
+    def update(self, x: float):
+        if self.shift is None:
+            self.shift = x
+        if self.size == self.window:
+            self._remove(self.buffer[self.head])
+        else:
+            self.size += 1
+        self.buffer[self.head] = x
+        self._add(x)
+        self.head = (self.head + 1) % self.window
+        self._writes += 1
+        if self._writes >= self.RESUM_EVERY * self.window:
+            self._resum()
+
+    def _resum(self):
+        values = np.asarray(self.values()) - self.shift
+        self.sum = float(values.sum())
+        self.sum_sq = float((values * values).sum())
+        self._writes = 0
+
+    def revise(self, x: float):
+        if not self.size:
+            self.update(x)
+            return
+        last = (self.head - 1) % self.window
+        self._remove(self.buffer[last])
+        self.buffer[last] = x
+        self._add(x)
+
+    def _add(self, x: float):
+        d = x - self.shift
+        self.sum += d
+        self.sum_sq += d * d
+
+    def _remove(self, x: float):
+        d = x - self.shift
+        self.sum -= d
+        self.sum_sq -= d * d
+
+    @property
+    def full(self) -> bool:
+        return self.size == self.window
+
+    @property
+    def oldest(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return float(self.buffer[(self.head - self.size) % self.window])
+
+    @property
+    def mean(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return self.shift + self.sum / self.size
+
+    @property
+    def variance(self) -> Optional[float]:
+        if not self.size:
+            return None
+        mean_d = self.sum / self.size
+        return max(self.sum_sq / self.size - mean_d * mean_d, 0.0)
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def values(self) -> List[float]:
+        """Значения окна от старых к новым"""
+        start = (self.head - self.size) % self.window
+        return np.roll(self.buffer, -start)[:self.size].tolist()
+
+    def snapshot(self) -> Dict:
+        return {'window': self.window, 'values': self.values(), 'shift': self.shift,
+                'sum': self.sum, 'sum_sq': self.sum_sq, 'writes': self._writes}
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'RollingWindow':
+        window = cls(state['window'])
+        values = state['values']
+        window.buffer[:len(values)] = values
+        window.size = len(values)
+        window.head = len(values) % window.window
+        window.shift = state['shift']
+        window.sum = state['sum']
+        window.sum_sq = state['sum_sq']
+        window._writes = state['writes']
+        return window
+
+
+class IndicatorState:
+    """Набор индикаторов /api/crypto для одной серии свечей
+
+    Значения совпадают с BybitService.calculate_technical_indicators на окне
+    из window цен закрытия: RSI 14 (Уайлдер) и EMA 12/26 с памятью за всю
+    историю серии, MA 7/25/50, волатильность доходностей и тренд за окно.
+    """
+
+    MA_WINDOWS = (7, 25, 50)
+    EMA_WINDOWS = (12, 26)
+
+    def __init__(self, window: int = INDICATOR_WINDOW, rsi_period: int = 14):
+        self.window = window
+        self.last_ts: Optional[int] = None
+        self.rsi = WilderRSI(rsi_period)
+        self.prices = RollingWindow(window)
+        self.returns = RollingWindow(window - 1)
+        self.ma = {n: RollingWindow(n) for n in self.MA_WINDOWS}
+        self.ema = {n: RunningEMA(n) for n in self.EMA_WINDOWS}
+        self._prev_close: Optional[float] = None  # закрытие перед последней свечой
+
+    def update(self, ts: int, close: float):
+        """Новая свеча (ts больше последнего) или обновление последней (тот же ts)"""
+        if self.last_ts is not None and ts < self.last_ts:
+            return
+        if ts == self.last_ts:
+            self.rsi.revise(close)
+            self.prices.revise(close)
+            for ma in self.ma.values():
+                ma.revise(close)
+            for ema in self.ema.values():
+                ema.revise(close)
+            if self._prev_close is not None:
+                self.returns.revise((close - self._prev_close) / self._prev_close * 100)
+            return
+
+        last_close = self.rsi.last_close
+        self.rsi.update(close)
+        self.prices.update(close)
+        for ma in self.ma.values():
+            ma.update(close)
+        for ema in self.ema.values():
+            ema.update(close)
+        if last_close is not None:
+            self.returns.update((close - last_close) / last_close * 100)
+        self._prev_close = last_close
+        self.last_ts = ts
+
+    def indicators(self) -> Dict:
+        if self.last_ts is None:
+            return {'rsi': 50.0, 'ma_7': 0.0, 'ma_25': 0.0, 'ma_50': 0.0, 'ema_12': 0.0, 'ema_26': 0.0,
+                    'volatility': 0.0, 'trend_strength': 0.0}
+
+        last_price = self.rsi.last_close
+        first_price = self.prices.oldest
+        rsi = self.rsi.value
+        result = {'rsi': float(rsi) if rsi is not None else 50.0}
+        for n, ma in self.ma.items():
+            result[f'ma_{n}'] = float(ma.mean) if ma.full else float(last_price)
+        for n, ema in self.ema.items():
+            result[f'ema_{n}'] = float(ema.value)
+        result['volatility'] = float(self.returns.std or 0.0)
+        result['trend_strength'] = float((last_price - first_price) / first_price * 100) if first_price else 0.0
+        return result
+
+    def snapshot(self) -> Dict:
+        return {
+            'window': self.window,
+            'last_ts': self.last_ts,
+            'prev_close': self._prev_close,
+            'rsi': self.rsi.snapshot(),
+            'prices': self.prices.snapshot(),
+            'returns': self.returns.snapshot(),
+            'ma': {str(n): ma.snapshot() for n, ma in self.ma.items()},
+            'ema': {str(n): ema.snapshot() for n, ema in self.ema.items()}
+        }
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'IndicatorState':
+        obj = cls(state['window'], state['rsi']['period'])
+        obj.last_ts = state['last_ts']
+        obj._prev_close = state['prev_close']
+        obj.rsi = WilderRSI.restore(state['rsi'])
+        obj.prices = RollingWindow.restore(state['prices'])
+        obj.returns = RollingWindow.restore(state['returns'])
+        obj.ma = {int(n): RollingWindow.restore(ma) for n, ma in state['ma'].items()}
+        obj.ema = {int(n): RunningEMA.restore(ema) for n, ema in state['ema'].items()}
+        return obj
+
+
+class IndicatorStateStore:
+    """Состояния индикаторов по (symbol, interval)
+
+    sync() досылает в состояние только свечи новее последней учтенной:
+    при живом потоке это одна-две свечи вместо пересчета всего окна.
+    """
+
+    def __init__(self, window: int = INDICATOR_WINDOW, max_series: int = CANDLE_STORE_MAX_SERIES):
+        self.window = window
+        self.max_series = max_series
+        self._states: 'OrderedDict[Tuple[str, str], IndicatorState]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'seeds': 0, 'updates': 0, 'reads': 0}
+
+    def _state(self, key: Tuple[str, str]) -> Optional[IndicatorState]:
+        state = self._states.get(key)
+        if state is not None:
+            self._states.move_to_end(key)
+        return state
+
+    def _put(self, key: Tuple[str, str], state: IndicatorState):
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_series:
+            self._states.popitem(last=False)
+
+    def update(self, symbol: str, interval: str, ts: int, close: float):
+        """Одна свеча из живого потока (новая или обновление текущей)"""
+        with self._lock:
+            state = self._state((symbol, interval))
+            if state is None:
+                return  # без истории окна индикаторы не посчитать - ждем sync()
+            state.update(ts, close)
+            self._stats['updates'] += 1
+
+    def sync(self, symbol: str, interval: str, candles: Candles) -> Dict:
+        """Довести состояние до последней свечи candles и вернуть индикаторы"""
+        key = (symbol, interval)
+        with self._lock:
+            state = self._state(key)
+            if not len(candles):
+                return state.indicators() if state else IndicatorState(self.window).indicators()
+
+            start = None
+            if state is not None and state.last_ts is not None:
+                # Свечи начиная с последней учтенной (она могла измениться)
+                start = int(np.searchsorted(candles.ts, state.last_ts, side='left'))
+                if start >= len(candles) or candles.ts[start] != state.last_ts:
+                    start = None  # разрыв или другое окно - пересобираем
+
+            if start is None:
+                state = IndicatorState(self.window)
+                start = max(len(candles) - self.window, 0)
+                self._put(key, state)
+                self._stats['seeds'] += 1
+            else:
+                self._stats['reads'] += 1
+
+            ts, close = candles.ts, candles.close
+            for i in range(start, len(candles)):
+                state.update(int(ts[i]), float(close[i]))
+            return state.indicators()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {f"{symbol}:{interval}": state.snapshot()
+                    for (symbol, interval), state in self._states.items()}
+
+    def restore(self, snapshot: Dict):
+        with self._lock:
+            for key, state in snapshot.items():
+                symbol, interval = key.split(':', 1)
+                self._put((symbol, interval), IndicatorState.restore(state))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['series'] = len(self._states)
+        return stats
@@ -0,0 +1,42 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from config import TICKER_STREAM_MAX_AGE
+
+
+class TickerStore:
+    """Последние тикеры из потока по символам
+
+    Тикер отдается только пока он свежий (max_age): если поток отвалился,
+    BybitService возвращается к REST.
+    """
+
+    def __init__(self, max_age: float = TICKER_STREAM_MAX_AGE):
+        self.max_age = max_age
+        self._tickers: Dict[str, Dict] = {}
+        self._received_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {'updates': 0, 'hits': 0, 'misses': 0}
+
+    def update(self, symbol: str, ticker: Dict):
+        with self._lock:
+            self._tickers[symbol] = ticker
+            self._received_at[symbol] = time.time()
+            self._stats['updates'] += 1
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+            if ticker is None or now - self._received_at[symbol] > self.max_age:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return ticker
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['symbols'] = len(self._tickers)
+        return stats
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import WRITE_BEHIND_BATCH, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+# Вид строк -> метод storage, который пишет пачку и возвращает число записанных строк (None - ошибка)
+WRITERS = {
+    'candles': 'upsert_candle_rows',  # (symbol, interval, open_time, open, high, low, close, volume, turnover)
+    'tickers': 'insert_price_snapshots',  # (symbol, price, change_24h, volume_24h, high_24h, low_24h, timestamp)
+}
+
+
+class WriteBehindBuffer:
+    """Отложенная пакетная запись рыночных данных в БД
+
+    put() только добавляет строку в память и сразу возвращается. Фоновый
+    поток пишет накопленное одной пачкой на вид строк (COPY/execute_values),
+    как только набралось batch_size строк или прошло flush_interval секунд.
+    Больше max_pending строк в памяти не держится: без блокировки новые
+    строки отбрасываются (запрос API не ждет БД), с block=True вызывающий
+    ждет, пока запись освободит место. stop() дописывает все накопленное.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BEHIND_BATCH, flush_interval: float = WRITE_BEHIND_INTERVAL,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.storage = None
+
+        self._pending: Dict[str, List[Tuple]] = {kind: [] for kind in WRITERS}
+        self._count = 0
+        self._flushing = 0  # строк в записи прямо сейчас (еще занимают место)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flush_requested = False
+        self._stats = {'queued': 0, 'written': 0, 'skipped': 0, 'dropped': 0, 'failed': 0, 'flushes': 0,
+                       'blocked': 0, 'last_flush_ms': 0.0, 'max_flush_ms': 0.0}
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, storage):
+        """Запустить поток записи в storage (models.database.Database)"""
+        with self._cond:
+            if self.is_running:
+                return
+            self.storage = storage
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def put(self, kind: str, row: Tuple, block: bool = False, timeout: Optional[float] = None) -> bool:
+        return self.put_many(kind, [row], block, timeout)
+
+    def put_many(self, kind: str, rows: Iterable[Tuple], block: bool = False, timeout: Optional[float] = None) -> bool:
+        """Поставить строки в очередь; False - поток не запущен или места нет"""
+        rows = list(rows)
+        if not rows or not self.is_running:
+            return False
+
+        with self._cond:
+            if self._count + self._flushing + len(rows) > self.max_pending:
+                if not block:
+                    self._stats['dropped'] += len(rows)
+                    return False
+                self._stats['blocked'] += 1
+                self._flush_requested = True
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: self._count + self._flushing + len(rows) <= self.max_pending
+                                           or self._stopping, timeout):
+                    self._stats['dropped'] += len(rows)
+                    return False
+
+            self._pending[kind].extend(rows)
+            self._count += len(rows)
+            self._stats['queued'] += len(rows)
+            if self._count >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Записать все накопленное и дождаться записи"""
+        with self._cond:
+            if not self.is_running:
+                return False
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._count == 0 and self._flushing == 0, timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Остановить поток, дописав накопленное (при выходе процесса)"""
+        with self._cond:
+            if not self.is_running:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Write-behind flush did not finish in {timeout}s, {self._count} rows lost")
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or self._flush_requested or self._count >= self.batch_size
+                    or time.monotonic() >= deadline,
+                    max(deadline - time.monotonic(), 0)
+                )
+                batches = {kind: rows for kind, rows in self._pending.items() if rows}
+                self._pending = {kind: [] for kind in WRITERS}
+                self._flushing, self._count = self._count, 0
+                self._flush_requested = False
+                stopping = self._stopping
+
+            if batches:
+                self._write(batches)
+            deadline = time.monotonic() + self.flush_interval
+
+            with self._cond:
+                self._flushing = 0
+                self._cond.notify_all()
+                if stopping and not self._count:
+                    return
+
+    def _write(self, batches: Dict[str, List[Tuple]]):
+        started = time.perf_counter()
+        for kind, rows in batches.items():
+            try:
+                written = getattr(self.storage, WRITERS[kind])(rows)
+            except Exception as e:
+                logger.error(f"Write-behind {kind} flush failed: {e}")
+                written = None
+            with self._cond:
+                # Методы storage логируют ошибку сами и возвращают None; иначе - число записанных
+                # строк (снимки символов без строки в cryptocurrencies пропускаются, это не ошибка)
+                if written is None:
+                    self._stats['failed'] += len(rows)
+                else:
+                    self._stats['written'] += written
+                    self._stats['skipped'] += len(rows) - written
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._cond:
+            self._stats['flushes'] += 1
+            self._stats['last_flush_ms'] = round(elapsed_ms, 1)
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], round(elapsed_ms, 1))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = self._count + self._flushing
+        stats['running'] = self.is_running
+        return stats
+
+
+# Глобальный экземпляр
+write_behind = WriteBehindBuffer()
@@ -3,6 +3,7 @@ let priceChart = null;
 let predictionChart = null;
 let currentCryptoData = null;
 let priceUpdateInterval = null;
+let priceStream = null;
 let selectedCrypto = null;
 let currentTimeframe = '60';
 let chartType = 'line';
@@ -68,10 +69,7 @@ function setupEventListeners() {
 }
 
 async function loadCryptoData(symbol) {
-    if (priceUpdateInterval) {
-        clearInterval(priceUpdateInterval);
-        priceUpdateInterval = null;
-    }
+    stopPriceUpdates();
 
     showLoading('Загрузка...');
 
@@ -82,10 +80,7 @@ async function loadCryptoData(symbol) {
         if (data.success) {
             currentCryptoData = data.data;
             displayCryptoData(data.data);
-
-            priceUpdateInterval = setInterval(() => {
-                updatePriceRealtime(symbol);
-            }, 10000);
+            startPriceStream(symbol);
         } else {
             alert('Ошибка: ' + (data.error || 'Unknown error'));
         }
@@ -97,29 +92,112 @@ async function loadCryptoData(symbol) {
     }
 }
 
+function stopPriceUpdates() {
+    if (priceStream) {
+        priceStream.close();
+        priceStream = null;
+    }
+    if (priceUpdateInterval) {
+        clearInterval(priceUpdateInterval);
+        priceUpdateInterval = null;
+    }
+}
+
+function startPriceStream(symbol) {
+    // Без EventSource - старый опрос раз в 10 секунд
+    if (!window.EventSource) {
+        startPricePolling(symbol);
+        return;
+    }
+
+    let failures = 0;
+    priceStream = new EventSource(`${API_URL}/stream?symbols=${encodeURIComponent(symbol)}`);
+
+    priceStream.addEventListener('ticker', (event) => {
+        failures = 0;
+        applyTickerDelta(JSON.parse(event.data));
+    });
+
+    priceStream.addEventListener('candle', (event) => {
+        applyClosedCandle(JSON.parse(event.data));
+    });
+
+    priceStream.onerror = () => {
+        // EventSource переподключается сам; после нескольких неудач переходим на опрос
+        failures += 1;
+        if (failures >= 3 || priceStream.readyState === EventSource.CLOSED) {
+            stopPriceUpdates();
+            startPricePolling(symbol);
+        }
+    };
+}
+
+function startPricePolling(symbol) {
+    priceUpdateInterval = setInterval(() => {
+        updatePriceRealtime(symbol);
+    }, 10000);
+}
+
+function applyTickerDelta(delta) {
+    if (!currentCryptoData || delta.symbol !== currentCryptoData.symbol) return;
+
+    // Поля тикера -> формат current из /api/crypto
+    const fields = {
+        last_price: 'price',
+        change_24h: 'change_24h',
+        high_24h: 'high_24h',
+        low_24h: 'low_24h',
+        volume_24h: 'volume_24h',
+        turnover_24h: 'turnover_24h'
+    };
+    Object.entries(fields).forEach(([from, to]) => {
+        if (delta[from] !== undefined) currentCryptoData.current[to] = delta[from];
+    });
+
+    renderCurrentPrice(currentCryptoData.current);
+}
+
+function applyClosedCandle(candle) {
+    if (!currentCryptoData || candle.symbol !== currentCryptoData.symbol) return;
+    if (candle.interval !== currentTimeframe || currentKlines.length === 0) return;
+
+    // Свечи графика от новых к старым: обновляем или добавляем закрытую свечу
+    const { symbol, interval, ...record } = candle;
+    if (currentKlines[0].timestamp === record.timestamp) {
+        currentKlines[0] = record;
+    } else if (record.timestamp > currentKlines[0].timestamp) {
+        currentKlines.unshift(record);
+        currentKlines.pop();
+    } else {
+        return;
+    }
+    displayPriceChartFromKlines(currentKlines, currentTimeframe);
+}
+
+function renderCurrentPrice(current) {
+    document.getElementById('currentPrice').textContent = `$${formatPrice(current.price)}`;
+
+    const change = current.change_24h || 0;
+    const changeEl = document.getElementById('priceChange');
+    const changeIcon = change >= 0 ? '↑' : '↓';
+    const changeColor = change >= 0 ? '#10b981' : '#ef4444';
+
+    changeEl.textContent = `${changeIcon} ${Math.abs(change).toFixed(2)}%`;
+    changeEl.style.color = changeColor;
+    changeEl.style.background = changeColor + '20';
+
+    document.getElementById('high24h').textContent = `$${formatPrice(current.high_24h)}`;
+    document.getElementById('low24h').textContent = `$${formatPrice(current.low_24h)}`;
+}
+
 async function updatePriceRealtime(symbol) {
     try {
         const response = await fetch(`${API_URL}/crypto/${symbol}`);
         const data = await response.json();
 
         if (data.success && data.data) {
-            const newData = data.data;
-            const currentPrice = newData.current.price;
-            document.getElementById('currentPrice').textContent = `$${formatPrice(currentPrice)}`;
-
-            const change = newData.current.change_24h || 0;
-            const changeEl = document.getElementById('priceChange');
-            const changeIcon = change >= 0 ? '↑' : '↓';
-            const changeColor = change >= 0 ? '#10b981' : '#ef4444';
-
-            changeEl.textContent = `${changeIcon} ${Math.abs(change).toFixed(2)}%`;
-            changeEl.style.color = changeColor;
-            changeEl.style.background = changeColor + '20';
-
-            document.getElementById('high24h').textContent = `$${formatPrice(newData.current.high_24h)}`;
-            document.getElementById('low24h').textContent = `$${formatPrice(newData.current.low_24h)}`;
-
-            currentCryptoData = newData;
+            renderCurrentPrice(data.data.current);
+            currentCryptoData = data.data;
         }
     } catch (error) {
         console.error('Error updating price:', error);
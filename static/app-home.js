@@ -95,16 +95,46 @@ async function renderCryptoGrid() {
                 card.innerHTML = `
                     <div class="crypto-emoji">${crypto.emoji || '💰'}</div>
                     <div class="crypto-symbol">${crypto.display_name || crypto.symbol}</div>
+                    <div class="crypto-price" data-symbol="${crypto.symbol}"></div>
+                    <div class="crypto-change" data-symbol="${crypto.symbol}"></div>
                 `;
 
                 grid.appendChild(card);
             });
+
+            await updateGridPrices(cryptos.map(crypto => crypto.symbol));
         }
     } catch (error) {
         console.error('Error:', error);
     }
 }
 
+async function updateGridPrices(symbols) {
+    // Цены всех карточек одним запросом
+    if (symbols.length === 0) return;
+
+    try {
+        const response = await fetch(`${API_URL}/tickers?symbols=${encodeURIComponent(symbols.join(','))}`);
+        const data = await response.json();
+        if (!data.success) return;
+
+        symbols.forEach(symbol => {
+            const ticker = data.data[symbol];
+            if (!ticker) return;
+
+            const price = document.querySelector(`.crypto-price[data-symbol="${symbol}"]`);
+            const change = document.querySelector(`.crypto-change[data-symbol="${symbol}"]`);
+            if (price) price.textContent = `$${ticker.last_price.toLocaleString()}`;
+            if (change) {
+                change.textContent = `${ticker.change_24h >= 0 ? '+' : ''}${ticker.change_24h.toFixed(2)}%`;
+                change.className = `crypto-change ${ticker.change_24h >= 0 ? 'positive' : 'negative'}`;
+            }
+        });
+    } catch (error) {
+        console.error('Error:', error);
+    }
+}
+
 function openCrypto(symbol) {
     // Переходим на страницу деталей с параметром символа
     window.location.href = `/crypto-detail.html?symbol=${symbol}`;